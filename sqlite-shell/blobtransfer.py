@@ -0,0 +1,175 @@
+from os import fstat
+from sqlite3 import Error
+from typing import Any
+
+from constants import BLOB_CHUNK_BYTES, BLOB_DISPLAY_BYTES
+from database import Database
+from quoting import quote
+
+
+class BlobTransfer:
+    """BlobTransfer
+
+    Copies files into and out of blob columns with SQLite's incremental blob I/O, a fixed size
+    chunk at a time, so that blobs of any size are moved without ever holding the whole value in
+    memory. A file is copied in by first setting the value to a zero-filled blob of the file's size
+    and then overwriting it chunk by chunk, all in one transaction.
+    """
+
+    def __init__(self, database: Database) -> None:
+        """__init__
+
+        Initialises the blob transfer class.
+
+        Args:
+            database (Database): open database.
+        """
+        self._database = database
+
+    def copy_in(self, table: str, column: str, rowid: int, filename: str) -> bool:
+        """copy_in
+
+        Copies a file into a blob column of a row, inserting the row if there is none with the rowid.
+
+        Args:
+            table (str): name of table.
+            column (str): name of blob column.
+            rowid (int): rowid of row.
+            filename (str): file to copy in.
+
+        Returns:
+            bool: flag indicating success.
+        """
+        try:
+            with open(filename, "rb") as _file:
+                _size: int = fstat(_file.fileno()).st_size
+                if _size > self._database.length_limit():
+                    print(
+                        f"Error: '{filename}' is {_size:,} bytes, more than the largest blob of {self._database.length_limit():,} bytes."
+                    )
+                    return False
+
+                _buffer: memoryview = memoryview(bytearray(BLOB_CHUNK_BYTES))
+
+                self._database.execute_with_retry("BEGIN IMMEDIATE;")
+                try:
+                    self.allocate(table, column, rowid, _size)
+
+                    with self._database.open_blob(table, column, rowid, False) as _blob:
+                        while _read := _file.readinto(_buffer):
+                            _blob.write(_buffer[:_read])
+
+                    self._database.execute_with_retry("COMMIT;")
+                except BaseException:
+                    self._database.execute_with_retry("ROLLBACK;")
+                    raise
+
+        except OSError as error:
+            print(f"Error: {error}.")
+            return False
+        except (Error, ValueError) as error:
+            print("Error: %s." % (" ".join(map(str, error.args))))
+            return False
+
+        print(f"Copied {_size:,} bytes from '{filename}' into {table}.{column} at rowid {rowid}")
+        return True
+
+    def copy_out(self, table: str, column: str, rowid: int, filename: str) -> bool:
+        """copy_out
+
+        Copies a blob column of a row out to a file.
+
+        Args:
+            table (str): name of table.
+            column (str): name of blob column.
+            rowid (int): rowid of row.
+            filename (str): file to copy out to, replaced if it exists.
+
+        Returns:
+            bool: flag indicating success.
+        """
+        try:
+            with self._database.open_blob(table, column, rowid, True) as _blob:
+                _size: int = len(_blob)
+                with open(filename, "wb") as _file:
+                    while _chunk := _blob.read(BLOB_CHUNK_BYTES):
+                        _file.write(_chunk)
+
+        except OSError as error:
+            print(f"Error: {error}.")
+            return False
+        except Error as error:
+            print("Error: %s." % (" ".join(error.args)))
+            return False
+
+        print(f"Copied {_size:,} bytes from {table}.{column} at rowid {rowid} to '{filename}'")
+        return True
+
+    def allocate(self, table: str, column: str, rowid: int, size: int) -> None:
+        """allocate
+
+        Sets a blob column of a row to a zero-filled blob of the given size, which takes no memory,
+        ready to be overwritten. The row is inserted if there is none with the rowid.
+
+        Args:
+            table (str): name of table.
+            column (str): name of blob column.
+            rowid (int): rowid of row.
+            size (int): size of blob in bytes.
+        """
+        self._database.execute_with_retry(
+            f"UPDATE {quote(table)} SET {quote(column)} = zeroblob(?) WHERE rowid = ?;", (size, rowid)
+        )
+        if self._database.changes() == 0:
+            self._database.execute_with_retry(
+                f"INSERT INTO {quote(table)} (rowid, {quote(column)}) VALUES (?, zeroblob(?));", (rowid, size)
+            )
+
+
+class BlobSummary:
+    """BlobSummary
+
+    Stands in for a large blob when results are displayed, showing its size and first bytes rather
+    than the whole value.
+    """
+
+    def __init__(self, value: bytes) -> None:
+        """__init__
+
+        Initialises the blob summary class.
+
+        Args:
+            value (bytes): blob to summarise.
+        """
+        self._size = len(value)
+        self._head = value[:8].hex()
+
+    def __repr__(self) -> str:
+        """__repr__
+
+        Returns:
+            str: summary of the blob.
+        """
+        return f"<blob {self._size:,} bytes {self._head}...>"
+
+
+def summarise_blobs(row: Any) -> Any:
+    """summarise_blobs
+
+    Replaces large blobs in a row of results with summaries, for display.
+
+    Args:
+        row (Any): row of results.
+
+    Returns:
+        Any: row with large blobs summarised, or the row itself if it has none.
+    """
+    if not isinstance(row, tuple) or not any(
+        isinstance(_value, bytes) and len(_value) > BLOB_DISPLAY_BYTES for _value in row
+    ):
+        return row
+
+    return tuple(
+        BlobSummary(_value) if isinstance(_value, bytes) and len(_value) > BLOB_DISPLAY_BYTES else _value
+        for _value in row
+    )
@@ -1,6 +1,8 @@
 from shlex import split
 from typing import Any
 
+from constants import QUERY_COMMANDS
+
 
 class CommandParser:
     """parser
@@ -24,7 +26,8 @@ class CommandParser:
 
         Parses a given string. The string is parsed into a command, and a list of positional arguments
         and a list of named arguments. The named arguments are returned as dictionaries.
-        Strings that can be converted to integers or floats will be so converted.
+        Strings that can be converted to integers or floats will be so converted. Commands that take a
+        query only have the named parameters they expect, and their positional parameters are not converted.
 
         Args:
             command_string (str): string to parse
@@ -50,18 +53,25 @@ class CommandParser:
 
             if len(_command_string_parts) > 1:
                 _parameters: list[str] = _command_string_parts[1:]
+                _expected: list[str] | None = QUERY_COMMANDS.get(self.command)
 
                 for _parameter in _parameters:
+                    #  If a command that takes a query does not expect a parameter with this name then it is part
+                    #  of the query, so store it as it is in the list of positional parameters.
+
+                    if _expected is not None and _parameter.split(":", 1)[0].lower() not in _expected:
+                        self.positional_parameters.append(_parameter)
+
                     #  If the parameter does not contain a colon then it is a positional parameter,
                     #  so convert to int or float if possible and store in list of positional parameters.
 
-                    if ":" not in _parameter:
+                    elif ":" not in _parameter:
                         self.positional_parameters.append(self.convert(_parameter))
 
                     else:
                         #  If the colon is present then the parameter is a named parameter. Split it at the colon and
                         #  store the two parts and key and value in a dictionary. Store dictionary in list of named paramters.
-                        _key, _value = _parameter.split(":")
+                        _key, _value = _parameter.split(":", 1)
 
                         _named_parameter: dict[str, Any] = {}
                         _named_parameter[_key] = self.convert(_value)
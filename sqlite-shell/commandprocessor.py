@@ -1,41 +1,79 @@
-from os import chdir, getcwd, listdir, system
+from os import chdir, getcwd, listdir, path, remove, system
+from sqlite3 import Error
 from typing import Any
 
 from config import Config
-from constants import HELP_TEXT
+from blobtransfer import BlobTransfer
+from datagenerator import DataGenerator
+from dumper import Dumper
+from fulltext import FullTextIndex
+from constants import DIFF_SCHEMA, FTS_SEARCH_LIMIT, HELP_TEXT, HISTORY_FILENAME, OPEN_MODES, SLOW_QUERY_LIMIT, WATCH_INTERVAL_MS
 from database import Database
+from profiler import Profiler
+from querylog import QueryLog
+from sampler import Sampler
+from scriptcache import SCRIPT_CACHE, CompiledScript
+from tablecopier import TableCopier
+from stresstest import StressTest
+from tablediff import TableDiff
+from watcher import Watcher
 
 
 class CommandProcessor:
-    def __init__(self, config: Config, database:Database) -> None:
+    def __init__(self, config: Config, database:Database, profiler: Profiler) -> None:
         """__init__
 
         Initialises command processor class.
         """
-        #  Store the configuration and database.
+        #  Store the configuration, database and profiler.
 
         self._config = config
         self._database = database
+        self._profiler = profiler
 
         #  Set up the dictionaries of built-in commands with their methods.
         #  There are two types of command; those that execute immediately and those
         #  that return an sql string to be executed later.
 
         #  Set up immediate commands. Dictionary entries consit of the expected parameter count
-        #  and the method to call to execute the command.
+        #  and the method to call to execute the command. A count of -1 indicates that the command
+        #  takes optional positional and named parameters and checks them itself.
 
         self._immediate_command_list: dict[str, tuple[int, Any]] = {}
+        self._immediate_command_list[".batch"] = (-1, self.command_batch)
+        self._immediate_command_list[".blobin"] = (4, self.command_blobin)
+        self._immediate_command_list[".blobout"] = (4, self.command_blobout)
         self._immediate_command_list[".close"] = (0, self.command_close)
+        self._immediate_command_list[".columnar"] = (1, self.command_columnar)
+        self._immediate_command_list[".commit"] = (0, self.command_commit)
+        self._immediate_command_list[".copy"] = (-1, self.command_copy)
+        self._immediate_command_list[".count"] = (-1, self.command_count)
         self._immediate_command_list[".create"] = (1, self.command_create)
         self._immediate_command_list[".cwd"] = (1, self.command_cwd)
         self._immediate_command_list[".delete"] = (1, self.command_delete)
+        self._immediate_command_list[".diff"] = (-1, self.command_diff)
         self._immediate_command_list[".dir"] = (0, self.command_dir)
         self._immediate_command_list[".echo"] = (1, self.command_echo)
+        self._immediate_command_list[".dump"] = (-1, self.command_dump)
         self._immediate_command_list[".edit"] = (0, self.command_edit)
         self._immediate_command_list[".exit"] = (1, self.command_exit)
+        self._immediate_command_list[".fts"] = (-1, self.command_fts)
+        self._immediate_command_list[".function"] = (1, self.command_function)
+        self._immediate_command_list[".generate"] = (-1, self.command_generate)
         self._immediate_command_list[".help"] = (0, self.command_help)
-        self._immediate_command_list[".open"] = (1, self.command_open)
+        self._immediate_command_list[".open"] = (-1, self.command_open)
+        self._immediate_command_list[".optimize"] = (-1, self.command_optimize)
+        self._immediate_command_list[".pyprof"] = (-1, self.command_pyprof)
+        self._immediate_command_list[".release"] = (1, self.command_release)
+        self._immediate_command_list[".rollback"] = (-1, self.command_rollback)
+        self._immediate_command_list[".sample"] = (2, self.command_sample)
+        self._immediate_command_list[".savepoint"] = (1, self.command_savepoint)
         self._immediate_command_list[".script"] = (1, self.command_script)
+        self._immediate_command_list[".slow"] = (-1, self.command_slow)
+        self._immediate_command_list[".stress"] = (-1, self.command_stress)
+        self._immediate_command_list[".timeout"] = (-1, self.command_timeout)
+        self._immediate_command_list[".trace"] = (-1, self.command_trace)
+        self._immediate_command_list[".watch"] = (-1, self.command_watch)
         self._immediate_command_list[".width"] = (1, self.command_width)
 
         #  Set up commands that return sql. Dictionary entries consit of the expected parameter count
@@ -151,6 +189,11 @@ class CommandProcessor:
             else:
                 return True
 
+        #  Commands with optional parameters check their own parameters.
+
+        if expected_num_of_positional_parameters == -1:
+            return True
+
         #  Check the number of expected parameters
 
         _expected_num_of_positional_parameters = expected_num_of_positional_parameters
@@ -240,6 +283,117 @@ class CommandProcessor:
 
     #  Methods to implement built-in commands.
 
+    def command_batch(
+        self, positional_parameters: list[str], named_parameters: list[dict[str, Any]]
+    ) -> str:
+        """command_batch
+
+        Turns batch mode on or off. In batch mode statements are executed in a single transaction
+        which is committed every 'commit_every' statements or 'commit_ms' milliseconds, or by '.commit'.
+        If a question mark is passed as the parameter the current status of batch mode is printed.
+
+        Args:
+            positional_parameters (list[str]): on/off, or ?.
+            named_parameters (list[dict[str, Any]]): 'commit_every' and/or 'commit_ms' when turning batch mode on.
+
+        Returns:
+            str: empty string.
+        """
+        if len(positional_parameters) != 1:
+            print(
+                f"Error: incorrect number of positional parameters. The current command uses 1, and there are {len(positional_parameters)} supplied."
+            )
+            return ""
+
+        _option: str = str(positional_parameters[0]).lower().strip()
+
+        if _option == "on":
+            _named: dict[str, Any] | None = self.get_named_parameters(
+                named_parameters, ["commit_every", "commit_ms"]
+            )
+            if _named is None:
+                return ""
+
+            for _key in _named.keys():
+                if not isinstance(_named[_key], int) or _named[_key] < 0:
+                    print(f"Error: expected positive integer value '{_key}'.")
+                    return ""
+
+            self._database.start_batch(_named.get("commit_every", 0), _named.get("commit_ms", 0))
+
+        elif len(named_parameters) > 0:
+            print("Error: named parameters are only expected with 'on'.")
+
+        elif _option == "off":
+            self._database.stop_batch()
+
+        elif _option == "?":
+            print(self._database.batch_status())
+
+        else:
+            print("Error: expected 'on', 'off' or '?'.")
+
+        return ""
+
+    def command_blobin(
+        self, positional_parameters: list[str], named_parameters: list[dict[str, Any]]
+    ) -> str:
+        """command_blobin
+
+        Copies a file into a blob column of a row, a chunk at a time.
+
+        Args:
+            positional_parameters (list[str]): name of table, column, rowid and file.
+            named_parameters (list[dict[str, Any]]): list of named parameters, none expected.
+
+        Returns:
+            str: empty string.
+        """
+        if self._config.get_config("open") == "None":
+            print("Error: there is no database open.")
+            return ""
+
+        _rowid: Any = positional_parameters[2]
+        if not isinstance(_rowid, int):
+            print("Error: expected integer value 'rowid'.")
+            return ""
+
+        self._database.commit_batch()
+        BlobTransfer(self._database).copy_in(
+            str(positional_parameters[0]), str(positional_parameters[1]), _rowid, str(positional_parameters[3])
+        )
+
+        return ""
+
+    def command_blobout(
+        self, positional_parameters: list[str], named_parameters: list[dict[str, Any]]
+    ) -> str:
+        """command_blobout
+
+        Copies a blob column of a row out to a file, a chunk at a time.
+
+        Args:
+            positional_parameters (list[str]): name of table, column, rowid and file.
+            named_parameters (list[dict[str, Any]]): list of named parameters, none expected.
+
+        Returns:
+            str: empty string.
+        """
+        if self._config.get_config("open") == "None":
+            print("Error: there is no database open.")
+            return ""
+
+        _rowid: Any = positional_parameters[2]
+        if not isinstance(_rowid, int):
+            print("Error: expected integer value 'rowid'.")
+            return ""
+
+        BlobTransfer(self._database).copy_out(
+            str(positional_parameters[0]), str(positional_parameters[1]), _rowid, str(positional_parameters[3])
+        )
+
+        return ""
+
     def command_close(self, positional_parameters: list[str], named_parameters: list[dict[str, Any]]
     ) -> str:
         """command_close
@@ -255,14 +409,125 @@ class CommandProcessor:
         """
         if self._database.close():
             self._config.set_config("open", "None")
+            self._config.set_config("open_mode", "rw")
 
         return ""
     
+    def command_columnar(
+        self, positional_parameters: list[str], named_parameters: list[dict[str, Any]]
+    ) -> str:
+        """command_columnar
+
+        Set the columnar flag. If on, query results are stored compactly by column rather than as a list of tuples.
+        If a question mark is passed as the parameter the current status of the columnar flag is printed.
+
+        Args:
+            positional_parameters (list[str]): on/off, or ?.
+            named_parameters (list[dict[str, Any]]): list of named parameters, ignored.
+
+        Returns:
+            str: empty string.
+        """
+        if str(positional_parameters[0]).lower().strip() == "on":
+            self._config.set_config("columnar", "ON")
+
+        if str(positional_parameters[0]).lower().strip() == "off":
+            self._config.set_config("columnar", "OFF")
+
+        if str(positional_parameters[0]).lower().strip() == "?":
+            print(f"Columnar is {self._config.get_config("columnar")}")
+
+        return ""
+
+    def command_commit(
+        self, positional_parameters: list[str], named_parameters: list[dict[str, Any]]
+    ) -> str:
+        """command_commit
+
+        Commits the open transaction.
+
+        Args:
+            positional_parameters (list[str]): list of positional parameters, ignored.
+            named_parameters (list[dict[str, Any]]): list of named parameters, ignored.
+
+        Returns:
+            str: empty string.
+        """
+        self._database.commit()
+
+        return ""
+
+    def command_copy(
+        self, positional_parameters: list[str], named_parameters: list[dict[str, Any]]
+    ) -> str:
+        """command_copy
+
+        Copies a table from one database to another, as 'source.db:table target.db[:table]'.
+        The parser takes 'file:table' for a named parameter, so the databases and tables are
+        read from the named parameters in order, with a target given without a table as the
+        only positional parameter.
+
+        Args:
+            positional_parameters (list[str]): target database, if given without a table.
+            named_parameters (list[dict[str, Any]]): source and target, and 'where', optional.
+
+        Returns:
+            str: empty string.
+        """
+        _where: str = ""
+        _databases: list[tuple[str, str]] = []
+
+        for _parameter in named_parameters:
+            for _key, _value in _parameter.items():
+                if _key == "where":
+                    _where = str(_value)
+                else:
+                    _databases.append((_key, str(_value)))
+
+        if len(_databases) == 1 and len(positional_parameters) == 1:
+            _databases.append((str(positional_parameters[0]), _databases[0][1]))
+
+        if len(_databases) != 2 or len(positional_parameters) > 1 or "" in [_table for _, _table in _databases]:
+            print("Error: expected 'source.db:table target.db[:table]', optionally with 'where:condition'.")
+            return ""
+
+        #  Commit any open batch so that the copy, made on another connection, includes it and is not blocked by it.
+
+        self._database.commit_batch()
+
+        TableCopier(_databases[0][0], _databases[0][1], _databases[1][0], _databases[1][1], _where).run()
+
+        return ""
+
+    def command_count(
+        self, positional_parameters: list[str], named_parameters: list[dict[str, Any]]
+    ) -> str:
+        """command_count
+
+        Prints the number of rows in each table, or in the given tables. Tables estimated to be small
+        are counted exactly, larger tables are estimated without being scanned.
+
+        Args:
+            positional_parameters (list[str]): names of tables, optional.
+            named_parameters (list[dict[str, Any]]): list of named parameters, none expected.
+
+        Returns:
+            str: empty string.
+        """
+        if len(named_parameters) > 0:
+            print("Error: no named parameters are expected.")
+            return ""
+
+        Sampler(self._database).count([str(_parameter) for _parameter in positional_parameters])
+
+        return ""
+
     def command_create(self, positional_parameters: list[str], named_parameters: list[dict[str, Any]]
     ) -> str:
         """command_create
 
-        Creates a database. Defaults to current working directory if a path is not given.
+        Creates a database, which is then the open database, read-write. Defaults to current working
+        directory if a path is not given.
 
         Args:
             positional_parameters (list[str]): name (and path) of database to create.
@@ -271,7 +536,9 @@ class CommandProcessor:
         Returns:
             str: empty string.
         """
-        self._database.create(positional_parameters[0])
+        if self._database.create(positional_parameters[0]):
+            self._config.set_config("open", str(positional_parameters[0]))
+            self._config.set_config("open_mode", "rw")
 
         return ""
 
@@ -327,6 +594,62 @@ class CommandProcessor:
 
         return ""
 
+    def command_diff(
+        self, positional_parameters: list[str], named_parameters: list[dict[str, Any]]
+    ) -> str:
+        """command_diff
+
+        Compares tables in the open database with another database and prints the rows that differ,
+        or writes a patch of sql statements that makes the open database match the other.
+
+        Args:
+            positional_parameters (list[str]): name of other database, optionally followed by names of tables.
+            named_parameters (list[dict[str, Any]]): 'patch', optional.
+
+        Returns:
+            str: empty string.
+        """
+        if len(positional_parameters) < 1:
+            print("Error: expected name of database to compare with, optionally followed by names of tables.")
+            return ""
+
+        _named: dict[str, Any] | None = self.get_named_parameters(named_parameters, ["patch"])
+        if _named is None:
+            return ""
+
+        if self._config.get_config("open") == "None":
+            print("Error: there is no database open.")
+            return ""
+
+        if not self._database.attach(str(positional_parameters[0]), DIFF_SCHEMA):
+            return ""
+
+        _tables: list[str] = [str(_parameter) for _parameter in positional_parameters[1:]]
+
+        try:
+            if "patch" in _named.keys():
+                with open(str(_named["patch"]), "w") as file:
+                    file.write("BEGIN;\n")
+                    _succeeded: bool = TableDiff(self._database, file).run(_tables)
+                    if _succeeded:
+                        file.write("COMMIT;\n")
+
+                #  A patch from a comparison that failed part way through is incomplete, so it is removed.
+
+                if _succeeded:
+                    print(f"Patch written to '{_named["patch"]}'")
+                else:
+                    remove(str(_named["patch"]))
+                    print(f"Patch '{_named["patch"]}' not written, as the comparison failed")
+            else:
+                TableDiff(self._database, None).run(_tables)
+        except OSError as error:
+            print(f"Error: {error}.")
+        finally:
+            self._database.detach(DIFF_SCHEMA)
+
+        return ""
+
     def command_dir(
         self, positional_parameters: list[str], named_parameters: list[dict[str, Any]]
     ) -> str:
@@ -379,6 +702,39 @@ class CommandProcessor:
 
         return ""
 
+    def command_dump(
+        self, positional_parameters: list[str], named_parameters: list[dict[str, Any]]
+    ) -> str:
+        """command_dump
+
+        Dumps the open database, or the given tables, as an sql script that can be run with '.script'.
+
+        Args:
+            positional_parameters (list[str]): names of tables, optional.
+            named_parameters (list[dict[str, Any]]): 'file', optional.
+
+        Returns:
+            str: empty string.
+        """
+        _named: dict[str, Any] | None = self.get_named_parameters(named_parameters, ["file"])
+        if _named is None:
+            return ""
+
+        if self._config.get_config("open") == "None":
+            print("Error: there is no database open.")
+            return ""
+
+        #  Commit any open batch so that the dump, read on other connections, includes it.
+
+        self._database.commit_batch()
+
+        Dumper(
+            self._config.get_config("open"),
+            "immutable" if self._config.get_config("open_mode") == "immutable" else "ro",
+        ).run([str(_parameter) for _parameter in positional_parameters], str(_named.get("file", "")))
+
+        return ""
+
     def command_edit(
         self, positional_parameters: list[str], named_parameters: list[dict[str, Any]]
     ) -> str:
@@ -412,6 +768,127 @@ class CommandProcessor:
         """
         return ""
 
+    def command_fts(
+        self, positional_parameters: list[str], named_parameters: list[dict[str, Any]]
+    ) -> str:
+        """command_fts
+
+        Builds, searches or drops a full text index on a table. 'build' indexes the given text columns
+        and installs triggers to keep the index up to date, 'search' returns the best matches for
+        a query with snippets of the text, and 'drop' removes the index and its triggers.
+
+        Args:
+            positional_parameters (list[str]): 'build', table and columns, 'search', table and query, or 'drop' and table.
+            named_parameters (list[dict[str, Any]]): 'limit', optional with 'search'.
+
+        Returns:
+            str: sql query for a search, otherwise empty string.
+        """
+        _option: str = str(positional_parameters[0]).lower() if len(positional_parameters) > 0 else ""
+        _sql: str = ""
+
+        _named: dict[str, Any] | None = self.get_named_parameters(
+            named_parameters, ["limit"] if _option == "search" else []
+        )
+        if _named is None:
+            return ""
+
+        if _option == "build" and len(positional_parameters) >= 3:
+            #  Columns may be given separately or separated by commas.
+
+            _columns: list[str] = [
+                _column.strip()
+                for _parameter in positional_parameters[2:]
+                for _column in str(_parameter).split(",")
+                if _column.strip() != ""
+            ]
+
+            self._database.commit_batch()
+            FullTextIndex(self._database, str(positional_parameters[1])).build(_columns)
+
+        elif _option == "search" and len(positional_parameters) == 3:
+            _limit: Any = _named.get("limit", FTS_SEARCH_LIMIT)
+            if not isinstance(_limit, int) or _limit <= 0:
+                print("Error: expected positive integer value 'limit'.")
+            else:
+                _sql = FullTextIndex(self._database, str(positional_parameters[1])).search(
+                    str(positional_parameters[2]), _limit
+                )
+
+        elif _option == "drop" and len(positional_parameters) == 2:
+            self._database.commit_batch()
+            FullTextIndex(self._database, str(positional_parameters[1])).drop()
+
+        else:
+            print("Error: expected 'build' table columns, 'search' table \"query\", or 'drop' table.")
+
+        return _sql
+
+    def command_function(
+        self, positional_parameters: list[str], named_parameters: list[dict[str, Any]]
+    ) -> str:
+        """command_function
+
+        Loads a python module and registers the functions it marks with '@scalar', '@aggregate' or '@window'
+        (from the udf module) as sql functions. If a question mark is passed as the parameter the
+        registered functions are printed.
+
+        Args:
+            positional_parameters (list[str]): python module to load, or ?.
+            named_parameters (list[dict[str, Any]]): list of named parameters, ignored.
+
+        Returns:
+            str: empty string.
+        """
+        if positional_parameters[0] == "?":
+            _functions: list[str] = self._database.functions_status()
+            if len(_functions) == 0:
+                print("There are no functions registered")
+            for _function in _functions:
+                print(_function)
+        else:
+            self._database.register_functions(str(positional_parameters[0]))
+
+        return ""
+
+    def command_generate(
+        self, positional_parameters: list[str], named_parameters: list[dict[str, Any]]
+    ) -> str:
+        """command_generate
+
+        Fills a table with synthetic rows shaped by its schema, for load testing.
+
+        Args:
+            positional_parameters (list[str]): name of table.
+            named_parameters (list[dict[str, Any]]): 'rows', and 'seed', optional.
+
+        Returns:
+            str: empty string.
+        """
+        _named: dict[str, Any] | None = self.get_named_parameters(named_parameters, ["rows", "seed"])
+        if _named is None:
+            return ""
+
+        if len(positional_parameters) != 1 or "rows" not in _named:
+            print("Error: expected name of table and 'rows:number', optionally with 'seed:number'.")
+            return ""
+
+        if not isinstance(_named["rows"], int) or _named["rows"] <= 0:
+            print("Error: expected positive integer value 'rows'.")
+            return ""
+        if not isinstance(_named.get("seed", 0), int):
+            print("Error: expected integer value 'seed'.")
+            return ""
+
+        if self._config.get_config("open") == "None":
+            print("Error: there is no database open.")
+            return ""
+
+        self._database.commit_batch()
+        DataGenerator(self._database, str(positional_parameters[0]), _named.get("seed")).run(_named["rows"])
+
+        return ""
+
     def command_help(
         self, positional_parameters: list[str], named_parameters: list[dict[str, Any]]
     ) -> str:
@@ -436,25 +913,216 @@ class CommandProcessor:
         """command_open
 
         Opens a database. Defaults to current working directory if a path is not given.
+        The database is opened read-write unless 'mode:ro' (read-only) or 'mode:immutable'
+        (read-only, and the file is never changed by anyone) is given.
 
         Args:
             positional_parameters (list[str]): name (and path) of database to open.
-            named_parameters (list[dict[str, Any]]): list of named parameters, ignored.
+            named_parameters (list[dict[str, Any]]): 'mode', optional.
 
         Returns:
             str: empty string.
         """
+        if len(positional_parameters) != 1:
+            print(
+                f"Error: incorrect number of positional parameters. The current command uses 1, and there are {len(positional_parameters)} supplied."
+            )
+            return ""
+
         if positional_parameters[0] == "?":
             if self._config.get_config("open") != "None":
-                print(f"Currently open database is '{self._config.get_config("open")}'")
+                print(
+                    f"Currently open database is '{self._config.get_config("open")}', mode {self._config.get_config("open_mode")}"
+                )
             else:
                 print(f"There is no database open")
         else:
-            if self._database.open(positional_parameters[0]):
+            _named: dict[str, Any] | None = self.get_named_parameters(named_parameters, ["mode"])
+            if _named is None:
+                return ""
+
+            _mode: str = str(_named.get("mode", "rw")).lower()
+            if _mode not in OPEN_MODES.keys():
+                print(f"Error: unknown mode '{_mode}', expected one of {", ".join(OPEN_MODES.keys())}.")
+                return ""
+
+            if self._database.open(str(positional_parameters[0]), _mode):
                 self._config.set_config("open", str(positional_parameters[0]))
+                self._config.set_config("open_mode", _mode)
+
+        return ""
+
+    def command_optimize(
+        self, positional_parameters: list[str], named_parameters: list[dict[str, Any]]
+    ) -> str:
+        """command_optimize
+
+        Runs maintenance on the open database. With no parameters the query planner statistics are
+        refreshed. 'analyze' runs a full analysis, 'vacuum' reclaims all free pages, 'incremental:pages'
+        reclaims the given number of free pages and 'into:file' writes a compacted copy to a new file.
+
+        Args:
+            positional_parameters (list[str]): 'analyze' and/or 'vacuum'.
+            named_parameters (list[dict[str, Any]]): 'incremental' and/or 'into'.
+
+        Returns:
+            str: empty string.
+        """
+        _options: list[str] = [str(_parameter).lower().strip() for _parameter in positional_parameters]
+
+        for _option in _options:
+            if _option not in ["analyze", "vacuum"]:
+                print(f"Error: unknown option '{_option}', expected 'analyze' or 'vacuum'.")
+                return ""
+
+        _named: dict[str, Any] = self.get_named_parameters(named_parameters, ["incremental", "into"])
+        if _named is None:
+            return ""
+
+        _incremental: Any = _named.get("incremental", 0)
+        if not isinstance(_incremental, int) or _incremental < 0:
+            print("Error: expected positive integer value 'incremental'.")
+            return ""
+
+        self._database.optimize(
+            "analyze" in _options,
+            "vacuum" in _options,
+            _incremental,
+            str(_named.get("into", "")),
+        )
+
+        return ""
+
+    def command_pyprof(
+        self, positional_parameters: list[str], named_parameters: list[dict[str, Any]]
+    ) -> str:
+        """command_pyprof
+
+        Turns profiling of the shell itself on or off. When on, each command is profiled and the 'top'
+        functions by cumulative time are printed with the peak Python allocation. If 'dump' names
+        a directory, the profile of each command is also written there as a pstats file.
+        If a question mark is passed as the parameter the current status of profiling is printed.
+
+        Args:
+            positional_parameters (list[str]): on/off, or ?.
+            named_parameters (list[dict[str, Any]]): 'top' and/or 'dump' when turning profiling on.
+
+        Returns:
+            str: empty string.
+        """
+        if len(positional_parameters) != 1:
+            print(
+                f"Error: incorrect number of positional parameters. The current command uses 1, and there are {len(positional_parameters)} supplied."
+            )
+            return ""
+
+        _option: str = str(positional_parameters[0]).lower().strip()
+
+        if _option == "on":
+            _named: dict[str, Any] | None = self.get_named_parameters(named_parameters, ["top", "dump"])
+            if _named is None:
+                return ""
+
+            _top: Any = _named.get("top", 20)
+            if not isinstance(_top, int) or _top < 1:
+                print("Error: expected positive integer value 'top'.")
+                return ""
+
+            self._profiler.start(_top, str(_named.get("dump", "")))
+
+        elif len(named_parameters) > 0:
+            print("Error: named parameters are only expected with 'on'.")
+
+        elif _option == "off":
+            self._profiler.stop()
+
+        elif _option == "?":
+            print(self._profiler.status())
+
+        else:
+            print("Error: expected 'on', 'off' or '?'.")
 
         return ""
 
+    def command_release(
+        self, positional_parameters: list[str], named_parameters: list[dict[str, Any]]
+    ) -> str:
+        """command_release
+
+        Releases a named savepoint, keeping the changes made since it was set.
+
+        Args:
+            positional_parameters (list[str]): name of savepoint.
+            named_parameters (list[dict[str, Any]]): list of named parameters, ignored.
+
+        Returns:
+            str: empty string.
+        """
+        self._database.savepoint(str(positional_parameters[0]), True)
+
+        return ""
+
+    def command_rollback(
+        self, positional_parameters: list[str], named_parameters: list[dict[str, Any]]
+    ) -> str:
+        """command_rollback
+
+        Rolls back the open transaction, or if a savepoint is named rolls back to the savepoint.
+
+        Args:
+            positional_parameters (list[str]): name of savepoint, optional.
+            named_parameters (list[dict[str, Any]]): list of named parameters, ignored.
+
+        Returns:
+            str: empty string.
+        """
+        if len(positional_parameters) > 1 or len(named_parameters) > 0:
+            print("Error: expected at most one positional parameter, the savepoint to roll back to.")
+            return ""
+
+        _savepoint: str = str(positional_parameters[0]) if len(positional_parameters) == 1 else ""
+        self._database.rollback(_savepoint)
+
+        return ""
+
+    def command_sample(
+        self, positional_parameters: list[str], named_parameters: list[dict[str, Any]]
+    ) -> str:
+        """command_sample
+
+        Returns a query for a uniform random sample of the rows of a table.
+
+        Args:
+            positional_parameters (list[str]): name of table and number of rows.
+            named_parameters (list[dict[str, Any]]): list of named parameters, none expected.
+
+        Returns:
+            str: sql query for the sample.
+        """
+        _rows: Any = positional_parameters[1]
+        if not isinstance(_rows, int) or _rows <= 0:
+            print("Error: expected positive integer value 'rows'.")
+            return ""
+
+        return Sampler(self._database).sample(str(positional_parameters[0]), _rows)
+
+    def command_savepoint(
+        self, positional_parameters: list[str], named_parameters: list[dict[str, Any]]
+    ) -> str:
+        """command_savepoint
+
+        Sets a named savepoint within the batch transaction.
+
+        Args:
+            positional_parameters (list[str]): name of savepoint.
+            named_parameters (list[dict[str, Any]]): list of named parameters, ignored.
+
+        Returns:
+            str: empty string.
+        """
+        self._database.savepoint(str(positional_parameters[0]), False)
+
+        return ""
 
     def command_script(
         self, positional_parameters: list[str], named_parameters: list[dict[str, Any]]
@@ -467,7 +1135,8 @@ class CommandProcessor:
         are substituted into the sql string.
 
         If the parameter after the script filename (the second parameter) is a question mark
-        then rather than prepare the script for execution is it just printed out.
+        then rather than prepare the script for execution is it just printed out. If the only
+        parameter is a question mark the state of the script cache is printed.
 
         Args:
             positional_parameters (list[str]): positional parameters to incorporate into sql string.
@@ -476,35 +1145,263 @@ class CommandProcessor:
         Returns:
             str: sql string passed back for execution.
         """
-        _sql: str = self.load_sql_script(positional_parameters[0])
+        #  A question mark instead of a script shows the state of the script cache.
 
-        if len(positional_parameters) == 2 and positional_parameters[1] == "?" and _sql != "":
-            print(_sql)
-            _sql = ""
+        if len(positional_parameters) == 1 and positional_parameters[0] == "?":
+            print(SCRIPT_CACHE.status())
+            return ""
+
+        _script: CompiledScript | None = self.load_sql_script(str(positional_parameters[0]))
+        if _script is None:
+            return ""
 
-        if _sql != "":
-            #  Substitute any question marks for positional parameters.
+        if len(positional_parameters) == 2 and positional_parameters[1] == "?":
+            print(_script.text)
+            return ""
 
-            if "?" in _sql:
-                for _index in range(len(positional_parameters)):
-                    _sql = _sql.replace("?", f"'{positional_parameters[_index]}'", 1)
+        #  Check the named parameters are all used by the script.
 
-            #  Subsitute named paramters for appropriate values.
+        _named: dict[str, Any] = {}
+        for _named_parameter in named_parameters:
+            for key in _named_parameter.keys():
+                if key not in _script.names:
+                    if self._config.get_config("echo") == "ON":
+                        print(_script.text)
+                    print(
+                        f"Error: named parameter '{key}' supplied to but not required."
+                    )
+                    return ""
+                _named[key] = _named_parameter[key]
 
-            for _named_parameter in named_parameters:
-                for key in _named_parameter.keys():
-                    if f":{key}" in _sql:
-                        _sql = _sql.replace(f":{key}", str(_named_parameter[key]), 1)
-                    else:
-                        if self._config.get_config("echo") == "ON":
-                            print(_sql)
-                        print(
-                            f"Error: named parameter '{key}' supplied to but not required."
-                        )
-                        _sql = ""
+        #  Substitute the parameters into the compiled statements, which are handed to the database
+        #  with the script so that it does not split and parse them again.
+
+        _sql, _statements, _inserts = _script.bind(positional_parameters[1:], _named)
+        self._database.prepare_script(_sql, _statements, _inserts, _script.controls_transactions)
 
         return _sql
 
+    def command_slow(
+        self, positional_parameters: list[str], named_parameters: list[dict[str, Any]]
+    ) -> str:
+        """command_slow
+
+        Lists the statements recorded in the history database that took at least the given number
+        of milliseconds, aggregated by fingerprint and ordered by total time.
+
+        Args:
+            positional_parameters (list[str]): minimum time in milliseconds, optional.
+            named_parameters (list[dict[str, Any]]): list of named parameters, none expected.
+
+        Returns:
+            str: empty string.
+        """
+        if len(positional_parameters) > 1 or len(named_parameters) > 0:
+            print("Error: expected at most one positional parameter, the minimum time in milliseconds.")
+            return ""
+
+        _threshold: Any = positional_parameters[0] if len(positional_parameters) == 1 else 0
+        if not isinstance(_threshold, (int, float)) or _threshold < 0:
+            print("Error: expected positive numeric value 'threshold'.")
+            return ""
+
+        try:
+            _query_log: QueryLog = QueryLog(path.join(self._config.config_file_directory, HISTORY_FILENAME))
+            _slow: list[Any] = _query_log.slow(_threshold, SLOW_QUERY_LIMIT)
+            _query_log.close()
+        except Error as error:
+            print("Error: %s." % (" ".join(error.args)))
+            return ""
+
+        if len(_slow) == 0:
+            print("** Empty result set **")
+            return ""
+
+        #  Print the totals, followed by the fingerprint truncated to the output width.
+
+        _width: int = int(self._config.get_config("width"))
+
+        print(f"{'count':>8}{'total ms':>12}{'mean ms':>10}{'max ms':>10}{'rows':>10}{'errors':>8}  sql")
+        for _fingerprint, _count, _total, _mean, _max, _rows, _errors in _slow:
+            _text: str = f"{_count:>8}{_total:>12.1f}{_mean:>10.2f}{_max:>10.2f}{_rows:>10}{_errors:>8}  {_fingerprint}"
+            print(_text if len(_text) <= _width else _text[: _width - 3] + "...")
+
+        return ""
+
+    def command_stress(
+        self, positional_parameters: list[str], named_parameters: list[dict[str, Any]]
+    ) -> str:
+        """command_stress
+
+        Simulates concurrent load on the open database with reader and writer threads,
+        each with its own connection, and reports throughput, latency and lock contention.
+
+        Args:
+            positional_parameters (list[str]): list of positional parameters, none expected.
+            named_parameters (list[dict[str, Any]]): 'readers', 'writers' and/or 'seconds'.
+
+        Returns:
+            str: empty string.
+        """
+        if len(positional_parameters) > 0:
+            print("Error: no positional parameters are expected.")
+            return ""
+
+        _named: dict[str, Any] | None = self.get_named_parameters(
+            named_parameters, ["readers", "writers", "seconds"]
+        )
+        if _named is None:
+            return ""
+
+        for _key in _named.keys():
+            if not isinstance(_named[_key], int) or _named[_key] < 0:
+                print(f"Error: expected positive integer value '{_key}'.")
+                return ""
+
+        if self._config.get_config("open") == "None":
+            print("Error: there is no database open.")
+            return ""
+
+        #  Commit any open batch so that the shell's own connection does not hold a lock during the test.
+
+        self._database.commit_batch()
+
+        StressTest(
+            self._config.get_config("open"),
+            int(self._config.get_config("busy_timeout")),
+            int(self._config.get_config("busy_retries")),
+        ).run(_named.get("readers", 4), _named.get("writers", 1), max(_named.get("seconds", 10), 1))
+
+        return ""
+
+    def command_timeout(
+        self, positional_parameters: list[str], named_parameters: list[dict[str, Any]]
+    ) -> str:
+        """command_timeout
+
+        Sets how long to wait for a locked database before reporting it as locked, and optionally
+        how many times a locked statement is retried. If a question mark is passed as the parameter
+        the current settings and lock contention so far are printed.
+
+        Args:
+            positional_parameters (list[str]): timeout in milliseconds, or ?.
+            named_parameters (list[dict[str, Any]]): 'retries', optional.
+
+        Returns:
+            str: empty string.
+        """
+        if len(positional_parameters) != 1:
+            print(
+                f"Error: incorrect number of positional parameters. The current command uses 1, and there are {len(positional_parameters)} supplied."
+            )
+            return ""
+
+        if positional_parameters[0] == "?":
+            print(self._database.busy_status())
+            return ""
+
+        _named: dict[str, Any] | None = self.get_named_parameters(named_parameters, ["retries"])
+        if _named is None:
+            return ""
+
+        _timeout: Any = positional_parameters[0]
+        _retries: Any = _named.get("retries", int(self._config.get_config("busy_retries")))
+
+        if not isinstance(_timeout, int) or _timeout < 0:
+            print("Error: expected positive integer value 'timeout'.")
+        elif not isinstance(_retries, int) or _retries < 0:
+            print("Error: expected positive integer value 'retries'.")
+        else:
+            self._config.set_config("busy_timeout", str(_timeout))
+            self._config.set_config("busy_retries", str(_retries))
+            self._database.set_busy_handling(_timeout, _retries)
+
+        return ""
+
+    def command_trace(
+        self, positional_parameters: list[str], named_parameters: list[dict[str, Any]]
+    ) -> str:
+        """command_trace
+
+        Turns tracing on or off. When on, every statement executed, including those within scripts,
+        is printed or written to the given trace file, and recorded in the history database with its
+        duration, rows and any error. If a question mark is passed as the parameter the current status
+        of tracing is printed.
+
+        Args:
+            positional_parameters (list[str]): on, optionally followed by trace file, off, or ?.
+            named_parameters (list[dict[str, Any]]): list of named parameters, none expected.
+
+        Returns:
+            str: empty string.
+        """
+        if len(positional_parameters) < 1 or len(positional_parameters) > 2 or len(named_parameters) > 0:
+            print("Error: expected 'on', optionally followed by name of trace file, 'off', or '?'.")
+            return ""
+
+        _option: str = str(positional_parameters[0]).lower().strip()
+
+        if _option == "on":
+            self._database.start_trace(
+                path.join(self._config.config_file_directory, HISTORY_FILENAME),
+                str(positional_parameters[1]) if len(positional_parameters) == 2 else "",
+            )
+
+        elif len(positional_parameters) > 1:
+            print("Error: a trace file is only expected with 'on'.")
+
+        elif _option == "off":
+            self._database.stop_trace()
+
+        elif _option == "?":
+            print(self._database.trace_status())
+
+        else:
+            print("Error: expected 'on', 'off' or '?'.")
+
+        return ""
+
+    def command_watch(
+        self, positional_parameters: list[str], named_parameters: list[dict[str, Any]]
+    ) -> str:
+        """command_watch
+
+        Runs a query and then, until interrupted, re-runs it whenever another connection changes the
+        database, printing only the rows added, removed or changed.
+
+        Args:
+            positional_parameters (list[str]): query to watch, best enclosed in quotation marks.
+            named_parameters (list[dict[str, Any]]): 'interval', optional.
+
+        Returns:
+            str: empty string.
+        """
+        if len(positional_parameters) < 1:
+            print("Error: expected the query to watch.")
+            return ""
+
+        _named: dict[str, Any] | None = self.get_named_parameters(named_parameters, ["interval"])
+        if _named is None:
+            return ""
+
+        _interval: Any = _named.get("interval", WATCH_INTERVAL_MS)
+        if not isinstance(_interval, int) or _interval <= 0:
+            print("Error: expected positive integer value 'interval'.")
+            return ""
+
+        if self._config.get_config("open") == "None":
+            print("Error: there is no database open.")
+            return ""
+
+        #  Commit any open batch, as an open transaction would hide changes made by other connections.
+
+        self._database.commit_batch()
+
+        Watcher(
+            self._database, " ".join(str(_parameter) for _parameter in positional_parameters), _interval
+        ).run()
+
+        return ""
 
     def command_width(
         self, positional_parameters: list[str], named_parameters: list[dict[str, Any]]
@@ -533,21 +1430,41 @@ class CommandProcessor:
 
     #  Helper methods.
 
-    def load_sql_script(self, script: str) -> str:
+    def get_named_parameters(
+        self, named_parameters: list[dict[str, Any]], allowed: list[str]
+    ) -> dict[str, Any] | None:
+        """get_named_parameters
+
+        Merges the list of named parameters into a single dictionary, checking that each is allowed.
+
+        Args:
+            named_parameters (list[dict[str, Any]]): list of named parameters.
+            allowed (list[str]): names of allowed parameters.
+
+        Returns:
+            dict[str, Any] | None: named parameters, or None if an unexpected parameter was supplied.
+        """
+        _named: dict[str, Any] = {}
+
+        for _named_parameter in named_parameters:
+            for _key in _named_parameter.keys():
+                if _key.lower() not in allowed:
+                    print(f"Error: named parameter '{_key}' supplied but not expected.")
+                    return None
+                _named[_key.lower()] = _named_parameter[_key]
+
+        return _named
+
+    def load_sql_script(self, script: str) -> CompiledScript | None:
         """load_sql_script
 
-        Loads an sql script from a file.
+        Loads an sql script from a file, decompressing it if its name ends in '.gz'. Scripts are
+        compiled once and kept in the script cache until the file changes.
 
         Args:
             script (str): name of file containing script.
 
         Returns:
-            str: script sql.
+            CompiledScript | None: compiled script, or None if it could not be read.
         """
-        try:
-            with open(script, "r") as file:
-                _sql_string: str = file.read()
-                return _sql_string
-        except FileNotFoundError as error:
-            print(f"Error: {error}.")
-            return ""
+        return SCRIPT_CACHE.load(script)
@@ -35,20 +35,44 @@ class Config:
         """
         self.config.add_section("config")
 
-        self.config.set("config", "cwd", getcwd())
-        self.config.set("config", "echo", "OFF")
-        self.config.set("config", "open", "None")
-        self.config.set("config", "width", "80")
+        for _key, _value in self.default_config().items():
+            self.config.set("config", _key, _value)
 
         self.save_config()
 
+    def default_config(self) -> dict[str, str]:
+        """default_config
+
+        Gets the default settings.
+
+        Returns:
+            dict[str, str]: default settings.
+        """
+        return {
+            "busy_retries": "5",
+            "busy_timeout": "5000",
+            "columnar": "OFF",
+            "cwd": getcwd(),
+            "echo": "OFF",
+            "open": "None",
+            "open_mode": "rw",
+            "width": "80",
+        }
+
     def load_config(self) -> None:
         """load_settings
 
-        Loads the configuration.
+        Loads the configuration. Settings missing from the configuration file are given their default values.
         """
         self.config.read(path.join(self.config_file_directory, CONFIG_FILENAME))
 
+        if not self.config.has_section("config"):
+            self.config.add_section("config")
+
+        for _key, _value in self.default_config().items():
+            if not self.config.has_option("config", _key):
+                self.config.set("config", _key, _value)
+
     def save_config(self) -> None:
         """save_config
 
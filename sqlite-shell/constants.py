@@ -1,4 +1,128 @@
 CONFIG_FILENAME = "configuration.txt"
+HISTORY_FILENAME = "history.db"
+
+#  Modes in which a database can be opened, with the uri parameters for each. Read-only databases
+#  are memory mapped up to the given size.
+
+OPEN_MODES = {"rw": "mode=rw", "ro": "mode=ro", "immutable": "mode=ro&immutable=1"}
+READ_ONLY_MMAP_SIZE = 2**30
+
+#  Maintenance settings. The analysis limit bounds the number of rows ANALYZE examines per index,
+#  the vacuum chunk is the number of pages freed by each incremental vacuum transaction and the
+#  progress interval is the number of virtual machine instructions between progress reports.
+
+ANALYSIS_LIMIT = 1000
+VACUUM_CHUNK_PAGES = 1000
+PROGRESS_INTERVAL = 100000
+
+#  Lock contention settings. Statements that find the database locked are retried after a random delay
+#  of up to this many milliseconds, doubling with each attempt.
+
+BUSY_BACKOFF_MS = 50
+
+#  Stress test settings. Writers insert rows with a random payload of this size into the scratch table,
+#  readers fetch this many of the most recent rows.
+
+STRESS_TABLE = "shell_stress"
+STRESS_PAYLOAD_BYTES = 100
+STRESS_READ_ROWS = 100
+
+#  Default number of milliseconds between checks for changes by the '.watch' command.
+
+WATCH_INTERVAL_MS = 1000
+
+#  Commands that take a query. In their parameters 'name:value' is only a named parameter if the name is one
+#  of theirs, and other parameters are kept as typed, so that colons and numbers in a query are left alone.
+
+QUERY_COMMANDS = {".fts": ["limit"], ".watch": ["interval"]}
+
+#  Table diff settings. The other database is attached under this name. Each chunk of a table whose summary
+#  differs is split into this many parts, a power of two, until a part has no more than the leaf rows, which
+#  are then compared row by row.
+
+DIFF_SCHEMA = "shell_diff"
+DIFF_FANOUT = 16
+DIFF_LEAF_ROWS = 1000
+
+#  Server settings. Unless another address is given the server listens on a Unix socket with this name in
+#  the configuration directory, and it only listens on a port of one of the local hosts. Requests are lines
+#  of up to the line limit in bytes. Built-in commands that change the connection, that run until interrupted,
+#  that run python code or that read or write other files are not available to clients, nor are the named
+#  parameters of commands that write other files.
+
+SERVER_SOCKET = "shell.sock"
+SERVER_HOSTS = ["127.0.0.1", "::1", "localhost"]
+SERVER_READERS = 4
+SERVER_LINE_LIMIT = 2**24
+SERVER_REJECTED_COMMANDS = [
+    ".batch", ".blobin", ".blobout", ".close", ".copy", ".create", ".cwd", ".delete", ".dump", ".edit", ".exit",
+    ".function", ".open", ".pyprof", ".stress", ".trace", ".watch"
+]
+SERVER_REJECTED_PARAMETERS = {".diff": ["patch"], ".optimize": ["into"]}
+
+#  Dump settings. Rows are gathered into INSERT statements of up to this many bytes, and this many tables
+#  are dumped at the same time. Dumps to files ending in '.gz' are compressed at this level.
+
+DUMP_STATEMENT_BYTES = 1000000
+DUMP_WORKERS = 4
+DUMP_COMPRESS_LEVEL = 1
+
+#  Tables estimated to have up to this many rows are counted exactly by '.count'. Without statistics, rows
+#  are estimated from the first this many pages of a table's b-tree. A sample is drawn by probing random
+#  rowids until this many probes per row sampled have been made.
+
+COUNT_EXACT_ROWS = 1000000
+COUNT_SAMPLE_PAGES = 1000
+SAMPLE_MAX_PROBES = 10
+
+#  Full text index settings. Indexes are filled this many rows per transaction, and search snippets show
+#  up to this many words.
+
+FTS_BATCH_ROWS = 50000
+FTS_SNIPPET_TOKENS = 12
+FTS_SEARCH_LIMIT = 20
+
+#  Blobs are copied to and from files in chunks of this many bytes. Blobs longer than this many bytes
+#  are displayed as a summary of their size rather than in full.
+
+BLOB_CHUNK_BYTES = 2**20
+BLOB_DISPLAY_BYTES = 64
+
+#  Name a source database is attached as by '.copy', which copies this many rowids per transaction.
+
+COPY_SCHEMA = "shell_copy"
+COPY_CHUNK_ROWS = 100000
+
+#  Synthetic rows are generated and inserted this many at a time, and committed this many at a time.
+#  A share of the values of nullable columns are NULL. Dates go back about this many seconds, and text
+#  is drawn from a pool of this many values. The higher the skew, the more some values outnumber others.
+
+GENERATE_BATCH_ROWS = 10000
+GENERATE_COMMIT_ROWS = 500000
+GENERATE_NULL_RATIO = 0.05
+GENERATE_DATE_RANGE = 5 * 365 * 24 * 3600
+GENERATE_POOL_VALUES = 10000
+GENERATE_SKEW = 0.8
+
+#  Number of compiled scripts kept by the script cache.
+
+SCRIPT_CACHE_ENTRIES = 64
+
+#  Number of statement fingerprints listed by the slow query report. The parameters of a statement executed
+#  for many rows are logged for up to this many rows, with the number of rows.
+
+SLOW_QUERY_LIMIT = 20
+TRACE_PARAMETER_ROWS = 10
+
+#  Number of rows read from the cursor at a time when storing results in columns.
+
+RESULT_BATCH_ROWS = 10000
+
+#  Script settings. Runs of simple inserts in a script are executed in batches of this many rows, each
+#  within a savepoint of this name so that a failing batch can be undone and its inserts run one at a time.
+
+INSERT_BATCH_ROWS = 10000
+INSERT_BATCH_SAVEPOINT = "shell_insert_batch"
 
 INFO = "Simple SQLite Shell. v.1.0.0 - Barrowcroft, Dec 2023"
 
@@ -15,20 +139,60 @@ script using the .script command.
 There are a number of built-in commands:
 
     .create     creates a database - provide name of database.
-    .open       opens a database - provide name of database, or '?'.
+    .open       opens a database - provide name of database, optionally with 'mode:ro' or 'mode:immutable', or '?'.
     .close      closes the current database.
     .delete     deletes a database - provide name of database.
 
     .schema     shows the database schema.
     .tables     lists tables in database.
+    .count      counts the rows in tables, exactly if cheap or estimated otherwise - optionally provide names of tables.
+    .sample     shows a random sample of the rows in a table - provide name of table and number of rows.
+    .fts        full text search - provide 'build', name of table and names of text columns to index them, 'search',
+                name of table and query in quotes, optionally with 'limit:rows', or 'drop' and name of table.
     .describe   describes a named table - provide name of table.
+    .dump       dumps the database as an sql script - optionally provide names of tables, and 'file:name' to write
+                to, compressed if the name ends in '.gz'.
+    .blobin     copies a file into a blob - provide name of table, column, rowid and file.
+    .blobout    copies a blob out to a file - provide name of table, column, rowid and file.
+    .copy       copies a table to another database - provide 'source.db:table target.db', optionally with ':table'
+                to rename it, and optionally 'where:condition' to copy only some rows.
+    .generate   fills a table with synthetic rows for load testing - provide name of table and 'rows:number',
+                optionally with 'seed:number' to repeat the same rows.
+
+    .optimize   optimizes the database - optionally provide 'analyze', 'vacuum', 'incremental:pages' or 'into:file'.
+    .diff       compares tables with another database - provide name of database, optionally followed by names
+                of tables, and optionally 'patch:file' to write sql that makes this database match the other.
+
+    .batch      turns on/off batch mode, keeping one transaction open across statements - provide 'on' or 'off', or '?'.
+                With 'on' optionally provide 'commit_every:statements' and/or 'commit_ms:milliseconds'. Default 'off'.
+    .commit     commits the open transaction.
+    .rollback   rolls back the open transaction - optionally provide name of savepoint to roll back to.
+    .savepoint  sets a savepoint in batch mode - provide name of savepoint.
+    .release    releases a savepoint - provide name of savepoint.
+
+    .timeout    sets the busy timeout in milliseconds - provide timeout, optionally with 'retries:count', or '?'.
+                Default = 5000 with 5 retries.
+    .stress     simulates concurrent load on the open database - optionally provide 'readers:count',
+                'writers:count' and 'seconds:duration'. Default = 4 readers, 1 writer for 10 seconds.
+
+    .trace      turns on/off tracing of every statement executed, and recording of statements in the
+                history database - provide 'on', optionally with name of trace file, or 'off', or '?'. Default 'off'.
+    .slow       lists the slowest recorded statements by total time - optionally provide minimum time in milliseconds.
+    .watch      re-runs a query, in quotes, whenever the database changes and shows the rows added, removed or
+                changed - optionally provide 'interval:milliseconds'. Default = 1000. Stop with ctrl-c.
+    .pyprof     turns on/off profiling of the shell itself - provide 'on' or 'off', or '?'. With 'on' optionally
+                provide 'top:count' functions to list and 'dump:directory' to write pstats files to. Default 'off'.
 
     .cwd        sets the current working directory  - provide path of directory, or '?'.
     .dir        lists files in the current working directory.
 
+    .columnar   turns on/off compact column storage of results - provide 'on' or 'off', or '?'. Default 'off'.
     .echo       turns on/off echoing of sql when executing script - provide 'on' or 'off', or '?'. Default 'off'.
     .edit       starts the system editor.
-    .script     executes a script - provide name of script, or '?'.
+    .function   registers the sql functions marked in a python module - provide name of module, or '?'.
+    .script     executes a script, which may be compressed with gzip - provide name of script, followed by '?' to
+                show it, or '?' alone to show the script cache. A failing statement stops the script, and the
+                statements before it are kept.
     .width      sets the width of the pretty-printed output - provide width,  or '?'. Default = 80.
 
     .exit       exits the shell.
@@ -1,14 +1,40 @@
+from collections.abc import Callable, Iterable, Iterator, Sequence
+from contextlib import contextmanager
+from importlib.util import module_from_spec, spec_from_file_location
 from os import path, remove
+from random import uniform
 from sqlite3 import (
+    Blob,
     Connection,
     Cursor,
     Error,
     IntegrityError,
     OperationalError,
     ProgrammingError,
+    SQLITE_BUSY,
+    SQLITE_LIMIT_LENGTH,
+    SQLITE_LIMIT_SQL_LENGTH,
+    SQLITE_LOCKED,
     connect,
 )
-from typing import Any
+from time import perf_counter, sleep
+from typing import Any, TextIO
+
+from constants import (
+    ANALYSIS_LIMIT,
+    BUSY_BACKOFF_MS,
+    INSERT_BATCH_ROWS,
+    INSERT_BATCH_SAVEPOINT,
+    OPEN_MODES,
+    PROGRESS_INTERVAL,
+    READ_ONLY_MMAP_SIZE,
+    RESULT_BATCH_ROWS,
+    VACUUM_CHUNK_PAGES,
+)
+from insertbatcher import InsertBatcher
+from querylog import QueryLog
+from resultset import ResultSet
+from udf import find_functions
 
 
 class Database:
@@ -24,13 +50,50 @@ class Database:
         """
         self._conn: Connection
         self._cur: Cursor
+        self._filename: str = ""
+        self._mode: str = "rw"
+
+        self._results: Sequence[Any] = []
+
+        #  Batch mode keeps a transaction open across statements, committing it every
+        #  so many statements or milliseconds. Zero disables the corresponding limit.
+
+        self._batch: bool = False
+        self._commit_every: int = 0
+        self._commit_ms: int = 0
+        self._batch_statements: int = 0
+        self._batch_started: float = 0.0
+
+        #  Lock contention handling. The busy timeout is applied to each connection, and statements
+        #  that still find the database locked are retried with a jittered backoff. The number of retries
+        #  and the time spent waiting on locks are counted.
+
+        self._busy_timeout: int = 5000
+        self._busy_retries: int = 5
+        self._lock_retries: int = 0
+        self._lock_wait: float = 0.0
+
+        #  Tracing. When on, each statement is written to the console or a trace file as it is
+        #  executed, and recorded with its duration, rows and any error in the query log.
 
-        self._results: list[Any] = []
+        self._query_log: QueryLog | None = None
+        self._trace_file: TextIO | None = None
+
+        #  Python functions registered on the connection, re-registered whenever a database is opened.
+        #  Each is recorded by kind, sql name, number of arguments, function or class, and deterministic flag.
+
+        self._functions: list[tuple[str, str, int, Any, bool]] = []
+
+        #  A script already split into statements, with its inserts parsed, waiting to be executed.
+
+        self._prepared: tuple[str, list[str], list[Any], bool] | None = None
 
     def create(self, filename: str) -> bool:
         """create
 
-        Creates and connects to a new database.
+        Creates and connects to a new database. Once the file is created it is opened as any other
+        database is, read-write, so that it is set up in the same way and the mode of the database
+        open before it does not carry over.
 
         Args:
             filename (str): database to open.
@@ -38,20 +101,24 @@ class Database:
             bool: flag indicating success.
         """
         try:
-            self._conn = connect(filename)
+            connect(filename, timeout=self._busy_timeout / 1000).close()
         except Error as error:
             print("Error: %s." % (" ".join(error.args)))
             return False
 
-        return True
+        return self.open(filename, "rw")
 
-    def open(self, filename: str) -> bool:
+    def open(self, filename: str, mode: str = "rw") -> bool:
         """open
 
-        Opens a named database.
+        Opens a named database. The database is opened read-write by default. In 'ro' mode it is
+        opened read-only, and in 'immutable' mode SQLite is also told that the file cannot change,
+        so no locking or change detection is done. This suits snapshots on read-only or shared storage.
+        Both read-only modes map the file into memory and reject any statement that would write.
 
         Args:
             filename (str): database to open.
+            mode (str): 'rw', 'ro' or 'immutable'.
 
         Returns:
             bool: flag indicating success.
@@ -68,27 +135,61 @@ class Database:
             print(f"Error: '{filename}' is a directory not a file..")
             return False
 
-        #  Try to connect and report error if connection fails.
+        #  Commit any open batch on the current database before connecting to another.
+
+        self.commit_batch()
+
+        #  Try to connect and report error if connection fails. Characters with a meaning in a uri are escaped.
+
+        _uri: str = filename.replace("%", "%25").replace("?", "%3f").replace("#", "%23")
+        _uri = f"file:{_uri}?{OPEN_MODES[mode]}"
 
         try:
-            self._conn = connect(f"file:{filename}?mode=rw", uri=True)
+            self._conn = connect(_uri, uri=True, timeout=self._busy_timeout / 1000)
             self._conn.execute("PRAGMA schema_version;")
         except Error as error:
             print("Error: %s." % (" ".join(error.args)))
             return False
 
-        #  If connection succeeds store the cursor.
+        #  If connection succeeds store the cursor, filename and mode.
         self._cur = self._conn.cursor()
+        self._filename = filename
+        self._mode = mode
+
+        if self._query_log is not None:
+            self._conn.set_trace_callback(self.trace_statement)
+
+        if not self.apply_functions():
+            return False
 
-        #  Some simple set up.
+        #  Some simple set up. Read-only databases are memory mapped and refuse writes before they are attempted.
 
-        self._conn.execute("PRAGMA foreign_keys = ON;")
+        #  Transactions that write take the write lock when they begin, as a transaction that has read cannot
+        #  wait for a writer to finish and then write itself, so retrying its statements would not help.
+
+        if mode == "rw":
+            self._conn.execute("PRAGMA foreign_keys = ON;")
+            self._conn.isolation_level = "IMMEDIATE"
+        else:
+            self._conn.execute(f"PRAGMA mmap_size = {READ_ONLY_MMAP_SIZE};")
+            self._conn.execute("PRAGMA query_only = ON;")
 
         # print("SQLite_shell connected.")
         return True
 
+    def mode(self) -> str:
+        """mode
+
+        Gets the mode the database was opened in.
+
+        Returns:
+            str: 'rw', 'ro' or 'immutable'.
+        """
+        return self._mode
+
     def close(self) -> bool:
         try:
+            self.commit_batch()
             self._conn.close()
         except AttributeError:
             print("Error: not currently connected to an open database..")
@@ -126,7 +227,7 @@ class Database:
 
         return True
 
-    def execute_sql(self, sql: str, echo: str) -> list[Any]:
+    def execute_sql(self, sql: str, echo: str, columnar: str = "OFF") -> Sequence[Any]:
         """execute_sql
 
         Executes a string as sql, passing parameters if available.
@@ -135,14 +236,15 @@ class Database:
             sql (str): sql to execute.
             parameters (list[dict[str, Any]]): parameters to pass to sql.
             echo (bool): flag indicating if sql should be echoed to console.
+            columnar (str): flag indicating if results should be stored in columns rather than as a list of tuples.
 
         Returns:
-            list[Any]: results of executing sql.
+            Sequence[Any]: results of executing sql, a list of tuples or a ResultSet.
         """
 
         #  Initialise variables.
 
-        self._results: list[Any] = []
+        self._results = []
 
         #  If echo is on and string is not blank then echo sql to console.
 
@@ -154,14 +256,20 @@ class Database:
 
         if sql != "":
             try:
-                with self._conn:
+                with self.transaction():
                     try:
                         if sql.count(";") > 1:
-                            self._cur.executescript(sql)
+                            self.execute_script(sql)
                         else:
-                            self._cur.execute(sql)
-                            self._results = self._cur.fetchall()
-                        if self._results == []:
+                            self._results = self.traced(
+                                sql,
+                                None,
+                                lambda: self.fetch_results(
+                                    self.retry_if_locked(lambda: self._cur.execute(sql)), columnar
+                                ),
+                            )
+                            self._batch_statements += 1
+                        if len(self._results) == 0:
                             print("** Empty result set **")
                     except IntegrityError as error:
                         print("Error: %s." % (" ".join(error.args)))
@@ -172,10 +280,1062 @@ class Database:
                     except ProgrammingError as error:
                         print("Error: %s." % (" ".join(error.args)))
                         self._results = []
+
+                if self._batch:
+                    self.commit_batch_if_due()
+
             except AttributeError as error:
                 print(
                     f"Error: could not execute sql - {error}. Maybe database is not open.."
                 )
                 self._results = []
+            except Error as error:
+                print("Error: %s." % (" ".join(error.args)))
+                self._results = []
+
+            if self._query_log is not None:
+                self._query_log.flush()
+
+        self._prepared = None
 
         return self._results
+
+    def fetch_results(self, cursor: Cursor, columnar: str) -> Sequence[Any]:
+        """fetch_results
+
+        Fetches the results of an executed query, either as a list of tuples or, if columnar
+        is on, into a ResultSet which stores each column compactly.
+
+        Args:
+            cursor (Cursor): cursor of executed query.
+            columnar (str): flag indicating if results should be stored in columns.
+
+        Returns:
+            Sequence[Any]: results.
+        """
+        if columnar == "ON":
+            return ResultSet(cursor, RESULT_BATCH_ROWS)
+
+        return cursor.fetchall()
+
+    def execute_script(self, sql: str) -> None:
+        """execute_script
+
+        Executes a script of several statements. Runs of consecutive simple inserts into the same table
+        with the same number of values are executed as a single parameterised statement through
+        executemany, in batches within one transaction. All other statements are executed one at a time,
+        as executescript would. Scripts that control their own transactions are passed to executescript,
+        which commits any open batch first.
+
+        As with executescript, a failing statement stops the script and the statements before it are kept.
+        If a batch fails, it is undone and its inserts are executed one at a time, so that the inserts
+        before the failing one are kept and the error is reported for the failing insert.
+
+        A script prepared with 'prepare_script' is not split or parsed again.
+
+        Args:
+            sql (str): script to execute.
+        """
+        _batcher: InsertBatcher = InsertBatcher()
+        _statements: list[str]
+        _inserts: list[Any] | None = None
+        _controls_transactions: bool
+
+        if self._prepared is not None and self._prepared[0] is sql:
+            _, _statements, _inserts, _controls_transactions = self._prepared
+        else:
+            _statements = _batcher.split_statements(sql)
+            _controls_transactions = _batcher.controls_transactions(_statements)
+        self._prepared = None
+
+        #  A script that controls its own transactions already avoids a commit per statement,
+        #  and is executed as it stands.
+
+        if _controls_transactions:
+            self.traced(sql, None, lambda: self._cur.executescript(sql))
+            return
+
+        _shape: tuple[str, int] | None = None
+        _rows: list[tuple[Any, ...]] = []
+        _run: list[str] = []
+
+        #  In batch mode the statements join the open batch transaction. Otherwise switch to autocommit
+        #  so that transactions are controlled here rather than implicitly, each run of inserts having
+        #  its own transaction. As with executescript, this commits any pending transaction.
+
+        _isolation_level: str | None = self._conn.isolation_level
+        if not self._batch:
+            self._conn.isolation_level = None
+
+        try:
+            for _index, _statement in enumerate(_statements):
+                _insert = _inserts[_index] if _inserts is not None else _batcher.parse_insert(_statement)
+                self._batch_statements += 1
+
+                #  Add inserts with the same shape as the current run to the batch.
+
+                if _insert is not None and (_insert[0], _insert[1]) == _shape:
+                    _rows.extend(_insert[2])
+                    _run.append(_statement)
+                    if len(_rows) >= INSERT_BATCH_ROWS:
+                        self.execute_insert_batch(_shape, _rows, _run)
+                        _rows = []
+                        _run = []
+                    continue
+
+                #  The run has ended, so insert what remains of it and commit the run's transaction.
+
+                if _shape is not None:
+                    self.execute_insert_batch(_shape, _rows, _run)
+                    if not self._batch:
+                        self.retry_if_locked(lambda: self._cur.execute("COMMIT;"))
+                    _shape = None
+
+                if _insert is None:
+                    self.traced(
+                        _statement, None, lambda: self.retry_if_locked(lambda: self._cur.execute(_statement))
+                    )
+                else:
+                    #  Start a new run within a transaction. The write lock is taken immediately
+                    #  so that the run cannot find the database locked part way through.
+
+                    if not self._batch:
+                        self.retry_if_locked(lambda: self._cur.execute("BEGIN IMMEDIATE;"))
+                    _shape = (_insert[0], _insert[1])
+                    _rows = list(_insert[2])
+                    _run = [_statement]
+
+            if _shape is not None:
+                self.execute_insert_batch(_shape, _rows, _run)
+                if not self._batch:
+                    self.retry_if_locked(lambda: self._cur.execute("COMMIT;"))
+                _shape = None
+
+        finally:
+            #  If an error ended a run part way through, keep the inserts before the error, as executescript would.
+
+            if _shape is not None and not self._batch and self._conn.in_transaction:
+                self._cur.execute("COMMIT;")
+            self._conn.isolation_level = _isolation_level
+
+    def prepare_script(self, sql: str, statements: list[str], inserts: list[Any], controls_transactions: bool) -> None:
+        """prepare_script
+
+        Provides the statements of a script about to be executed, already split and with their inserts
+        parsed, so that 'execute_script' does not split and parse it again. Only the same string object
+        is taken to be the prepared script, and the preparation is used at most once.
+
+        Args:
+            sql (str): script to be executed.
+            statements (list[str]): statements of script.
+            inserts (list[Any]): parsed insert of each statement, or None if it is not a simple insert.
+            controls_transactions (bool): flag indicating if the script controls its own transactions.
+        """
+        self._prepared = (sql, statements, inserts, controls_transactions)
+
+    def execute_insert_batch(self, shape: tuple[str, int], rows: list[tuple[Any, ...]], statements: list[str]) -> None:
+        """execute_insert_batch
+
+        Inserts a batch of rows with a single parameterised statement. If the batch fails it is undone,
+        back to a savepoint, and the insert statements it was made from are executed one at a time instead,
+        so that those before the failing statement take effect and the failing one raises its error.
+
+        Args:
+            shape (tuple[str, int]): target table and number of values per row.
+            rows (list[tuple[Any, ...]]): rows to insert.
+            statements (list[str]): insert statements the rows were parsed from.
+        """
+        if len(rows) > 0:
+            _table, _count = shape
+            _placeholders: str = ", ".join(["?"] * _count)
+            _sql: str = f"INSERT INTO {_table} VALUES ({_placeholders});"
+
+            self._cur.execute(f"SAVEPOINT {INSERT_BATCH_SAVEPOINT};")
+            try:
+                self.traced(_sql, rows, lambda: self._cur.executemany(_sql, rows))
+            except BaseException as error:
+                self._cur.execute(f"ROLLBACK TO {INSERT_BATCH_SAVEPOINT};")
+                self._cur.execute(f"RELEASE {INSERT_BATCH_SAVEPOINT};")
+                if not isinstance(error, Error):
+                    raise
+
+                for _statement in statements:
+                    self.traced(_statement, None, lambda: self._cur.execute(_statement))
+                return
+
+            self._cur.execute(f"RELEASE {INSERT_BATCH_SAVEPOINT};")
+
+    def register_functions(self, filename: str) -> bool:
+        """register_functions
+
+        Loads a python module and registers the scalar, aggregate and window functions it marks
+        on the connection. The registrations are kept and repeated whenever a database is opened.
+
+        Args:
+            filename (str): python module to load.
+
+        Returns:
+            bool: flag indicating success.
+        """
+        if not path.isfile(filename):
+            print(f"Error: module '{filename}' does not exist..")
+            return False
+
+        #  Load the module. Any error raised by the module's own code is reported.
+
+        try:
+            _spec = spec_from_file_location(path.splitext(path.basename(filename))[0], filename)
+            if _spec is None or _spec.loader is None:
+                print(f"Error: '{filename}' is not a python module..")
+                return False
+            _module = module_from_spec(_spec)
+            _spec.loader.exec_module(_module)
+        except Exception as error:
+            print(f"Error: could not load '{filename}' - {error}.")
+            return False
+
+        _functions: list[tuple[str, str, int, Any, bool]] = find_functions(_module)
+        if len(_functions) == 0:
+            print(f"Error: '{filename}' does not mark any functions with @scalar, @aggregate or @window.")
+            return False
+
+        #  Replace any earlier registration with the same name and number of arguments.
+
+        for _function in _functions:
+            self._functions = [
+                _registered
+                for _registered in self._functions
+                if (_registered[1].lower(), _registered[2]) != (_function[1].lower(), _function[2])
+            ]
+            self._functions.append(_function)
+            print(f"Registered {_function[0]} function '{_function[1]}' ({_function[2]} arguments)")
+
+        return self.apply_functions()
+
+    def apply_functions(self) -> bool:
+        """apply_functions
+
+        Registers the python functions on the connection, if there is one.
+
+        Returns:
+            bool: flag indicating success.
+        """
+        try:
+            for _kind, _name, _arguments, _function, _deterministic in self._functions:
+                if _kind == "scalar":
+                    self._conn.create_function(_name, _arguments, _function, deterministic=_deterministic)
+                elif _kind == "aggregate":
+                    self._conn.create_aggregate(_name, _arguments, _function)
+                else:
+                    self._conn.create_window_function(_name, _arguments, _function)
+        except (AttributeError, ProgrammingError):
+            pass
+        except Error as error:
+            print(f"Error: could not register function - {error}.")
+            return False
+
+        return True
+
+    def functions_status(self) -> list[str]:
+        """functions_status
+
+        Describes the registered python functions.
+
+        Returns:
+            list[str]: description of each function.
+        """
+        return [
+            f"{_kind} '{_name}' ({_arguments} arguments){', deterministic' if _deterministic else ''}"
+            f" - {_function.__module__}.{_function.__qualname__}"
+            for _kind, _name, _arguments, _function, _deterministic in self._functions
+        ]
+
+    def traced(self, sql: str, parameters: Any, operation: Callable[[], Any]) -> Any:
+        """traced
+
+        Performs an operation executing sql. If tracing is on, the duration, the number of rows
+        returned or changed, and any error are recorded in the query log.
+
+        Args:
+            sql (str): sql executed by the operation.
+            parameters (Any): parameters passed to sql, or None.
+            operation (Callable[[], Any]): operation to perform.
+
+        Returns:
+            Any: result of the operation.
+        """
+        if self._query_log is None:
+            return operation()
+
+        _started: float = perf_counter()
+
+        try:
+            _result: Any = operation()
+        except Error as error:
+            self._query_log.record(
+                self._filename, sql, parameters, perf_counter() - _started, 0, " ".join(error.args)
+            )
+            raise
+
+        _rows: int = (
+            len(_result)
+            if isinstance(_result, (list, ResultSet)) and len(_result) > 0
+            else max(self._cur.rowcount, 0)
+        )
+        self._query_log.record(self._filename, sql, parameters, perf_counter() - _started, _rows, None)
+
+        return _result
+
+    def start_trace(self, history_filename: str, trace_filename: str) -> bool:
+        """start_trace
+
+        Turns tracing on. Each statement executed, including those within scripts and triggers, is written
+        to the trace file, or the console if no file is given. Statements are also recorded in the history database.
+
+        Args:
+            history_filename (str): history database in which to record statements.
+            trace_filename (str): file to write statements to, or empty string for the console.
+
+        Returns:
+            bool: flag indicating success.
+        """
+        self.stop_trace()
+
+        try:
+            if trace_filename != "":
+                self._trace_file = open(trace_filename, "a")
+            self._query_log = QueryLog(history_filename)
+        except (OSError, Error) as error:
+            print(f"Error: {error}.")
+            self.stop_trace()
+            return False
+
+        try:
+            self._conn.set_trace_callback(self.trace_statement)
+        except (AttributeError, ProgrammingError):
+            pass
+
+        return True
+
+    def stop_trace(self) -> None:
+        """stop_trace
+
+        Turns tracing off, closing the trace file and history database.
+        """
+        try:
+            self._conn.set_trace_callback(None)
+        except (AttributeError, ProgrammingError):
+            pass
+
+        if self._trace_file is not None:
+            self._trace_file.close()
+            self._trace_file = None
+
+        if self._query_log is not None:
+            self._query_log.close()
+            self._query_log = None
+
+    def trace_status(self) -> str:
+        """trace_status
+
+        Describes the state of tracing.
+
+        Returns:
+            str: description of tracing.
+        """
+        if self._query_log is None:
+            return "Trace is OFF"
+        if self._trace_file is not None:
+            return f"Trace is ON, writing to '{self._trace_file.name}'"
+
+        return "Trace is ON"
+
+    def trace_statement(self, statement: str) -> None:
+        """trace_statement
+
+        Trace callback. Writes an executed statement to the trace file or console.
+
+        Args:
+            statement (str): statement executed.
+        """
+        if self._trace_file is not None:
+            self._trace_file.write(f"{statement}\n")
+        else:
+            print(f"-- {statement}")
+
+    @contextmanager
+    def transaction(self) -> Iterator[None]:
+        """transaction
+
+        Provides the context in which statements are executed. Outside batch mode each statement
+        is committed, or rolled back if interrupted. In batch mode the batch transaction is begun
+        if necessary, taking the write lock, and statements are executed within it.
+
+        Yields:
+            Iterator[None]: context in which to execute statements.
+        """
+        if self._batch and not self._conn.in_transaction:
+            self.retry_if_locked(lambda: self._conn.execute("BEGIN IMMEDIATE;"))
+            self._batch_statements = 0
+            self._batch_started = perf_counter()
+
+        try:
+            yield
+            if not self._batch and self._conn.in_transaction:
+                self.retry_if_locked(self._conn.commit)
+        except BaseException:
+            if not self._batch and self._conn.in_transaction:
+                self._conn.rollback()
+            raise
+
+    def retry_if_locked(self, operation: Callable[[], Any]) -> Any:
+        """retry_if_locked
+
+        Performs an operation, retrying it with a jittered exponential backoff if the database is
+        still locked once the busy timeout has expired. Retries are counted, and once an operation has
+        found the database locked the whole of the time until it succeeds or fails is counted as waiting,
+        including the time blocked in the busy timeout of each attempt.
+
+        The operation is retried as a whole, so it should be a statement outside a transaction, a
+        statement in a transaction that holds the write lock, or a whole transaction.
+
+        Args:
+            operation (Callable[[], Any]): operation to perform.
+
+        Returns:
+            Any: result of the operation.
+        """
+        _attempt: int = 0
+        _started: float = perf_counter()
+
+        try:
+            while True:
+                try:
+                    return operation()
+                except OperationalError as error:
+                    if _attempt >= self._busy_retries or error.sqlite_errorcode & 0xFF not in [
+                        SQLITE_BUSY,
+                        SQLITE_LOCKED,
+                    ]:
+                        raise
+
+                    _attempt += 1
+                    sleep(uniform(0, BUSY_BACKOFF_MS * 2**_attempt) / 1000)
+
+                    self._lock_retries += 1
+        finally:
+            if _attempt > 0:
+                self._lock_wait += perf_counter() - _started
+
+    def set_busy_handling(self, busy_timeout: int, busy_retries: int) -> None:
+        """set_busy_handling
+
+        Sets the busy timeout and the number of times a locked statement is retried.
+
+        Args:
+            busy_timeout (int): milliseconds to wait for a lock before reporting the database as locked.
+            busy_retries (int): number of times to retry a statement that finds the database locked.
+        """
+        self._busy_timeout = busy_timeout
+        self._busy_retries = busy_retries
+
+        try:
+            self._conn.execute(f"PRAGMA busy_timeout = {busy_timeout};")
+        except (AttributeError, ProgrammingError):
+            pass
+
+    def execute_with_retry(self, sql: str, parameters: tuple[Any, ...] = ()) -> list[Any]:
+        """execute_with_retry
+
+        Executes a single statement, retrying it if the database is locked. Errors are not reported
+        but raised to the caller.
+
+        Args:
+            sql (str): sql to execute.
+            parameters (tuple[Any, ...]): parameters to pass to sql.
+
+        Returns:
+            list[Any]: results of executing sql.
+        """
+        return self.retry_if_locked(lambda: self._conn.execute(sql, parameters).fetchall())
+
+    def execute_transaction(self, statements: list[tuple[str, tuple[Any, ...]]]) -> None:
+        """execute_transaction
+
+        Executes statements in one transaction, which takes the write lock when it begins. If the database
+        is locked the transaction is rolled back and retried as a whole. Errors are not reported but raised
+        to the caller.
+
+        Args:
+            statements (list[tuple[str, tuple[Any, ...]]]): sql to execute, with the parameters to pass to it.
+        """
+        self.retry_if_locked(lambda: self.attempt_transaction(statements))
+
+    def attempt_transaction(self, statements: list[tuple[str, tuple[Any, ...]]]) -> None:
+        """attempt_transaction
+
+        Executes statements in one transaction, which takes the write lock when it begins. The transaction
+        is rolled back if any statement fails.
+
+        Args:
+            statements (list[tuple[str, tuple[Any, ...]]]): sql to execute, with the parameters to pass to it.
+        """
+        self._conn.execute("BEGIN IMMEDIATE;")
+        try:
+            for _sql, _parameters in statements:
+                self._conn.execute(_sql, _parameters)
+            self._conn.execute("COMMIT;")
+        except BaseException:
+            if self._conn.in_transaction:
+                self._conn.execute("ROLLBACK;")
+            raise
+
+    def execute_many(self, sql: str, rows: Iterable[Sequence[Any]]) -> int:
+        """execute_many
+
+        Executes a single statement for each of a number of rows of parameters, retrying it if the
+        database is locked. Errors are not reported but raised to the caller.
+
+        Args:
+            sql (str): sql to execute.
+            rows (Iterable[Sequence[Any]]): parameters for each execution.
+
+        Returns:
+            int: number of rows changed.
+        """
+        return self.retry_if_locked(lambda: self._conn.executemany(sql, rows).rowcount)
+
+    def execute_query(self, sql: str) -> tuple[list[str], list[Any]]:
+        """execute_query
+
+        Executes a query, retrying it if the database is locked. Errors are not reported
+        but raised to the caller.
+
+        Args:
+            sql (str): query to execute.
+
+        Returns:
+            tuple[list[str], list[Any]]: names of the result columns and the rows.
+        """
+        _cursor: Cursor = self.retry_if_locked(lambda: self._conn.execute(sql))
+
+        return [_description[0] for _description in _cursor.description or []], _cursor.fetchall()
+
+    def stream_query(self, sql: str) -> Iterator[list[Any]]:
+        """stream_query
+
+        Executes a query and yields its rows in batches, so that large results need not be held in memory.
+        Errors are not reported but raised to the caller.
+
+        Args:
+            sql (str): query to execute.
+
+        Yields:
+            Iterator[list[Any]]: batches of rows.
+        """
+        _cursor: Cursor = self.retry_if_locked(lambda: self._conn.execute(sql))
+
+        while _rows := _cursor.fetchmany(RESULT_BATCH_ROWS):
+            yield _rows
+
+    def sql_length_limit(self) -> int:
+        """sql_length_limit
+
+        Gets the maximum length in bytes of an sql statement on this connection.
+
+        Returns:
+            int: maximum statement length.
+        """
+        return self._conn.getlimit(SQLITE_LIMIT_SQL_LENGTH)
+
+    def length_limit(self) -> int:
+        """length_limit
+
+        Gets the maximum length in bytes of a string or blob on this connection.
+
+        Returns:
+            int: maximum value length.
+        """
+        return self._conn.getlimit(SQLITE_LIMIT_LENGTH)
+
+    def changes(self) -> int:
+        """changes
+
+        Gets the number of rows changed by the last insert, update or delete.
+
+        Returns:
+            int: number of rows changed.
+        """
+        return self._conn.execute("SELECT changes();").fetchone()[0]
+
+    def open_blob(self, table: str, column: str, rowid: int, readonly: bool) -> Blob:
+        """open_blob
+
+        Opens a blob in the main database for incremental reading or writing. Errors are not reported
+        but raised to the caller.
+
+        Args:
+            table (str): name of table.
+            column (str): name of column.
+            rowid (int): rowid of row.
+            readonly (bool): flag indicating if the blob is only to be read.
+
+        Returns:
+            Blob: open blob, to be closed by the caller.
+        """
+        return self.retry_if_locked(lambda: self._conn.blobopen(table, column, rowid, readonly=readonly))
+
+    def data_version(self) -> int:
+        """data_version
+
+        Gets the data version of the database, which changes whenever another connection commits a change.
+
+        Returns:
+            int: data version.
+        """
+        return self._conn.execute("PRAGMA data_version;").fetchone()[0]
+
+    def primary_key(self, table: str) -> list[str]:
+        """primary_key
+
+        Gets the names of the primary key columns of a table, in key order.
+
+        Args:
+            table (str): name of table, optionally qualified with the schema.
+
+        Returns:
+            list[str]: primary key columns, or an empty list if the table has none or does not exist.
+        """
+        _schema, _, _table = table.rpartition(".")
+
+        _columns: list[Any] = self._conn.execute(
+            "SELECT name, pk FROM pragma_table_info(?, ?) WHERE pk > 0 ORDER BY pk;",
+            (_table, _schema or "main"),
+        ).fetchall()
+
+        return [_name for _name, _ in _columns]
+
+    def create_function(self, name: str, arguments: int, function: Callable[..., Any]) -> None:
+        """create_function
+
+        Registers a deterministic sql function on the current connection only. Functions for the user
+        are registered with 'register_functions' instead, so that they survive opening another database.
+
+        Args:
+            name (str): sql name of the function.
+            arguments (int): number of arguments.
+            function (Callable[..., Any]): function to call.
+        """
+        self._conn.create_function(name, arguments, function, deterministic=True)
+
+    def attach(self, filename: str, schema: str) -> bool:
+        """attach
+
+        Attaches another existing database to the connection. Any open batch is committed first,
+        as a database cannot be attached inside a transaction.
+
+        Args:
+            filename (str): database to attach.
+            schema (str): name to attach it as.
+
+        Returns:
+            bool: flag indicating success.
+        """
+        if not path.isfile(filename):
+            print(f"Error: '{filename}' does not exist or is not a database..")
+            return False
+
+        try:
+            self.commit_batch()
+            self._conn.execute("ATTACH DATABASE ? AS ?;", (filename, schema))
+        except Error as error:
+            print("Error: %s." % (" ".join(error.args)))
+            return False
+
+        return True
+
+    def detach(self, schema: str) -> None:
+        """detach
+
+        Detaches a database attached to the connection.
+
+        Args:
+            schema (str): name it was attached as.
+        """
+        try:
+            self._conn.execute("DETACH DATABASE ?;", (schema,))
+        except Error as error:
+            print("Error: %s." % (" ".join(error.args)))
+
+    def lock_statistics(self) -> tuple[int, float]:
+        """lock_statistics
+
+        Gets the number of retries and the time spent waiting on locks.
+
+        Returns:
+            tuple[int, float]: number of retries and seconds spent waiting.
+        """
+        return self._lock_retries, self._lock_wait
+
+    def busy_status(self) -> str:
+        """busy_status
+
+        Describes the busy handling settings and lock contention so far.
+
+        Returns:
+            str: description of busy handling.
+        """
+        return (
+            f"Busy timeout is {self._busy_timeout} ms with {self._busy_retries} retries,"
+            f" {self._lock_retries} retries and {self._lock_wait * 1000:.0f} ms spent waiting on locks"
+        )
+
+    def start_batch(self, commit_every: int, commit_ms: int) -> None:
+        """start_batch
+
+        Starts batch mode. Statements are executed in a single transaction which is committed
+        every so many statements or milliseconds, or explicitly.
+
+        Args:
+            commit_every (int): number of statements after which to commit, or 0.
+            commit_ms (int): number of milliseconds after which to commit, or 0.
+        """
+        self._batch = True
+        self._commit_every = commit_every
+        self._commit_ms = commit_ms
+        self._batch_statements = 0
+
+    def stop_batch(self) -> bool:
+        """stop_batch
+
+        Commits any open batch and returns to committing each statement.
+
+        Returns:
+            bool: flag indicating success.
+        """
+        _success: bool = self.commit_batch()
+        self._batch = False
+
+        return _success
+
+    def batch_status(self) -> str:
+        """batch_status
+
+        Describes the state of batch mode.
+
+        Returns:
+            str: description of batch mode.
+        """
+        if not self._batch:
+            return "Batch mode is OFF"
+
+        return (
+            f"Batch mode is ON, commit_every:{self._commit_every} commit_ms:{self._commit_ms},"
+            f" {self.pending_statements()} statement(s) pending"
+        )
+
+    def pending_statements(self) -> int | None:
+        """pending_statements
+
+        Gets the number of statements executed in the open batch transaction.
+
+        Returns:
+            int | None: number of pending statements, or None if not in batch mode.
+        """
+        if not self._batch:
+            return None
+
+        try:
+            if not self._conn.in_transaction:
+                return 0
+        except (AttributeError, ProgrammingError):
+            return 0
+
+        return self._batch_statements
+
+    def commit_batch_if_due(self) -> None:
+        """commit_batch_if_due
+
+        Commits the batch transaction if the statement or time limit has been reached.
+        """
+        _elapsed_ms: float = (perf_counter() - self._batch_started) * 1000
+
+        if (self._commit_every > 0 and self._batch_statements >= self._commit_every) or (
+            self._commit_ms > 0 and _elapsed_ms >= self._commit_ms
+        ):
+            self.commit_batch()
+
+    def commit_batch(self) -> bool:
+        """commit_batch
+
+        Commits the open batch transaction, if there is one.
+
+        Returns:
+            bool: flag indicating success.
+        """
+        try:
+            if self._batch and self._conn.in_transaction:
+                self.retry_if_locked(self._conn.commit)
+        except (AttributeError, ProgrammingError):
+            pass
+        except Error as error:
+            print("Error: %s." % (" ".join(error.args)))
+            return False
+
+        self._batch_statements = 0
+        return True
+
+    def commit(self) -> bool:
+        """commit
+
+        Commits the open transaction.
+
+        Returns:
+            bool: flag indicating success.
+        """
+        try:
+            if not self._conn.in_transaction:
+                print("Error: no transaction is open..")
+                return False
+            self.retry_if_locked(self._conn.commit)
+        except AttributeError as error:
+            print(f"Error: could not commit - {error}. Maybe database is not open..")
+            return False
+        except Error as error:
+            print("Error: %s." % (" ".join(error.args)))
+            return False
+
+        self._batch_statements = 0
+        return True
+
+    def rollback(self, savepoint: str) -> bool:
+        """rollback
+
+        Rolls back the open transaction, or to the named savepoint.
+
+        Args:
+            savepoint (str): name of savepoint to roll back to, or empty string.
+
+        Returns:
+            bool: flag indicating success.
+        """
+        try:
+            if not self._conn.in_transaction:
+                print("Error: no transaction is open..")
+                return False
+            if savepoint == "":
+                self._conn.rollback()
+                self._batch_statements = 0
+            else:
+                self._conn.execute(f'ROLLBACK TO "{savepoint.replace('"', '""')}";')
+        except AttributeError as error:
+            print(f"Error: could not roll back - {error}. Maybe database is not open..")
+            return False
+        except Error as error:
+            print("Error: %s." % (" ".join(error.args)))
+            return False
+
+        return True
+
+    def savepoint(self, name: str, release: bool) -> bool:
+        """savepoint
+
+        Sets or releases a named savepoint within the batch transaction.
+
+        Args:
+            name (str): name of savepoint.
+            release (bool): flag indicating if the savepoint should be released rather than set.
+
+        Returns:
+            bool: flag indicating success.
+        """
+        if not self._batch:
+            print("Error: savepoints require batch mode, use '.batch on'.")
+            return False
+
+        _name: str = name.replace('"', '""')
+
+        try:
+            with self.transaction():
+                if release:
+                    self._conn.execute(f'RELEASE "{_name}";')
+                else:
+                    self._conn.execute(f'SAVEPOINT "{_name}";')
+        except AttributeError as error:
+            print(f"Error: could not set savepoint - {error}. Maybe database is not open..")
+            return False
+        except Error as error:
+            print("Error: %s." % (" ".join(error.args)))
+            return False
+
+        return True
+
+    def optimize(self, analyze: bool, vacuum: bool, incremental: int, into: str) -> bool:
+        """optimize
+
+        Runs maintenance on the open database. Statistics are refreshed with 'PRAGMA optimize', or with
+        a full ANALYZE if requested, both bounded by the analysis limit. Free pages are then reclaimed,
+        incrementally in bounded chunks if the database uses incremental auto-vacuum, and finally the
+        database may be vacuumed into a new file. Each chunk runs in its own short transaction so
+        that other connections to a live WAL database are not locked out for the whole run.
+
+        Progress is shown through a progress handler, and file size and page counts are reported
+        before and after.
+
+        Args:
+            analyze (bool): flag indicating if a full ANALYZE should be run.
+            vacuum (bool): flag indicating if all free pages should be reclaimed.
+            incremental (int): number of free pages to reclaim incrementally, or 0.
+            into (str): name of file to vacuum into, or empty string.
+
+        Returns:
+            bool: flag indicating success.
+        """
+        if into != "" and path.exists(into):
+            print(f"Error: '{into}' already exists..")
+            return False
+
+        try:
+            #  Finish any open transaction, including a batch, VACUUM cannot run inside one.
+
+            if self._conn.in_transaction:
+                self.retry_if_locked(self._conn.commit)
+
+            _before: dict[str, int] = self.storage_statistics()
+
+            self._conn.set_progress_handler(self.report_progress, PROGRESS_INTERVAL)
+
+            try:
+                #  Refresh the query planner statistics.
+
+                self._conn.execute(f"PRAGMA analysis_limit = {ANALYSIS_LIMIT};")
+
+                if analyze:
+                    print("Analysing database", end="", flush=True)
+                    self.retry_if_locked(lambda: self._conn.execute("ANALYZE;"))
+                else:
+                    print("Optimizing database", end="", flush=True)
+                    self._conn.execute("PRAGMA optimize;")
+                print()
+
+                #  Reclaim free pages. Incremental vacuum is only available in incremental auto-vacuum mode,
+                #  otherwise a full vacuum rebuilds the file.
+
+                _incremental_mode: bool = self.pragma("auto_vacuum") == 2
+
+                if incremental > 0 and not _incremental_mode:
+                    print(
+                        "Error: incremental vacuum requires 'PRAGMA auto_vacuum = INCREMENTAL', use 'vacuum' instead."
+                    )
+                elif incremental > 0 or (vacuum and _incremental_mode):
+                    _pages: int = self.pragma("freelist_count")
+                    if not vacuum:
+                        _pages = min(incremental, _pages)
+                    self.incremental_vacuum(_pages)
+                elif vacuum:
+                    print("Vacuuming database", end="", flush=True)
+                    self.retry_if_locked(lambda: self._conn.execute("VACUUM;"))
+                    print()
+
+                #  Write a compacted copy of the database.
+
+                if into != "":
+                    print(f"Vacuuming into '{into}'", end="", flush=True)
+                    self._conn.execute("VACUUM INTO ?;", (into,))
+                    print()
+
+            finally:
+                self._conn.set_progress_handler(None, 0)
+
+            #  Move the changes out of the write-ahead log without waiting on readers or writers.
+
+            if self.pragma("journal_mode") == "wal":
+                self._conn.execute("PRAGMA wal_checkpoint(PASSIVE);")
+
+            _after: dict[str, int] = self.storage_statistics()
+
+        except AttributeError as error:
+            print(f"Error: could not optimize - {error}. Maybe database is not open..")
+            return False
+        except Error as error:
+            print()
+            print("Error: %s." % (" ".join(error.args)))
+            return False
+
+        #  Report the effect of the maintenance.
+
+        print(f"{'':<16}{'before':>16}{'after':>16}")
+        for _key in _before.keys():
+            print(f"{_key:<16}{_before[_key]:>16}{_after[_key]:>16}")
+        if into != "":
+            print(f"{'into file size':<16}{'':>16}{path.getsize(into):>16}")
+
+        return True
+
+    def incremental_vacuum(self, pages: int) -> None:
+        """incremental_vacuum
+
+        Reclaims free pages in bounded chunks, each in its own transaction.
+
+        Args:
+            pages (int): number of pages to reclaim.
+        """
+        _freed: int = 0
+
+        if pages == 0:
+            print("No free pages to reclaim")
+            return
+
+        while _freed < pages:
+            _chunk: int = min(VACUUM_CHUNK_PAGES, pages - _freed)
+            self.retry_if_locked(
+                lambda: self._conn.execute(f"PRAGMA incremental_vacuum({_chunk});").fetchall()
+            )
+            _freed += _chunk
+            print(f"\rFreed {_freed} of {pages} pages", end="", flush=True)
+
+        print()
+
+    def pragma(self, name: str) -> Any:
+        """pragma
+
+        Gets the value of a pragma.
+
+        Args:
+            name (str): name of pragma.
+
+        Returns:
+            Any: value of pragma.
+        """
+        return self._conn.execute(f"PRAGMA {name};").fetchone()[0]
+
+    def storage_statistics(self) -> dict[str, int]:
+        """storage_statistics
+
+        Gets the size of the database files and its page counts.
+
+        Returns:
+            dict[str, int]: file size, page size, page count and free page count.
+        """
+        _file_size: int = 0
+        for _file in [self._filename, f"{self._filename}-wal"]:
+            if path.exists(_file):
+                _file_size += path.getsize(_file)
+
+        return {
+            "file size": _file_size,
+            "page size": self.pragma("page_size"),
+            "page count": self.pragma("page_count"),
+            "freelist count": self.pragma("freelist_count"),
+        }
+
+    def report_progress(self) -> int:
+        """report_progress
+
+        Progress handler for long running operations. Prints a dot each time it is called.
+
+        Returns:
+            int: 0 to allow the operation to continue.
+        """
+        print(".", end="", flush=True)
+        return 0
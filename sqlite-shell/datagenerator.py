@@ -0,0 +1,478 @@
+from calendar import timegm
+from collections.abc import Callable
+from itertools import accumulate
+from random import Random, SystemRandom
+from re import search
+from sqlite3 import Error
+from time import gmtime, perf_counter, strftime
+from typing import Any
+
+from constants import (
+    GENERATE_BATCH_ROWS,
+    GENERATE_COMMIT_ROWS,
+    GENERATE_DATE_RANGE,
+    GENERATE_NULL_RATIO,
+    GENERATE_POOL_VALUES,
+    GENERATE_SKEW,
+)
+from database import Database
+from quoting import quote, quote_literal
+
+#  Words from which text values are made, and labels for columns whose names suggest a few categories.
+
+_WORDS: list[str] = (
+    "time year people way day man thing woman life child world school state family student group country problem "
+    "hand part place case week company system program question work government number night point home water room "
+    "mother area money story fact month lot right study book eye job word business issue side kind head house "
+    "service friend father power hour game line end member law car city community name president team minute idea "
+    "kid body information back parent face others level office door health person art war history party result "
+    "change morning reason research girl guy moment air teacher force education"
+).split()
+_FIRST_NAMES: list[str] = (
+    "James Mary Robert Patricia John Jennifer Michael Linda David Elizabeth William Barbara Richard Susan Joseph "
+    "Jessica Thomas Sarah Charles Karen Daniel Lisa Matthew Nancy Anthony Betty Mark Sandra Paul Ashley Steven Emily"
+).split()
+_LAST_NAMES: list[str] = (
+    "Smith Johnson Williams Brown Jones Garcia Miller Davis Rodriguez Martinez Hernandez Lopez Gonzalez Wilson "
+    "Anderson Thomas Taylor Moore Jackson Martin Lee Perez Thompson White Harris Sanchez Clark Ramirez Lewis Robinson"
+).split()
+_CATEGORIES: list[str] = ["active", "pending", "closed", "suspended", "archived", "draft", "review", "deleted"]
+
+#  Column names suggesting categories, flags, people's names and dates.
+
+_CATEGORY_NAME: str = r"status|state|type|kind|category|level|role|tier|class|group"
+_FLAG_NAME: str = r"^(is|has|can)_|flag|enabled|active|deleted|visible"
+_PERSON_NAME: str = r"name"
+_DATE_NAME: str = r"date|time|_at$|_on$|created|updated|modified"
+
+#  Dates are generated back from a fixed day, so that the same seed always gives the same dates.
+
+_LATEST: int = timegm((2026, 1, 1, 0, 0, 0))
+
+
+class DataGenerator:
+    """DataGenerator
+
+    Fills a table with synthetic rows for load testing, shaped by its schema. Each column's values
+    are chosen from its declared type and its name: categories, flags, names, email addresses, dates,
+    amounts and free text, with skewed distributions so that some values are far more common than
+    others. Nullable columns are given some NULLs, columns in a unique key are given distinct values,
+    and foreign keys refer to rows that exist in the parent table, some parents having many more
+    children than others. Values are generated a column at a time for a batch of rows, and inserted
+    with executemany in large transactions. The same seed gives the same rows.
+    """
+
+    def __init__(self, database: Database, table: str, seed: int | None) -> None:
+        """__init__
+
+        Initialises the data generator class.
+
+        Args:
+            database (Database): open database.
+            table (str): name of table to fill.
+            seed (int | None): seed for the random values, or None for a random seed.
+        """
+        self._database = database
+        self._table = table
+        self._seed: int = seed if seed is not None else SystemRandom().randrange(2**32)
+        self._random: Random = Random(self._seed)
+        self._ignore: bool = False
+
+    def run(self, rows: int) -> bool:
+        """run
+
+        Generates and inserts the rows.
+
+        Args:
+            rows (int): number of rows to generate.
+
+        Returns:
+            bool: flag indicating success.
+        """
+        _started: float = perf_counter()
+        _generated: int = 0
+        _inserted: int = 0
+
+        try:
+            _plan: list[tuple[list[str], Callable[[int], list[list[Any]]]]] | None = self.plan()
+            if _plan is None:
+                return False
+
+            _names: list[str] = [_name for _columns, _ in _plan for _name in _columns]
+            _sql: str = (
+                f"INSERT {'OR IGNORE ' if self._ignore else ''}INTO {quote(self._table)}"
+                f" ({', '.join(map(quote, _names))}) VALUES ({', '.join(['?'] * len(_names))});"
+                if len(_names) > 0
+                else f"INSERT INTO {quote(self._table)} DEFAULT VALUES;"
+            )
+
+            print(f"Generating {rows:,} rows for '{self._table}' with seed:{self._seed}")
+
+            #  References are chosen from rows that exist, so they are not checked again row by row.
+
+            _foreign_keys: int = self._database.pragma("foreign_keys")
+            self._database.execute_with_retry("PRAGMA foreign_keys = OFF;")
+
+            try:
+                while _generated < rows:
+                    self._database.execute_with_retry("BEGIN IMMEDIATE;")
+                    try:
+                        _end: int = min(_generated + GENERATE_COMMIT_ROWS, rows)
+                        while _generated < _end:
+                            _count: int = min(GENERATE_BATCH_ROWS, _end - _generated)
+                            _values: list[list[Any]] = [
+                                _column for _, _generate in _plan for _column in _generate(_count)
+                            ]
+                            _inserted += self._database.execute_many(
+                                _sql, zip(*_values) if len(_values) > 0 else [()] * _count
+                            )
+                            _generated += _count
+                        self._database.execute_with_retry("COMMIT;")
+                    except BaseException:
+                        self._database.execute_with_retry("ROLLBACK;")
+                        raise
+
+                    _elapsed: float = perf_counter() - _started
+                    print(
+                        f"\rInserted {_inserted:,} of {rows:,} rows, {_inserted / max(_elapsed, 1e-6):,.0f} rows/sec",
+                        end="",
+                        flush=True,
+                    )
+            finally:
+                self._database.execute_with_retry(f"PRAGMA foreign_keys = {_foreign_keys};")
+
+            print()
+
+        except Error as error:
+            print()
+            print("Error: %s." % (" ".join(error.args)))
+            return False
+
+        if _inserted < rows:
+            print(f"{rows - _inserted:,} rows were skipped as their keys were already in the table")
+
+        return True
+
+    def plan(self) -> list[tuple[list[str], Callable[[int], list[list[Any]]]]] | None:
+        """plan
+
+        Reads the table's columns, unique keys and foreign keys, and chooses how to generate each
+        column. Columns of a foreign key are generated together. A rowid alias is left for SQLite
+        to assign, and generated columns are computed by SQLite.
+
+        Returns:
+            list[tuple[list[str], Callable[[int], list[list[Any]]]]] | None: names of columns, and a function
+                that generates values for them, given the number of rows, or None if the table cannot be filled.
+        """
+        _, _exists = self._database.execute_query(
+            f"SELECT wr FROM pragma_table_list WHERE schema = 'main' AND type = 'table' AND name = {quote_literal(self._table)};"
+        )
+        if len(_exists) == 0:
+            print(f"Error: no such table - {self._table}.")
+            return None
+        _without_rowid: bool = _exists[0][0] == 1
+
+        _, _columns = self._database.execute_query(
+            f"SELECT name, upper(type), \"notnull\", pk FROM pragma_table_xinfo({quote_literal(self._table)})"
+            " WHERE hidden NOT IN (2, 3) ORDER BY cid;"
+        )
+        _keys: list[Any] = [_column for _column in _columns if _column[3] > 0]
+        _rowid_alias: str = (
+            _keys[0][0] if len(_keys) == 1 and _keys[0][1] == "INTEGER" and not _without_rowid else ""
+        )
+
+        _, _foreign_keys = self._database.execute_query(
+            f"SELECT id, \"table\", \"from\", \"to\" FROM pragma_foreign_key_list({quote_literal(self._table)}) ORDER BY id, seq;"
+        )
+        _references: dict[int, tuple[str, list[str], list[str | None]]] = {}
+        for _id, _parent, _from, _to in _foreign_keys:
+            _references.setdefault(_id, (_parent, [], []))
+            _references[_id][1].append(_from)
+            _references[_id][2].append(_to)
+        _referencing: set[str] = {_name for _, _from, _ in _references.values() for _name in _from}
+
+        #  Each unique key, and the primary key unless it is the rowid, gets one column of distinct values,
+        #  preferably not a foreign key. A key made only of foreign keys cannot be made distinct, so rows
+        #  that would repeat one are skipped.
+
+        _, _unique_keys = self._database.execute_query(
+            f"SELECT group_concat(ii.name, char(0)) FROM pragma_index_list({quote_literal(self._table)}) il,"
+            " pragma_index_info(il.name) ii WHERE il.\"unique\" = 1 GROUP BY il.name;"
+        )
+        _distinct: set[str] = set()
+        for _key, in _unique_keys:
+            _key_columns: list[str] = _key.split("\0")
+            if _rowid_alias in _key_columns:
+                continue
+            _free: list[str] = [_name for _name in _key_columns if _name not in _referencing]
+            if len(_free) > 0:
+                _distinct.add(_free[0])
+            else:
+                self._ignore = True
+
+        #  Distinct values continue from the rows already in the table, so that a second run does not repeat them.
+        #  In a table with rowids they continue from the last rowid, so that they follow the rows' order, unless
+        #  a column already holds higher values. Each column's own values are checked by 'column'.
+
+        _first: int = 1
+        if not _without_rowid:
+            _, _start = self._database.execute_query(f"SELECT coalesce(max(rowid), 0) FROM {quote(self._table)};")
+            _first = _start[0][0] + 1
+
+        _plan: list[tuple[list[str], Callable[[int], list[list[Any]]]]] = []
+        _types: dict[str, tuple[str, bool]] = {_name: (_type, _not_null == 1) for _name, _type, _not_null, _ in _columns}
+
+        for _parent, _from, _to in _references.values():
+            _generate: Callable[[int], list[list[Any]]] | None = self.reference(
+                _parent, _from, _to, all(not _types[_name][1] for _name in _from)
+            )
+            if _generate is None:
+                return None
+            _plan.append((_from, _generate))
+
+        for _name, _type, _not_null, _ in _columns:
+            if _name == _rowid_alias or _name in _referencing:
+                continue
+            _plan.append(([_name], self.column(_name, _type, _not_null == 1, _name in _distinct, _first)))
+
+        return _plan
+
+    def reference(
+        self, parent: str, columns: list[str], keys: list[str | None], nullable: bool
+    ) -> Callable[[int], list[list[Any]]] | None:
+        """reference
+
+        Chooses how to generate the columns of a foreign key, from the keys of the rows in the parent table.
+
+        Args:
+            parent (str): name of parent table.
+            columns (list[str]): names of the foreign key columns.
+            keys (list[str | None]): names of the parent key columns, None for the parent's primary key.
+            nullable (bool): flag indicating if the foreign key may be NULL.
+
+        Returns:
+            Callable[[int], list[list[Any]]] | None: function generating values for the columns, or None if
+                there are no parent rows to refer to.
+        """
+        if None in keys:
+            _primary_key: list[str] = self._database.primary_key(parent)
+            keys = list(_primary_key) if len(_primary_key) == len(columns) else ["rowid"] * len(columns)
+
+        _, _parents = self._database.execute_query(
+            f"SELECT DISTINCT {', '.join(quote(str(_key)) for _key in keys)} FROM {quote(parent)} ORDER BY 1;"
+        )
+
+        if len(_parents) == 0:
+            if not nullable:
+                print(f"Error: '{parent}' has no rows for '{self._table}' to refer to, generate its rows first.")
+                return None
+            return lambda rows: [[None] * rows for _ in columns]
+
+        #  Some parents have many children and most have few. Which parents are popular is chosen at random.
+
+        self._random.shuffle(_parents)
+        _weights: list[float] = list(accumulate(1 / (_rank + 1) ** GENERATE_SKEW for _rank in range(len(_parents))))
+
+        def generate(rows: int) -> list[list[Any]]:
+            _chosen: list[Any] = self._random.choices(_parents, cum_weights=_weights, k=rows)
+            if nullable:
+                self.add_nulls(_chosen, (None,) * len(columns))
+            return [list(_values) for _values in zip(*_chosen)]
+
+        return generate
+
+    def column(self, name: str, type: str, not_null: bool, distinct: bool, first: int) -> Callable[[int], list[list[Any]]]:
+        """column
+
+        Chooses how to generate a column, from its declared type and its name. Distinct values are
+        numbered, after the highest number already in the column. Other values are drawn from a pool made up front, so that each batch is chosen in a
+        single call, either evenly from a pool that has the distribution wanted, or with a few values
+        far more common than the rest.
+
+        Args:
+            name (str): name of column.
+            type (str): declared type of column, in upper case.
+            not_null (bool): flag indicating if the column may not be NULL.
+            distinct (bool): flag indicating if every value must be different.
+            first (int): lowest number from which distinct values are made.
+
+        Returns:
+            Callable[[int], list[list[Any]]]: function generating values for the column.
+        """
+        _name: str = name.lower()
+        _affinity: str = self.affinity(type)
+        _is_date: bool = "DATE" in type or "TIME" in type or (_affinity != "blob" and search(_DATE_NAME, _name) is not None)
+
+        _values: Callable[[int], list[Any]]
+
+        if distinct:
+            _counter: list[int] = [max(first, self.last_number(name, _affinity, _is_date) + 1)]
+
+            def number(rows: int) -> list[int]:
+                _counter[0] += rows
+                return list(range(_counter[0] - rows, _counter[0]))
+
+            if _affinity in ["integer", "numeric"] or _is_date:
+                _values = number
+            elif _affinity == "real":
+                _values = lambda rows: [float(_number) for _number in number(rows)]
+            elif _affinity == "blob":
+                _values = lambda rows: [_number.to_bytes(8, "big") for _number in number(rows)]
+            elif "mail" in _name:
+                _values = lambda rows: [f"user{_number}@example.com" for _number in number(rows)]
+            else:
+                _values = lambda rows: [f"{name}-{_number}" for _number in number(rows)]
+
+        else:
+            _pool, _skewed = self.pool(_name, type, _affinity, _is_date)
+
+            if _skewed:
+                self._random.shuffle(_pool)
+                _weights: list[float] = list(accumulate(1 / (_rank + 1) ** GENERATE_SKEW for _rank in range(len(_pool))))
+                _values = lambda rows: self._random.choices(_pool, cum_weights=_weights, k=rows)
+            else:
+                _values = lambda rows: self._random.choices(_pool, k=rows)
+
+        def generate(rows: int) -> list[list[Any]]:
+            _column: list[Any] = _values(rows)
+            if not not_null and not distinct:
+                self.add_nulls(_column, None)
+            return [_column]
+
+        return generate
+
+    def last_number(self, name: str, affinity: str, is_date: bool) -> int:
+        """last_number
+
+        Finds the highest number in a column of distinct values, read back from the values in the
+        forms that 'column' makes them, so that more values can be made without repeating any.
+
+        Args:
+            name (str): name of column.
+            affinity (str): affinity of column.
+            is_date (bool): flag indicating if the column holds dates.
+
+        Returns:
+            int: highest number, or 0 if there are none.
+        """
+        _column: str = quote(name)
+
+        if affinity in ["integer", "numeric", "real"] or is_date:
+            _number: str = f"CASE WHEN typeof({_column}) IN ('integer', 'real') THEN CAST({_column} AS INTEGER) END"
+        elif affinity == "blob":
+            _number = f"CASE WHEN typeof({_column}) = 'blob' AND length({_column}) = 8 THEN hex({_column}) END"
+        else:
+            _prefix: str = "user" if "mail" in name.lower() else f"{name}-"
+            _number = (
+                f"CASE WHEN substr({_column}, 1, {len(_prefix)}) = {quote_literal(_prefix)}"
+                f" THEN CAST(substr({_column}, {len(_prefix) + 1}) AS INTEGER) END"
+            )
+
+        _, _last = self._database.execute_query(f"SELECT max({_number}) FROM {quote(self._table)};")
+        if _last[0][0] is None:
+            return 0
+
+        return int(_last[0][0], 16) if affinity == "blob" and not is_date else int(_last[0][0])
+
+    def pool(self, name: str, type: str, affinity: str, is_date: bool) -> tuple[list[Any], bool]:
+        """pool
+
+        Makes the pool of values a column is drawn from.
+
+        Args:
+            name (str): name of column, in lower case.
+            type (str): declared type of column, in upper case.
+            affinity (str): type affinity of column.
+            is_date (bool): flag indicating if the column holds dates.
+
+        Returns:
+            tuple[list[Any], bool]: values, and a flag indicating if some are to be drawn far more often than others.
+        """
+        _random: Random = self._random
+        _size: range = range(GENERATE_POOL_VALUES)
+
+        if is_date:
+            #  Recent dates are more common. Dates are stored as seconds since 1970 in numeric columns, otherwise as text.
+
+            _seconds: list[int] = [_LATEST - int(_random.expovariate(3 / GENERATE_DATE_RANGE)) for _ in _size]
+            if affinity in ["integer", "real", "numeric"] and "DATE" not in type and "TIME" not in type:
+                return _seconds, False
+
+            _format: str = "%Y-%m-%d" if "DATE" in type and "TIME" not in type else "%Y-%m-%d %H:%M:%S"
+            return [strftime(_format, gmtime(_second)) for _second in _seconds], False
+
+        if "BOOL" in type or search(_FLAG_NAME, name) is not None:
+            return [1] * 7 + [0] * 3, False
+
+        if affinity == "integer":
+            if "age" in name:
+                return [min(max(int(_random.gauss(40, 15)), 18), 95) for _ in _size], False
+            if "year" in name:
+                return [2025 - int(_random.expovariate(1 / 10)) for _ in _size], False
+            return [int(_random.lognormvariate(3, 1.5)) for _ in _size], False
+
+        if affinity in ["real", "numeric"]:
+            return [round(_random.lognormvariate(3, 1), 2) for _ in _size], False
+
+        if affinity == "blob":
+            return [_random.randbytes(_random.randint(16, 64)) for _ in _size], False
+
+        #  Text is cut to its declared length, if any.
+
+        _length: Any = search(r"\((\d+)", type)
+        _pool: list[str]
+
+        if search(_CATEGORY_NAME, name) is not None:
+            _pool = list(_CATEGORIES)
+        elif "mail" in name:
+            _pool = [
+                f"{_random.choice(_FIRST_NAMES).lower()}.{_random.choice(_LAST_NAMES).lower()}{_index}@example.com"
+                for _index in _size
+            ]
+        elif "first" in name and search(_PERSON_NAME, name) is not None:
+            _pool = list(_FIRST_NAMES)
+        elif ("last" in name or "surname" in name) and search(_PERSON_NAME, name) is not None:
+            _pool = list(_LAST_NAMES)
+        elif search(_PERSON_NAME, name) is not None:
+            _pool = [f"{_first} {_last}" for _first in _FIRST_NAMES for _last in _LAST_NAMES]
+        else:
+            _pool = [" ".join(_random.choices(_WORDS, k=_random.randint(2, 12))) for _ in _size]
+
+        if _length is not None:
+            _pool = [_value[: int(_length[1])] for _value in _pool]
+
+        return _pool, True
+
+    def add_nulls(self, values: list[Any], null: Any) -> None:
+        """add_nulls
+
+        Replaces a share of the values with NULLs, at random.
+
+        Args:
+            values (list[Any]): values to change in place.
+            null (Any): value standing for NULL.
+        """
+        for _index in self._random.sample(range(len(values)), int(len(values) * GENERATE_NULL_RATIO)):
+            values[_index] = null
+
+    def affinity(self, type: str) -> str:
+        """affinity
+
+        Gets the type affinity SQLite gives a declared column type.
+
+        Args:
+            type (str): declared type, in upper case.
+
+        Returns:
+            str: 'integer', 'text', 'blob', 'real' or 'numeric'.
+        """
+        if "INT" in type:
+            return "integer"
+        if "CHAR" in type or "CLOB" in type or "TEXT" in type:
+            return "text"
+        if "BLOB" in type or type == "":
+            return "blob"
+        if "REAL" in type or "FLOA" in type or "DOUB" in type:
+            return "real"
+
+        return "numeric"
@@ -0,0 +1,238 @@
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from gzip import open as gzip_open
+from shutil import copyfileobj
+from sqlite3 import Error
+from tempfile import TemporaryFile
+from time import perf_counter
+from typing import Any, TextIO
+
+from constants import DUMP_COMPRESS_LEVEL, DUMP_STATEMENT_BYTES, DUMP_WORKERS
+from database import Database
+from quoting import quote, quote_literal
+
+
+class Dumper:
+    """Dumper
+
+    Dumps the schema and data of a database as an sql script. Rows are written as multi-row
+    INSERT statements, each up to a size well within SQLite's statement length limit, with the
+    values quoted by SQLite itself. Tables are dumped in parallel, each by a thread with its own
+    read-only connection writing to a temporary file, and the files are then joined in schema order.
+    Indexes, triggers and views are created after the data, so loading does not update indexes row
+    by row. Virtual tables are recreated as the sqlite3 shell does, by writing their schema entry
+    directly, with the data of their shadow tables dumped as ordinary tables.
+
+    Tables are read by separate connections, so if other connections change the database during
+    the dump the tables may not be consistent with each other.
+    """
+
+    def __init__(self, filename: str, mode: str) -> None:
+        """__init__
+
+        Initialises the dumper class.
+
+        Args:
+            filename (str): database to dump.
+            mode (str): mode to open it in, 'ro' or 'immutable'.
+        """
+        self._filename = filename
+        self._mode = mode
+
+    def run(self, tables: list[str], output: str) -> bool:
+        """run
+
+        Dumps the database, or only the given tables with their indexes and triggers.
+
+        Args:
+            tables (list[str]): names of tables, or empty list for all.
+            output (str): file to write to, compressed if it ends in '.gz', or empty string to print.
+
+        Returns:
+            bool: flag indicating success.
+        """
+        _started: float = perf_counter()
+
+        _database: Database | None = self.connect()
+        if _database is None:
+            return False
+
+        try:
+            _, _schema = _database.execute_query(
+                "SELECT type, name, tbl_name, sql FROM sqlite_schema WHERE sql IS NOT NULL ORDER BY rowid;"
+            )
+        except Error as error:
+            print("Error: %s." % (" ".join(error.args)))
+            return False
+        finally:
+            _database.close()
+
+        _unknown: list[str] = [
+            _table for _table in tables if not any(_name == _table for _, _name, _, _ in _schema)
+        ]
+        if len(_unknown) > 0:
+            print(f"Error: no such table(s) - {', '.join(_unknown)}.")
+            return False
+
+        _schema = [_entry for _entry in _schema if len(tables) == 0 or _entry[2] in tables]
+
+        #  Tables with data, other than SQLite's own tables, are dumped in parallel. Their sequence numbers go last.
+
+        _tables: list[tuple[str, str]] = [
+            (_name, _sql)
+            for _type, _name, _, _sql in _schema
+            if _type == "table" and not _name.startswith("sqlite_") and not _sql.upper().startswith("CREATE VIRTUAL")
+        ]
+        if any(_name == "sqlite_sequence" for _, _name, _, _ in _schema):
+            _tables.append(("sqlite_sequence", ""))
+
+        try:
+            _stream: TextIO = self.open_output(output)
+        except OSError as error:
+            print(f"Error: {error}.")
+            return False
+
+        _rows: int = 0
+
+        try:
+            _stream.write("PRAGMA foreign_keys=OFF;\nBEGIN TRANSACTION;\n")
+
+            #  Virtual tables are entered into the schema directly, so that creating them does not clash
+            #  with their shadow tables.
+
+            _virtual: list[Any] = [
+                _entry for _entry in _schema if _entry[0] == "table" and _entry[3].upper().startswith("CREATE VIRTUAL")
+            ]
+            if len(_virtual) > 0:
+                _stream.write("PRAGMA writable_schema=ON;\n")
+                for _, _name, _table, _sql in _virtual:
+                    _stream.write(
+                        "INSERT INTO sqlite_schema(type,name,tbl_name,rootpage,sql)"
+                        f" VALUES('table',{quote_literal(_name)},{quote_literal(_table)},0,{quote_literal(_sql)});\n"
+                    )
+                _stream.write("PRAGMA writable_schema=OFF;\n")
+
+            with ThreadPoolExecutor(DUMP_WORKERS) as _executor:
+                for _file, _count in _executor.map(self.dump_table, _tables):
+                    with _file:
+                        _file.seek(0)
+                        copyfileobj(_file, _stream)
+                    _rows += _count
+
+            for _type, _name, _, _sql in _schema:
+                if _type in ["index", "trigger", "view"]:
+                    _stream.write(f"{_sql};\n")
+
+            _stream.write("COMMIT;\n")
+
+        except (Error, OSError) as error:
+            print("Error: %s." % (" ".join(map(str, error.args))))
+            return False
+        finally:
+            if output != "":
+                _stream.close()
+
+        if output != "":
+            print(
+                f"Dumped {len(_tables)} table(s), {_rows} row(s) to '{output}' in {perf_counter() - _started:.2f} seconds"
+            )
+
+        return True
+
+    def connect(self) -> Database | None:
+        """connect
+
+        Opens a read-only connection to the database.
+
+        Returns:
+            Database | None: database object, or None if it could not be opened.
+        """
+        _database: Database = Database()
+        if not _database.open(self._filename, self._mode):
+            return None
+
+        return _database
+
+    def open_output(self, output: str) -> TextIO:
+        """open_output
+
+        Opens the file to write the dump to.
+
+        Args:
+            output (str): file to write to, compressed if it ends in '.gz', or empty string to print.
+
+        Returns:
+            TextIO: stream to write to.
+        """
+        if output == "":
+            return sys.stdout
+        if output.endswith(".gz"):
+            return gzip_open(output, "wt", compresslevel=DUMP_COMPRESS_LEVEL, encoding="utf-8")  # type: ignore[return-value]
+
+        return open(output, "w", encoding="utf-8")
+
+    def dump_table(self, table: tuple[str, str]) -> tuple[TextIO, int]:
+        """dump_table
+
+        Dumps the schema and data of a table to a temporary file, on its own connection.
+
+        Args:
+            table (tuple[str, str]): name and sql of table.
+
+        Returns:
+            tuple[TextIO, int]: temporary file holding the dump, and number of rows dumped.
+        """
+        _name, _sql = table
+        _file: TextIO = TemporaryFile("w+", encoding="utf-8")  # type: ignore[assignment]
+        _rows: int = 0
+
+        _database: Database | None = self.connect()
+        if _database is None:
+            raise Error(f"could not open '{self._filename}' to dump '{_name}'")
+
+        try:
+            if _name == "sqlite_sequence":
+                _file.write("DELETE FROM sqlite_sequence;\n")
+            else:
+                _file.write(f"{_sql};\n")
+
+            #  Generated columns are computed again when the rows are loaded, so they are not dumped.
+
+            _, _columns = _database.execute_query(
+                f"SELECT name FROM pragma_table_xinfo({quote_literal(_name)}) WHERE hidden NOT IN (2, 3);"
+            )
+            _column_names: list[str] = [quote(_column) for _column, in _columns]
+
+            _head: str = f"INSERT INTO {quote(_name)}({','.join(_column_names)}) VALUES"
+            _limit: int = min(DUMP_STATEMENT_BYTES, _database.sql_length_limit() - len(_head) - 2)
+
+            #  Each row is formatted as a list of sql literals by SQLite, and rows are gathered into statements.
+
+            _values: list[str] = []
+            _size: int = 0
+
+            for _batch in _database.stream_query(
+                f"SELECT '(' || {" || ',' || ".join(f'quote({_column})' for _column in _column_names)} || ')'"
+                f" FROM {quote(_name)};"
+            ):
+                for _row, in _batch:
+                    if _size + len(_row) + 1 > _limit and len(_values) > 0:
+                        _file.write(f"{_head}{','.join(_values)};\n")
+                        _values = []
+                        _size = 0
+
+                    _values.append(_row)
+                    _size += len(_row) + 1
+
+                _rows += len(_batch)
+
+            if len(_values) > 0:
+                _file.write(f"{_head}{','.join(_values)};\n")
+
+        except BaseException:
+            _file.close()
+            raise
+        finally:
+            _database.close()
+
+        return _file, _rows
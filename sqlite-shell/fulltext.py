@@ -0,0 +1,192 @@
+from sqlite3 import Error
+from typing import Any
+
+from constants import FTS_BATCH_ROWS, FTS_SNIPPET_TOKENS
+from database import Database
+from quoting import quote, quote_literal
+
+
+class FullTextIndex:
+    """FullTextIndex
+
+    Maintains an FTS5 index over text columns of a table, so that searches for words use the index
+    rather than scanning the table with LIKE. The index is an external content table: it stores only
+    the index, and reads the text from the table itself when showing snippets. Triggers on the table
+    keep the index in step with inserts, updates and deletes. The index of table 't' is named 't_fts'.
+    """
+
+    def __init__(self, database: Database, table: str) -> None:
+        """__init__
+
+        Initialises the full text index class.
+
+        Args:
+            database (Database): open database.
+            table (str): name of indexed table.
+        """
+        self._database = database
+        self._table = table
+        self._index = f"{table}_fts"
+
+    def build(self, columns: list[str]) -> bool:
+        """build
+
+        Creates the index and fills it from the table in batches, each in its own short transaction,
+        then installs the triggers that keep it up to date. Changes made to the table by other
+        connections while it is being filled may not be indexed.
+
+        Args:
+            columns (list[str]): names of columns to index.
+
+        Returns:
+            bool: flag indicating success.
+        """
+        try:
+            _, _wr = self._database.execute_query(
+                f"SELECT wr FROM pragma_table_list WHERE schema = 'main' AND type = 'table' AND name = {quote_literal(self._table)};"
+            )
+            if len(_wr) == 0:
+                print(f"Error: no such table - {self._table}.")
+                return False
+            if _wr[0][0] == 1:
+                print(f"Error: '{self._table}' is a WITHOUT ROWID table, which cannot be indexed.")
+                return False
+
+            _, _info = self._database.execute_query(
+                f"SELECT name FROM pragma_table_info({quote_literal(self._table)});"
+            )
+            _unknown: list[str] = [_column for _column in columns if _column not in [_name for _name, in _info]]
+            if len(_unknown) > 0:
+                print(f"Error: no such column(s) in '{self._table}' - {', '.join(_unknown)}.")
+                return False
+
+            _, _exists = self._database.execute_query(
+                f"SELECT 1 FROM sqlite_schema WHERE name = {quote_literal(self._index)};"
+            )
+            if len(_exists) > 0:
+                print(f"Error: '{self._index}' already exists, drop it first to rebuild.")
+                return False
+
+            #  Create the index, then fill it in batches of rowids, each batch ending at the last rowid of the batch.
+
+            _table: str = quote(self._table)
+            _index: str = quote(self._index)
+            _columns: str = ", ".join(map(quote, columns))
+
+            self.write(
+                [
+                    f"CREATE VIRTUAL TABLE {_index} USING fts5({_columns}, content={quote_literal(self._table)}, content_rowid='rowid');"
+                ]
+            )
+
+            _, _count = self._database.execute_query(f"SELECT count(*) FROM {_table};")
+            _total: int = _count[0][0]
+            _done: int = 0
+            _last: Any = None
+
+            while True:
+                _, _end = self._database.execute_query(
+                    f"SELECT rowid FROM {_table} {f'WHERE rowid > {_last}' if _last is not None else ''}"
+                    f" ORDER BY rowid LIMIT 1 OFFSET {FTS_BATCH_ROWS - 1};"
+                )
+
+                _range: list[str] = []
+                if _last is not None:
+                    _range.append(f"rowid > {_last}")
+                if len(_end) > 0:
+                    _range.append(f"rowid <= {_end[0][0]}")
+
+                self.write(
+                    [
+                        f"INSERT INTO {_index} (rowid, {_columns}) SELECT rowid, {_columns} FROM {_table}"
+                        f" WHERE {' AND '.join(_range) or 'true'};"
+                    ]
+                )
+
+                _done = min(_done + FTS_BATCH_ROWS, _total) if len(_end) > 0 else _total
+                print(f"\rIndexing '{self._table}': {_done:,} of {_total:,} rows", end="", flush=True)
+
+                if len(_end) == 0:
+                    break
+                _last = _end[0][0]
+
+            print()
+
+            #  Keep the index in step with the table.
+
+            _new: str = ", ".join(f"new.{quote(_column)}" for _column in columns)
+            _old: str = ", ".join(f"old.{quote(_column)}" for _column in columns)
+            _insert: str = f"INSERT INTO {_index} (rowid, {_columns}) VALUES (new.rowid, {_new});"
+            _delete: str = f"INSERT INTO {_index} ({_index}, rowid, {_columns}) VALUES ('delete', old.rowid, {_old});"
+
+            self.write(
+                [
+                    f"CREATE TRIGGER {quote(self._index + '_insert')} AFTER INSERT ON {_table} BEGIN {_insert} END;",
+                    f"CREATE TRIGGER {quote(self._index + '_delete')} AFTER DELETE ON {_table} BEGIN {_delete} END;",
+                    f"CREATE TRIGGER {quote(self._index + '_update')} AFTER UPDATE ON {_table} BEGIN {_delete} {_insert} END;",
+                ]
+            )
+
+        except Error as error:
+            print()
+            print("Error: %s." % (" ".join(error.args)))
+            return False
+
+        print(f"Created '{self._index}' on {', '.join(columns)}, kept up to date by triggers")
+        return True
+
+    def drop(self) -> bool:
+        """drop
+
+        Drops the index and its triggers.
+
+        Returns:
+            bool: flag indicating success.
+        """
+        try:
+            self.write(
+                [f"DROP TRIGGER IF EXISTS {quote(self._index + _suffix)};" for _suffix in ["_insert", "_delete", "_update"]]
+                + [f"DROP TABLE IF EXISTS {quote(self._index)};"]
+            )
+        except Error as error:
+            print("Error: %s." % (" ".join(error.args)))
+            return False
+
+        return True
+
+    def search(self, query: str, limit: int) -> str:
+        """search
+
+        Creates a query that returns the best matches for a full text query, ranked by relevance,
+        with a snippet of the text around the words matched.
+
+        Args:
+            query (str): FTS5 query.
+            limit (int): maximum number of matches.
+
+        Returns:
+            str: sql query.
+        """
+        _index: str = quote(self._index)
+
+        return (
+            f"SELECT rowid, snippet({_index}, -1, '[', ']', '...', {FTS_SNIPPET_TOKENS}) AS snippet, round(rank, 3) AS rank"
+            f" FROM {_index} WHERE {_index} MATCH {quote_literal(query)} ORDER BY rank LIMIT {limit};"
+        )
+
+    def write(self, statements: list[str]) -> None:
+        """write
+
+        Runs statements in a single transaction, rolling it back if any fails.
+
+        Args:
+            statements (list[str]): statements to run.
+        """
+        self._database.execute_with_retry("BEGIN IMMEDIATE;")
+        try:
+            for _statement in statements:
+                self._database.execute_with_retry(_statement)
+            self._database.execute_with_retry("COMMIT;")
+        except Error:
+            self._database.execute_with_retry("ROLLBACK;")
+            raise
@@ -0,0 +1,177 @@
+from re import DOTALL, IGNORECASE, compile
+from sqlite3 import complete_statement
+from typing import Any
+
+#  Matches the start of a simple insert statement, capturing the target table (and optional column list)
+#  up to the VALUES keyword.
+
+_INSERT_HEAD = compile(
+    r"""\s*INSERT\s+INTO\s+((?:"(?:[^"]|"")*"|\[[^\]]*\]|`[^`]*`|[\w$]+)(?:\s*\.\s*(?:"(?:[^"]|"")*"|\[[^\]]*\]|`[^`]*`|[\w$]+))?\s*(?:\([^()]*\))?)\s*VALUES\s*""",
+    IGNORECASE,
+)
+
+#  Matches the quoted names, punctuation and whitespace in the head of an insert, so that whitespace outside
+#  the quotes can be normalised.
+
+_HEAD_TOKEN = compile(r"""("(?:[^"]|"")*"|\[[^\]]*\]|`[^`]*`)|\s*([(),.])\s*|\s+""")
+
+#  Matches a single literal value and the separator after it. Only plain literals are matched,
+#  so any expression fails the match and the statement is executed normally.
+
+_LITERAL = r"""(?:'(?:[^']|'')*'|[xX]'[0-9a-fA-F]*'|[-+]?(?:\d+(?:\.\d*)?|\.\d+)(?:[eE][-+]?\d+)?|NULL)"""
+_ROW = rf"\(\s*{_LITERAL}(?:\s*,\s*{_LITERAL})*\s*\)"
+
+_ROWS = compile(rf"{_ROW}(?:\s*,\s*{_ROW})*\s*;?\s*", IGNORECASE)
+_VALUE = compile(rf"({_LITERAL})\s*([,)])", IGNORECASE)
+
+#  Matches the first keyword of a statement, skipping any leading whitespace and comments.
+
+_FIRST_KEYWORD = compile(r"(?:\s+|--[^\n]*(?:\n|$)|/\*.*?\*/)*(\w*)", DOTALL)
+
+_TRANSACTION_KEYWORDS = ["BEGIN", "COMMIT", "END", "ROLLBACK", "SAVEPOINT", "RELEASE"]
+
+#  Statements starting with these keywords only read. A WITH statement only reads if it contains no keyword that writes.
+
+_READ_KEYWORDS = ["SELECT", "VALUES", "EXPLAIN"]
+_WRITE_KEYWORD = compile(r"\b(?:INSERT|UPDATE|DELETE|REPLACE)\b", IGNORECASE)
+
+#  Limits of a 64 bit SQLite integer. Larger integer literals are stored as reals by SQLite.
+
+_MIN_INTEGER = -(2**63)
+_MAX_INTEGER = 2**63 - 1
+
+
+class InsertBatcher:
+    """InsertBatcher
+
+    Splits a script into statements and recognises simple insert statements so that runs of inserts
+    with the same shape can be executed as a single parameterised statement.
+    """
+
+    def split_statements(self, sql: str) -> list[str]:
+        """split_statements
+
+        Splits a script into complete statements. Semi-colons in strings, comments and
+        trigger bodies do not end a statement.
+
+        Args:
+            sql (str): script to split.
+
+        Returns:
+            list[str]: list of statements.
+        """
+        _statements: list[str] = []
+        _statement: str = ""
+
+        for _part in sql.split(";"):
+            _statement += _part + ";"
+
+            if complete_statement(_statement):
+                if _statement.strip(" \t\r\n;") != "":
+                    _statements.append(_statement)
+                _statement = ""
+
+        #  Anything left over is an incomplete statement, which is kept so that it is reported
+        #  when executed. The split added a final semi-colon which is removed.
+
+        _statement = _statement[:-1]
+        if _statement.strip() != "":
+            _statements.append(_statement)
+
+        return _statements
+
+    def controls_transactions(self, statements: list[str]) -> bool:
+        """controls_transactions
+
+        Checks if any of the statements begins, ends or otherwise controls a transaction.
+
+        Args:
+            statements (list[str]): statements to check.
+
+        Returns:
+            bool: flag indicating if the statements control their own transactions.
+        """
+        for _statement in statements:
+            _keyword = _FIRST_KEYWORD.match(_statement)
+            if _keyword is not None and _keyword.group(1).upper() in _TRANSACTION_KEYWORDS:
+                return True
+
+        return False
+
+    def is_read_only(self, statements: list[str]) -> bool:
+        """is_read_only
+
+        Checks if all the statements only read from the database.
+
+        Args:
+            statements (list[str]): statements to check.
+
+        Returns:
+            bool: flag indicating if the statements only read.
+        """
+        for _statement in statements:
+            _keyword = _FIRST_KEYWORD.match(_statement)
+            _first: str = _keyword.group(1).upper() if _keyword is not None else ""
+
+            if _first == "WITH":
+                if _WRITE_KEYWORD.search(_statement) is not None:
+                    return False
+            elif _first not in _READ_KEYWORDS:
+                return False
+
+        return len(statements) > 0
+
+    def parse_insert(self, statement: str) -> tuple[str, int, list[tuple[Any, ...]]] | None:
+        """parse_insert
+
+        Parses a simple insert statement whose values are all literals.
+
+        Args:
+            statement (str): statement to parse.
+
+        Returns:
+            tuple[str, int, list[tuple[Any, ...]]] | None: target table, number of values per row and the rows,
+            or None if the statement is not a simple insert.
+        """
+        _head = _INSERT_HEAD.match(statement)
+        if _head is None or _ROWS.fullmatch(statement, _head.end()) is None:
+            return None
+
+        #  The statement is known to consist of rows of literals, so the values can be collected in order
+        #  with the bracket after the last value of each row marking the end of the row.
+
+        _rows: list[tuple[Any, ...]] = []
+        _values: list[Any] = []
+
+        for _literal, _separator in _VALUE.findall(statement, _head.end()):
+            _first: str = _literal[0]
+
+            if _first == "'":
+                _values.append(_literal[1:-1].replace("''", "'"))
+            elif _first in "xX":
+                _hex: str = _literal[2:-1]
+                if len(_hex) % 2 != 0:
+                    return None
+                _values.append(bytes.fromhex(_hex))
+            elif _first in "nN":
+                _values.append(None)
+            elif "." in _literal or "e" in _literal or "E" in _literal:
+                _values.append(float(_literal))
+            else:
+                _integer: int = int(_literal)
+                if _integer < _MIN_INTEGER or _integer > _MAX_INTEGER:
+                    return None
+                _values.append(_integer)
+
+            if _separator == ")":
+                if len(_rows) > 0 and len(_values) != len(_rows[0]):
+                    return None
+                _rows.append(tuple(_values))
+                _values = []
+
+        #  Whitespace is normalised outside quoted names only, as it is part of a quoted name. Whitespace
+        #  around punctuation is removed, so that inserts into the same columns are batched together.
+
+        _target: str = _HEAD_TOKEN.sub(lambda _match: _match[1] or _match[2] or " ", _head.group(1)).strip()
+
+        return _target, len(_rows[0]), _rows
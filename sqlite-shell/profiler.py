@@ -0,0 +1,130 @@
+from cProfile import Profile
+from os import path
+from pstats import Stats
+from tracemalloc import get_traced_memory, reset_peak, start, stop
+from typing import Any, Callable
+
+
+class Profiler:
+    """Profiler
+
+    Profiles the shell itself. When on, each command is run under cProfile with tracemalloc
+    tracking allocations, and the functions with the greatest cumulative time and the peak
+    allocation are printed afterwards. Profiles can also be dumped as pstats files.
+    """
+
+    def __init__(self) -> None:
+        """__init__
+
+        Initialises the profiler class.
+        """
+        self._enabled: bool = False
+        self._top: int = 20
+        self._dump_directory: str = ""
+        self._count: int = 0
+
+    def start(self, top: int, dump_directory: str) -> bool:
+        """start
+
+        Turns profiling on.
+
+        Args:
+            top (int): number of functions to print after each command.
+            dump_directory (str): directory to dump pstats files to, or empty string.
+
+        Returns:
+            bool: flag indicating success.
+        """
+        if dump_directory != "" and not path.isdir(dump_directory):
+            print(f"Error: '{dump_directory}' is not a directory..")
+            return False
+
+        self._enabled = True
+        self._top = top
+        self._dump_directory = dump_directory
+
+        start()
+
+        return True
+
+    def stop(self) -> None:
+        """stop
+
+        Turns profiling off.
+        """
+        if self._enabled:
+            self._enabled = False
+            stop()
+
+    def status(self) -> str:
+        """status
+
+        Describes the state of profiling.
+
+        Returns:
+            str: description of profiling.
+        """
+        if not self._enabled:
+            return "Python profiling is OFF"
+        if self._dump_directory != "":
+            return f"Python profiling is ON, top:{self._top}, dumping to '{self._dump_directory}'"
+
+        return f"Python profiling is ON, top:{self._top}"
+
+    def is_enabled(self) -> bool:
+        """is_enabled
+
+        Checks if profiling is on.
+
+        Returns:
+            bool: flag indicating if profiling is on.
+        """
+        return self._enabled
+
+    def run(self, function: Callable[..., Any], *args: Any) -> Any:
+        """run
+
+        Runs a function under the profiler and reports on it, unless profiling was turned off by the function.
+
+        Args:
+            function (Callable[..., Any]): function to profile.
+            args (Any): arguments to pass to function.
+
+        Returns:
+            Any: result of function.
+        """
+        reset_peak()
+        _profile: Profile = Profile()
+
+        _profile.enable()
+        try:
+            _result: Any = function(*args)
+        finally:
+            _profile.disable()
+
+        if self._enabled:
+            _, _peak = get_traced_memory()
+            self.report(_profile, _peak)
+
+        return _result
+
+    def report(self, profile: Profile, peak: int) -> None:
+        """report
+
+        Prints the functions with the greatest cumulative time and the peak allocation,
+        and dumps the profile if a dump directory was given.
+
+        Args:
+            profile (Profile): profile of the command.
+            peak (int): peak traced allocation in bytes.
+        """
+        _stats: Stats = Stats(profile)
+        _stats.strip_dirs().sort_stats("cumulative").print_stats(self._top)
+
+        print(f"Peak Python allocation: {peak / 1024:.1f} KiB")
+
+        if self._dump_directory != "":
+            self._count += 1
+            _filename: str = path.join(self._dump_directory, f"pyprof_{self._count:05d}.pstats")
+            profile.dump_stats(_filename)
+            print(f"Profile written to '{_filename}'")
@@ -0,0 +1,178 @@
+from re import IGNORECASE, compile
+from sqlite3 import Connection, Error, connect
+from typing import Any
+
+from constants import TRACE_PARAMETER_ROWS
+
+#  Patterns used to reduce sql to a fingerprint, so that statements differing only in their
+#  literal values are aggregated together.
+
+_STRING = compile(r"'(?:[^']|'')*'")
+_BLOB = compile(r"\bx\?", IGNORECASE)
+_NUMBER = compile(r"(?<![\w$])[-+]?(?:\d+(?:\.\d*)?|\.\d+)(?:e[-+]?\d+)?\b", IGNORECASE)
+_LIST = compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_WHITESPACE = compile(r"\s+")
+
+
+class QueryLog:
+    """QueryLog
+
+    Records executed statements in a history database, with their parameters, duration,
+    rows and errors, and reports the slowest statements aggregated by fingerprint.
+    """
+
+    def __init__(self, filename: str) -> None:
+        """__init__
+
+        Initialises the query log class, creating the history database if necessary.
+
+        Args:
+            filename (str): history database.
+        """
+        self._conn: Connection = connect(filename)
+        self._conn.execute("PRAGMA journal_mode = WAL;")
+        self._conn.execute("PRAGMA synchronous = NORMAL;")
+
+        with self._conn:
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS history (
+                    id INTEGER PRIMARY KEY,
+                    executed TEXT DEFAULT CURRENT_TIMESTAMP,
+                    database TEXT,
+                    sql TEXT,
+                    fingerprint TEXT,
+                    parameters TEXT,
+                    duration_ms REAL,
+                    rows INTEGER,
+                    error TEXT
+                );"""
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS history_fingerprint ON history (fingerprint, duration_ms);"
+            )
+
+        #  Records are buffered and written together, so that logging does not add a commit per statement.
+
+        self._records: list[tuple[Any, ...]] = []
+
+    def record(
+        self,
+        database: str,
+        sql: str,
+        parameters: Any,
+        duration: float,
+        rows: int,
+        error: str | None,
+    ) -> None:
+        """record
+
+        Records an executed statement. The record is written when the log is next flushed.
+
+        Args:
+            database (str): name of database the statement was executed on.
+            sql (str): sql executed.
+            parameters (Any): parameters passed to sql, a list of them if it was executed for many rows, or None.
+            duration (float): duration in seconds.
+            rows (int): number of rows returned or changed.
+            error (str | None): error reported, or None.
+        """
+        self._records.append(
+            (
+                database,
+                sql.strip(),
+                self.fingerprint(sql),
+                self.parameters_text(parameters),
+                duration * 1000,
+                rows,
+                error,
+            )
+        )
+
+    def flush(self) -> None:
+        """flush
+
+        Writes the buffered records to the history database in a single transaction.
+        """
+        if len(self._records) > 0:
+            try:
+                with self._conn:
+                    self._conn.executemany(
+                        "INSERT INTO history (database, sql, fingerprint, parameters, duration_ms, rows, error) VALUES (?, ?, ?, ?, ?, ?, ?);",
+                        self._records,
+                    )
+            except Error as error:
+                print("Error: could not write history - %s." % (" ".join(error.args)))
+
+            self._records = []
+
+    def slow(self, threshold_ms: float, limit: int) -> list[Any]:
+        """slow
+
+        Gets the statements that took at least the threshold, aggregated by fingerprint
+        and ordered by total duration.
+
+        Args:
+            threshold_ms (float): minimum duration in milliseconds.
+            limit (int): maximum number of fingerprints to return.
+
+        Returns:
+            list[Any]: fingerprint, count, total, mean and maximum duration in milliseconds, rows and errors.
+        """
+        self.flush()
+
+        return self._conn.execute(
+            """SELECT fingerprint, count(*), sum(duration_ms), avg(duration_ms), max(duration_ms), sum(rows), count(error)
+               FROM history WHERE duration_ms >= ?
+               GROUP BY fingerprint ORDER BY sum(duration_ms) DESC LIMIT ?;""",
+            (threshold_ms, limit),
+        ).fetchall()
+
+    def close(self) -> None:
+        """close
+
+        Flushes any buffered records and closes the history database.
+        """
+        self.flush()
+        self._conn.close()
+
+    def parameters_text(self, parameters: Any) -> str | None:
+        """parameters_text
+
+        Describes the parameters passed to a statement. Of the parameters for many rows, only the first
+        few rows are described, with the number of rows.
+
+        Args:
+            parameters (Any): parameters passed to sql, a list of them if it was executed for many rows, or None.
+
+        Returns:
+            str | None: description of parameters, or None if there were none.
+        """
+        if parameters is None:
+            return None
+
+        if isinstance(parameters, list):
+            _rows: str = ", ".join(map(repr, parameters[:TRACE_PARAMETER_ROWS]))
+            _more: str = ", ..." if len(parameters) > TRACE_PARAMETER_ROWS else ""
+            return f"{len(parameters)} row(s): [{_rows}{_more}]"
+
+        return repr(parameters)
+
+    def fingerprint(self, sql: str) -> str:
+        """fingerprint
+
+        Normalises sql by replacing literals with question marks, collapsing lists of values
+        and whitespace, and converting to lower case.
+
+        Args:
+            sql (str): sql to normalise.
+
+        Returns:
+            str: normalised sql.
+        """
+        _fingerprint: str = _STRING.sub("?", sql)
+        _fingerprint = _BLOB.sub("?", _fingerprint)
+        _fingerprint = _NUMBER.sub("?", _fingerprint)
+        _fingerprint = _LIST.sub("(?, ...)", _fingerprint)
+        _fingerprint = _WHITESPACE.sub(" ", _fingerprint)
+
+        return _fingerprint.strip().rstrip(";").strip().lower()
@@ -0,0 +1,32 @@
+#  Helpers that quote names and strings for use in sql built by the shell's commands.
+
+
+def quote(identifier: str) -> str:
+    """quote
+
+    Quotes an identifier for use in sql. The rowid is left unquoted, so that it is not mistaken for a column.
+
+    Args:
+        identifier (str): identifier to quote.
+
+    Returns:
+        str: quoted identifier.
+    """
+    if identifier == "rowid":
+        return identifier
+
+    return '"' + identifier.replace('"', '""') + '"'
+
+
+def quote_literal(value: str) -> str:
+    """quote_literal
+
+    Quotes a string as an sql literal.
+
+    Args:
+        value (str): string to quote.
+
+    Returns:
+        str: quoted string.
+    """
+    return "'" + value.replace("'", "''") + "'"
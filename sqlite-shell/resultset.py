@@ -0,0 +1,323 @@
+from array import array
+from collections.abc import Iterator
+from itertools import accumulate
+from sqlite3 import Cursor
+from typing import Any
+
+#  Storage used for each kind of column. Integers and reals are held unboxed in arrays, text and blobs
+#  as a single buffer with an array of offsets, and anything else as a list of objects.
+
+_KINDS: dict[type, str] = {int: "integer", float: "real", str: "text", bytes: "blob"}
+
+
+class Column:
+    """Column
+
+    Compact storage for the values of one result column. The kind of storage is chosen from the
+    first value that is not NULL. NULLs are recorded in a mask, created when the first NULL is seen.
+    A column whose values turn out to be of mixed types falls back to a list of objects.
+    """
+
+    def __init__(self) -> None:
+        """__init__
+
+        Initialises the column class.
+        """
+        self.kind: str = "null"
+        self._length: int = 0
+        self._nulls: bytearray | None = None
+
+        self._data: Any = None
+        self._offsets: array[int] = array("q", [0])
+
+    def __len__(self) -> int:
+        """__len__
+
+        Returns:
+            int: number of values in column.
+        """
+        return self._length
+
+    def __getitem__(self, index: int | slice) -> Any:
+        """__getitem__
+
+        Gets a single value, or a list of values for a slice.
+
+        Args:
+            index (int | slice): row index or slice.
+
+        Returns:
+            Any: value or list of values.
+        """
+        if isinstance(index, slice):
+            return [self[_index] for _index in range(*index.indices(self._length))]
+
+        if index < 0:
+            index += self._length
+        if index < 0 or index >= self._length:
+            raise IndexError("column index out of range")
+
+        if self.kind == "object":
+            return self._data[index]
+        if self.kind == "null" or (self._nulls is not None and self._nulls[index]):
+            return None
+        if self.kind == "text":
+            return self._data[self._offsets[index] : self._offsets[index + 1]].decode()
+        if self.kind == "blob":
+            return bytes(self._data[self._offsets[index] : self._offsets[index + 1]])
+
+        return self._data[index]
+
+    def __iter__(self) -> Iterator[Any]:
+        """__iter__
+
+        Iterates over the values, unboxing each only as it is reached.
+
+        Returns:
+            Iterator[Any]: values.
+        """
+        if self.kind == "null":
+            return iter([None] * self._length)
+        if self.kind == "object" or (self._nulls is None and self.kind in ["integer", "real"]):
+            return iter(self._data)
+
+        return (self[_index] for _index in range(self._length))
+
+    def nbytes(self) -> int:
+        """nbytes
+
+        Gets the approximate memory used by the column's buffers. Object columns count only the list itself.
+
+        Returns:
+            int: bytes used.
+        """
+        _bytes: int = len(self._nulls) if self._nulls is not None else 0
+
+        if self.kind in ["integer", "real"]:
+            _bytes += self._data.itemsize * len(self._data)
+        elif self.kind in ["text", "blob"]:
+            _bytes += len(self._data) + self._offsets.itemsize * len(self._offsets)
+        elif self.kind == "object":
+            _bytes += 8 * len(self._data)
+
+        return _bytes
+
+    def buffer(self) -> Any:
+        """buffer
+
+        Gets the underlying storage: an array for integer and real columns, a bytearray of concatenated
+        values for text and blob columns (see offsets), or a list for object columns.
+
+        Returns:
+            Any: underlying storage.
+        """
+        return self._data
+
+    def offsets(self) -> array[int]:
+        """offsets
+
+        Gets the offsets of each value within the buffer of a text or blob column. Value i occupies
+        buffer[offsets[i]:offsets[i + 1]].
+
+        Returns:
+            array[int]: offsets.
+        """
+        return self._offsets
+
+    def extend(self, values: tuple[Any, ...]) -> None:
+        """extend
+
+        Appends a batch of values.
+
+        Args:
+            values (tuple[Any, ...]): values to append.
+        """
+        _types: set[type] = set(map(type, values))
+        _has_nulls: bool = type(None) in _types
+        _types.discard(type(None))
+
+        #  The first batch with a value that is not NULL decides the storage.
+
+        if self.kind == "null" and len(_types) > 0:
+            self.start(_KINDS.get(next(iter(_types)), "object") if len(_types) == 1 else "object")
+
+        #  Values of another type than the column holds force the fallback to objects.
+
+        if self.kind not in ["null", "object"] and len(_types) > 0 and _types != {self.type()}:
+            self.convert_to_objects()
+
+        #  Record NULLs, creating the mask if this is the first. Object columns hold NULLs as None.
+
+        if self.kind != "object":
+            if _has_nulls and self._nulls is None:
+                self._nulls = bytearray(self._length)
+            if self._nulls is not None:
+                self._nulls.extend(_value is None for _value in values)
+
+        #  Append the values, with a placeholder in place of each NULL.
+
+        if self.kind == "integer" or self.kind == "real":
+            self._data.extend(values if not _has_nulls else [0 if _value is None else _value for _value in values])
+        elif self.kind == "text":
+            _encoded: list[bytes] = [b"" if _value is None else _value.encode() for _value in values]
+            self.append_buffers(_encoded)
+        elif self.kind == "blob":
+            self.append_buffers([b"" if _value is None else _value for _value in values])
+        elif self.kind == "object":
+            self._data.extend(values)
+
+        self._length += len(values)
+
+    def start(self, kind: str) -> None:
+        """start
+
+        Creates the storage for the column, allowing for any NULLs already seen.
+
+        Args:
+            kind (str): kind of storage.
+        """
+        self.kind = kind
+
+        if kind == "integer":
+            self._data = array("q", bytes(8 * self._length))
+        elif kind == "real":
+            self._data = array("d", bytes(8 * self._length))
+        elif kind in ["text", "blob"]:
+            self._data = bytearray()
+            self._offsets = array("q", bytes(8 * (self._length + 1)))
+        else:
+            self._data = [None] * self._length
+            self._nulls = None
+
+    def type(self) -> type:
+        """type
+
+        Gets the python type of the values held.
+
+        Returns:
+            type: type of values.
+        """
+        for _type, _kind in _KINDS.items():
+            if _kind == self.kind:
+                return _type
+
+        return object
+
+    def append_buffers(self, values: list[bytes]) -> None:
+        """append_buffers
+
+        Appends encoded values to the buffer of a text or blob column, recording their offsets.
+
+        Args:
+            values (list[bytes]): encoded values.
+        """
+        _offsets = accumulate(map(len, values), initial=self._offsets[-1])
+        next(_offsets)
+        self._offsets.extend(_offsets)
+        self._data += b"".join(values)
+
+    def convert_to_objects(self) -> None:
+        """convert_to_objects
+
+        Converts the column to a list of objects, so that it can hold values of any type.
+        """
+        self._data = list(self)
+        self._offsets = array("q", [0])
+        self._nulls = None
+        self.kind = "object"
+
+
+class ResultSet:
+    """ResultSet
+
+    Compact, column oriented storage for the results of a query. Rows are read from the cursor in
+    batches and each column is stored in a Column, so numeric results take a fraction of the memory
+    of a list of tuples. Rows are rebuilt as tuples only as they are iterated over.
+    """
+
+    def __init__(self, cursor: Cursor, batch_size: int) -> None:
+        """__init__
+
+        Initialises the result set class, reading all rows from the cursor.
+
+        Args:
+            cursor (Cursor): cursor of an executed query.
+            batch_size (int): number of rows to read at a time.
+        """
+        self.names: list[str] = [_description[0] for _description in cursor.description or []]
+        self._columns: list[Column] = [Column() for _ in self.names]
+        self._length: int = 0
+
+        while True:
+            _rows: list[Any] = cursor.fetchmany(batch_size)
+            if len(_rows) == 0:
+                break
+
+            for _column, _values in zip(self._columns, zip(*_rows)):
+                _column.extend(_values)
+            self._length += len(_rows)
+
+    def __len__(self) -> int:
+        """__len__
+
+        Returns:
+            int: number of rows.
+        """
+        return self._length
+
+    def __iter__(self) -> Iterator[tuple[Any, ...]]:
+        """__iter__
+
+        Iterates over the rows.
+
+        Returns:
+            Iterator[tuple[Any, ...]]: rows as tuples.
+        """
+        return zip(*self._columns)
+
+    def __getitem__(self, index: int | slice) -> Any:
+        """__getitem__
+
+        Gets a single row, or a list of rows for a slice.
+
+        Args:
+            index (int | slice): row index or slice.
+
+        Returns:
+            Any: row as a tuple, or list of rows.
+        """
+        if isinstance(index, slice):
+            return [self[_index] for _index in range(*index.indices(self._length))]
+
+        if index < 0:
+            index += self._length
+        if index < 0 or index >= self._length:
+            raise IndexError("result set index out of range")
+
+        return tuple(_column[index] for _column in self._columns)
+
+    def column(self, column: int | str) -> Column:
+        """column
+
+        Gets a column by index or name.
+
+        Args:
+            column (int | str): index or name of column.
+
+        Returns:
+            Column: column.
+        """
+        if isinstance(column, str):
+            column = self.names.index(column)
+
+        return self._columns[column]
+
+    def nbytes(self) -> int:
+        """nbytes
+
+        Gets the approximate memory used by the columns' buffers.
+
+        Returns:
+            int: bytes used.
+        """
+        return sum(_column.nbytes() for _column in self._columns)
@@ -0,0 +1,272 @@
+from random import randint, sample
+from sqlite3 import Error
+
+from constants import COUNT_EXACT_ROWS, COUNT_SAMPLE_PAGES, SAMPLE_MAX_PROBES
+from database import Database
+from quoting import quote, quote_literal
+
+
+class Sampler:
+    """Sampler
+
+    Answers questions about the size and content of tables without scanning them. Row counts are
+    estimated from the statistics gathered by ANALYZE, or from the first pages of the table's b-tree,
+    and only counted exactly when the estimate shows that is cheap.
+    Random samples are drawn by probing random rowids between the lowest and highest, which is
+    uniform over the rows that exist and reads only the rows probed.
+    """
+
+    def __init__(self, database: Database) -> None:
+        """__init__
+
+        Initialises the sampler class.
+
+        Args:
+            database (Database): open database.
+        """
+        self._database = database
+
+    def count(self, tables: list[str]) -> bool:
+        """count
+
+        Prints the number of rows in each table, exact or estimated.
+
+        Args:
+            tables (list[str]): names of tables, or empty list for all.
+
+        Returns:
+            bool: flag indicating success.
+        """
+        try:
+            _, _rows = self._database.execute_query(
+                "SELECT name FROM pragma_table_list WHERE schema = 'main' AND type = 'table' AND name NOT LIKE 'sqlite_%' ORDER BY name;"
+            )
+            _names: list[str] = [_name for _name, in _rows]
+
+            for _table in tables:
+                if _table not in _names:
+                    print(f"Error: no such table - {_table}.")
+                    return False
+
+            print(f"{'table':<30}{'rows':>16}  method")
+
+            for _table in tables or _names:
+                _rows_counted, _method = self.count_table(_table)
+                _prefix: str = "" if _method == "exact" else "~"
+                print(f"{_table:<30}{_prefix + format(_rows_counted, ','):>16}  {_method}")
+
+        except Error as error:
+            print("Error: %s." % (" ".join(error.args)))
+            return False
+
+        return True
+
+    def count_table(self, table: str) -> tuple[int, str]:
+        """count_table
+
+        Counts the rows of a table exactly if it is estimated to be small, otherwise estimates them.
+
+        Args:
+            table (str): name of table.
+
+        Returns:
+            tuple[int, str]: number of rows, and how it was found.
+        """
+        _estimate: tuple[int, str] | None = self.estimate(table)
+
+        if _estimate is None or _estimate[0] <= COUNT_EXACT_ROWS:
+            _, _rows = self._database.execute_query(f"SELECT count(*) FROM {quote(table)};")
+            return _rows[0][0], "exact"
+
+        return _estimate
+
+    def estimate(self, table: str) -> tuple[int, str] | None:
+        """estimate
+
+        Estimates the number of rows in a table, from the statistics gathered by ANALYZE, or failing
+        those from the pages of the table's b-tree. If SQLite was built without the dbstat table the
+        lowest and highest rowid, read from the ends of the b-tree, give an upper bound instead.
+
+        Args:
+            table (str): name of table.
+
+        Returns:
+            tuple[int, str] | None: estimated number of rows and how it was estimated, or None if it cannot be.
+        """
+        _, _rows = self._database.execute_query(
+            "SELECT 1 FROM sqlite_schema WHERE type = 'table' AND name = 'sqlite_stat1';"
+        )
+        if len(_rows) > 0:
+            #  The statistics of each index, or of the table if it has none, start with the number of rows.
+
+            _, _rows = self._database.execute_query(
+                f"SELECT max(CAST(stat AS INTEGER)) FROM sqlite_stat1 WHERE tbl = {quote_literal(table)};"
+            )
+            if _rows[0][0] is not None:
+                return _rows[0][0], "sqlite_stat1"
+
+        _pages: int | None = self.estimate_from_pages(table)
+        if _pages is not None:
+            return _pages, "b-tree pages"
+
+        _bounds: tuple[int, int] | None = self.rowid_bounds(table)
+        if _bounds is not None:
+            return _bounds[1] - _bounds[0] + 1, "rowid range, at most"
+
+        return None
+
+    def estimate_from_pages(self, table: str) -> int | None:
+        """estimate_from_pages
+
+        Estimates the number of rows in a table from the first pages of its b-tree, read in order from
+        the root with the dbstat table. The pages at each level are the pages at the level above times
+        the mean number of children of the pages read at that level, and the rows are the leaf pages
+        times the mean number of cells of the leaves read. In a table without rowid the interior pages
+        hold rows too. A b-tree of a single page is counted exactly.
+
+        Args:
+            table (str): name of table.
+
+        Returns:
+            int | None: estimated number of rows, or None if the dbstat table is not available.
+        """
+        try:
+            _, _rows = self._database.execute_query(
+                f"SELECT path, pagetype, ncell FROM dbstat WHERE name = {quote_literal(table)}"
+                f" AND pagetype != 'overflow' LIMIT {COUNT_SAMPLE_PAGES};"
+            )
+        except Error:
+            return None
+
+        if len(_rows) == 0:
+            return None
+
+        #  The depth of a page is the number of steps in its path from the root, '/', as in '/000/001/'.
+
+        _cells: dict[int, list[int]] = {}
+        _leaf: int = 0
+
+        for _path, _type, _count in _rows:
+            _depth: int = _path.count("/") - 1
+            _cells.setdefault(_depth, []).append(_count)
+            if _type == "leaf":
+                _leaf = _depth
+
+        _pages: float = 1.0
+        _interior: float = 0.0
+
+        for _depth in range(_leaf):
+            _mean: float = sum(_cells[_depth]) / len(_cells[_depth])
+            _interior += _pages * _mean
+            _pages *= _mean + 1
+
+        _estimate: float = _pages * sum(_cells[_leaf]) / len(_cells[_leaf])
+
+        _, _without_rowid = self._database.execute_query(
+            f"SELECT wr FROM pragma_table_list WHERE schema = 'main' AND name = {quote_literal(table)};"
+        )
+        if _without_rowid[0][0] == 1:
+            _estimate += _interior
+
+        return round(_estimate)
+
+    def rowid_bounds(self, table: str) -> tuple[int, int] | None:
+        """rowid_bounds
+
+        Gets the lowest and highest rowid of a table.
+
+        Args:
+            table (str): name of table.
+
+        Returns:
+            tuple[int, int] | None: lowest and highest rowid, or None if the table has no rowid or no rows.
+        """
+        _, _rows = self._database.execute_query(
+            f"SELECT wr FROM pragma_table_list WHERE schema = 'main' AND name = {quote_literal(table)};"
+        )
+        if len(_rows) == 0 or _rows[0][0] == 1:
+            return None
+
+        _, _rows = self._database.execute_query(f"SELECT min(rowid), max(rowid) FROM {quote(table)};")
+        if _rows[0][0] is None:
+            return None
+
+        return _rows[0][0], _rows[0][1]
+
+    def sample(self, table: str, rows: int) -> str:
+        """sample
+
+        Creates a query that returns a uniform random sample of the rows of a table.
+
+        Random rowids between the lowest and highest are probed in batches, and the sample is drawn
+        from the rows found. If too few probes find a row, because the rowids are sparse, or the table
+        has no rowid, the rows are instead filtered at random in a single scan, at a rate estimated to
+        give somewhat more rows than needed, which are then sorted at random and limited.
+
+        Args:
+            table (str): name of table.
+            rows (int): number of rows in sample.
+
+        Returns:
+            str: sql query, or empty string if the table does not exist.
+        """
+        try:
+            _, _exists = self._database.execute_query(
+                f"SELECT 1 FROM pragma_table_list WHERE schema = 'main' AND name = {quote_literal(table)};"
+            )
+            if len(_exists) == 0:
+                print(f"Error: no such table - {table}.")
+                return ""
+
+            _bounds: tuple[int, int] | None = self.rowid_bounds(table)
+
+            if _bounds is not None:
+                if _bounds[1] - _bounds[0] + 1 <= rows:
+                    return f"SELECT * FROM {quote(table)};"
+
+                _found: set[int] = set()
+                _probes: int = 0
+
+                while len(_found) < rows and _probes < rows * SAMPLE_MAX_PROBES:
+                    _candidates: list[int] = [randint(*_bounds) for _ in range(2 * (rows - len(_found)))]
+                    _, _hits = self._database.execute_query(
+                        f"SELECT rowid FROM {quote(table)} WHERE rowid IN ({','.join(map(str, _candidates))});"
+                    )
+                    _found.update(_rowid for _rowid, in _hits)
+                    _probes += len(_candidates)
+
+                if len(_found) >= rows:
+                    return (
+                        f"SELECT * FROM {quote(table)} WHERE rowid IN"
+                        f" ({','.join(map(str, sorted(sample(sorted(_found), rows))))});"
+                    )
+
+            #  Fall back to a single scan, keeping each row with a probability that should give twice the rows needed.
+            #  The number of rows is estimated from the statistics or pages, or else counted, as the range of rowids is no guide.
+
+            _estimate: tuple[int, str] | None = self.estimate(table)
+            _total: int
+            if _estimate is not None and _estimate[1] in ["sqlite_stat1", "b-tree pages"]:
+                _total = _estimate[0]
+            else:
+                _, _count = self._database.execute_query(f"SELECT count(*) FROM {quote(table)};")
+                _total = _count[0][0]
+
+            _keep: int = 2 * rows + 10
+
+            if _total == 0:
+                return f"SELECT * FROM {quote(table)};"
+
+            print(f"Sampling '{table}' by scanning, as its rowids are sparse or it has none")
+
+            if _keep >= max(_total, 1):
+                return f"SELECT * FROM {quote(table)} ORDER BY random() LIMIT {rows};"
+
+            return (
+                f"SELECT * FROM (SELECT * FROM {quote(table)} WHERE abs(random() % {_total}) < {_keep})"
+                f" ORDER BY random() LIMIT {rows};"
+            )
+
+        except Error as error:
+            print("Error: %s." % (" ".join(error.args)))
+            return ""
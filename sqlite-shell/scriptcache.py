@@ -0,0 +1,194 @@
+from collections import OrderedDict
+from gzip import open as gzip_open
+from os import path, stat
+from re import DOTALL, compile
+from threading import Lock
+from typing import Any
+
+from constants import SCRIPT_CACHE_ENTRIES
+from insertbatcher import InsertBatcher
+
+#  Matches the parts of a statement that can hold a placeholder: strings, quoted names and comments,
+#  which are skipped, and '?' and ':name' placeholders, which are captured.
+
+_PLACEHOLDER = compile(
+    r"""'(?:[^']|'')*'|"(?:[^"]|"")*"|`[^`]*`|\[[^\]]*\]|--[^\n]*|/\*.*?\*/|(\?|:[A-Za-z_]\w*)""", DOTALL
+)
+
+
+class CompiledScript:
+    """CompiledScript
+
+    The parsed form of a script: its statements, each split at its placeholders, the names of its
+    named placeholders, whether it only reads and whether it controls its own transactions. Inserts
+    of literal values are parsed once, so that running the script again goes straight to execution.
+    Placeholders in strings, quoted names and comments are left alone.
+    """
+
+    def __init__(self, text: str) -> None:
+        """__init__
+
+        Compiles a script.
+
+        Args:
+            text (str): text of script.
+        """
+        _batcher: InsertBatcher = InsertBatcher()
+        _statements: list[str] = _batcher.split_statements(text)
+
+        self.text: str = text
+        self.read_only: bool = _batcher.is_read_only(_statements)
+        self.controls_transactions: bool = _batcher.controls_transactions(_statements)
+
+        #  Each statement is held as the text between its placeholders, and the placeholders, in order.
+        #  The inserts of statements without placeholders are parsed now, the rest once they are bound.
+
+        self._parts: list[tuple[list[str], list[str]]] = []
+        self._inserts: list[Any] = []
+
+        for _statement in _statements:
+            _pieces: list[str] = []
+            _placeholders: list[str] = []
+            _start: int = 0
+
+            for _match in _PLACEHOLDER.finditer(_statement):
+                if _match[1] is not None:
+                    _pieces.append(_statement[_start : _match.start()])
+                    _placeholders.append(_match[1])
+                    _start = _match.end()
+            _pieces.append(_statement[_start:])
+
+            self._parts.append((_pieces, _placeholders))
+            self._inserts.append(_batcher.parse_insert(_statement) if len(_placeholders) == 0 else None)
+
+        self.names: set[str] = {
+            _placeholder[1:] for _, _placeholders in self._parts for _placeholder in _placeholders if _placeholder != "?"
+        }
+
+    def bind(self, positional: list[Any], named: dict[str, Any]) -> tuple[str, list[str], list[Any]]:
+        """bind
+
+        Substitutes values for the placeholders. Each '?' takes the next positional value, quoted as a
+        string, and each ':name' takes the named value as it stands. Placeholders without a value are
+        left for SQLite to report.
+
+        Args:
+            positional (list[Any]): values for '?' placeholders, in order.
+            named (dict[str, Any]): values for ':name' placeholders.
+
+        Returns:
+            tuple[str, list[str], list[Any]]: script, its statements, and the parsed inserts of the statements.
+        """
+        _statements: list[str] = []
+        _inserts: list[Any] = []
+        _next: int = 0
+        _batcher: InsertBatcher = InsertBatcher()
+
+        for (_pieces, _placeholders), _insert in zip(self._parts, self._inserts):
+            if len(_placeholders) == 0:
+                _statements.append(_pieces[0])
+                _inserts.append(_insert)
+                continue
+
+            _values: list[str] = []
+            for _placeholder in _placeholders:
+                if _placeholder == "?" and _next < len(positional):
+                    _values.append("'" + str(positional[_next]).replace("'", "''") + "'")
+                    _next += 1
+                elif _placeholder != "?" and _placeholder[1:] in named:
+                    _values.append(str(named[_placeholder[1:]]))
+                else:
+                    _values.append(_placeholder)
+
+            _statement: str = "".join(_piece + _value for _piece, _value in zip(_pieces, _values)) + _pieces[-1]
+            _statements.append(_statement)
+            _inserts.append(_batcher.parse_insert(_statement))
+
+        return "".join(_statements), _statements, _inserts
+
+
+class ScriptCache:
+    """ScriptCache
+
+    Keeps the compiled form of the scripts run most recently, so that a script run again is neither
+    read nor parsed. Entries are keyed by the full path, size and modification time of the file, so an
+    edited script is compiled again. The least recently used entry is evicted when the cache is full.
+    The cache is shared by all the shells in the process, including the threads of a server.
+    """
+
+    def __init__(self, entries: int) -> None:
+        """__init__
+
+        Initialises the script cache class.
+
+        Args:
+            entries (int): maximum number of scripts to keep.
+        """
+        self._entries = entries
+        self._scripts: OrderedDict[tuple[str, int, int], CompiledScript] = OrderedDict()
+        self._lock: Lock = Lock()
+        self._hits: int = 0
+        self._misses: int = 0
+
+    def load(self, script: str) -> CompiledScript | None:
+        """load
+
+        Gets the compiled form of a script, from the cache if the file is unchanged, otherwise by
+        reading and compiling it. Scripts whose names end in '.gz' are decompressed.
+
+        Args:
+            script (str): name of file containing script.
+
+        Returns:
+            CompiledScript | None: compiled script, or None if it could not be read.
+        """
+        try:
+            _stat = stat(script)
+        except OSError as error:
+            print(f"Error: {error}.")
+            return None
+
+        _key: tuple[str, int, int] = (path.abspath(script), _stat.st_size, _stat.st_mtime_ns)
+
+        with self._lock:
+            _compiled: CompiledScript | None = self._scripts.get(_key)
+            if _compiled is not None:
+                self._scripts.move_to_end(_key)
+                self._hits += 1
+                return _compiled
+
+        try:
+            with (gzip_open(script, "rt") if script.endswith(".gz") else open(script, "r")) as _file:
+                _compiled = CompiledScript(_file.read())
+        except OSError as error:
+            print(f"Error: {error}.")
+            return None
+
+        with self._lock:
+            #  Any entry for an earlier version of the file is replaced.
+
+            for _old in [_old for _old in self._scripts if _old[0] == _key[0]]:
+                del self._scripts[_old]
+
+            self._scripts[_key] = _compiled
+            self._misses += 1
+            while len(self._scripts) > self._entries:
+                self._scripts.popitem(last=False)
+
+        return _compiled
+
+    def status(self) -> str:
+        """status
+
+        Describes the cache.
+
+        Returns:
+            str: number of scripts cached, and hits and misses so far.
+        """
+        with self._lock:
+            return f"{len(self._scripts)} of {self._entries} script(s) cached, {self._hits} hit(s), {self._misses} miss(es)"
+
+
+#  The cache shared by every shell in the process.
+
+SCRIPT_CACHE: ScriptCache = ScriptCache(SCRIPT_CACHE_ENTRIES)
@@ -0,0 +1,336 @@
+import sys
+from asyncio import StreamReader, StreamWriter, get_running_loop, run, start_server, start_unix_server
+from collections.abc import Callable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from io import StringIO
+from json import dumps, loads
+from os import chmod, path, remove
+from socket import AF_UNIX, SOCK_STREAM, create_connection, socket
+from threading import local
+from typing import Any, TextIO
+
+from commandparser import CommandParser
+from config import Config
+from constants import SERVER_HOSTS, SERVER_LINE_LIMIT, SERVER_REJECTED_COMMANDS, SERVER_REJECTED_PARAMETERS
+from database import Database
+from insertbatcher import InsertBatcher
+from scriptcache import SCRIPT_CACHE, CompiledScript
+
+
+class ThreadOutput:
+    """ThreadOutput
+
+    Stands in for standard output so that what each thread prints can be captured separately.
+    Threads that are not capturing write to the original stream.
+    """
+
+    def __init__(self, stream: TextIO) -> None:
+        """__init__
+
+        Initialises the thread output class.
+
+        Args:
+            stream (TextIO): original stream.
+        """
+        self._stream = stream
+        self._local = local()
+
+    def write(self, text: str) -> int:
+        """write
+
+        Writes text to the capturing buffer of the current thread, or to the original stream.
+
+        Args:
+            text (str): text to write.
+
+        Returns:
+            int: number of characters written.
+        """
+        return getattr(self._local, "buffer", self._stream).write(text)
+
+    def flush(self) -> None:
+        """flush
+
+        Flushes the original stream.
+        """
+        self._stream.flush()
+
+    @contextmanager
+    def capture(self) -> Iterator[StringIO]:
+        """capture
+
+        Captures what the current thread prints.
+
+        Yields:
+            Iterator[StringIO]: buffer holding the output.
+        """
+        self._local.buffer = StringIO()
+        try:
+            yield self._local.buffer
+        finally:
+            del self._local.buffer
+
+
+class ShellServer:
+    """ShellServer
+
+    Serves the shell to clients over a Unix socket or a localhost TCP port, so that short scripted
+    calls use connections that are already open, with a warm page cache and schema. Each request is a
+    command string, as typed at the shell, and the reply is what the shell would print.
+
+    Queries that only read run on a pool of threads, each with its own read-only connection. All other
+    sql and built-in commands run on a single writer thread, so writes are serialised.
+
+    Clients are not authenticated, so the server only listens on a Unix socket that only its user can use,
+    or on a port of the local host, and commands that could run code or reach other files are rejected.
+    """
+
+    def __init__(self, config: Config, address: str, readers: int, create_shell: Callable[[Database], Any]) -> None:
+        """__init__
+
+        Initialises the server class.
+
+        Args:
+            config (Config): shell configuration, naming the database to serve.
+            address (str): path of Unix socket, or 'host:port'.
+            readers (int): number of reader threads.
+            create_shell (Callable[[Database], Any]): creates a shell that runs commands on a database.
+        """
+        self._config = config
+        self._address = address
+        self._create_shell = create_shell
+
+        self._insert_batcher: InsertBatcher = InsertBatcher()
+        self._output: ThreadOutput = ThreadOutput(sys.stdout)
+
+        #  Each thread keeps its own shell, and so its own connection, for its lifetime.
+
+        self._local = local()
+        _mode: str = self._config.get_config("open_mode")
+        self._readers: ThreadPoolExecutor = ThreadPoolExecutor(
+            readers, "reader", self.start_thread, ("immutable" if _mode == "immutable" else "ro",)
+        )
+        self._writer: ThreadPoolExecutor = ThreadPoolExecutor(1, "writer", self.start_thread, (_mode,))
+
+    def serve(self) -> bool:
+        """serve
+
+        Runs the server until interrupted.
+
+        Returns:
+            bool: flag indicating success.
+        """
+        if self._config.get_config("open") == "None":
+            print("Error: there is no database open to serve.")
+            return False
+
+        if is_tcp_address(self._address) and self._address.rsplit(":", 1)[0].strip("[]") not in SERVER_HOSTS:
+            print(f"Error: the server only listens on the local host, one of {', '.join(SERVER_HOSTS)}.")
+            return False
+
+        sys.stdout = self._output  # type: ignore[assignment]
+
+        try:
+            run(self.listen())
+        except KeyboardInterrupt:
+            print("Server stopped")
+        except OSError as error:
+            print(f"Error: {error}.")
+            return False
+        finally:
+            sys.stdout = sys.__stdout__
+            self._readers.shutdown(cancel_futures=True)
+            self._writer.shutdown(cancel_futures=True)
+            if not is_tcp_address(self._address) and path.exists(self._address):
+                remove(self._address)
+
+        return True
+
+    async def listen(self) -> None:
+        """listen
+
+        Listens for clients on the socket or port.
+        """
+        if is_tcp_address(self._address):
+            _host, _port = self._address.rsplit(":", 1)
+            _server = await start_server(self.handle, _host.strip("[]"), int(_port), limit=SERVER_LINE_LIMIT)
+        else:
+            _server = await start_unix_server(self.handle, self._address, limit=SERVER_LINE_LIMIT)
+            chmod(self._address, 0o600)
+
+        print(f"Serving '{self._config.get_config("open")}' on '{self._address}', ctrl-c to stop")
+
+        async with _server:
+            await _server.serve_forever()
+
+    async def handle(self, reader: StreamReader, writer: StreamWriter) -> None:
+        """handle
+
+        Runs the commands sent by a client, one per line, replying to each with its output.
+
+        Args:
+            reader (StreamReader): stream from client.
+            writer (StreamWriter): stream to client.
+        """
+        try:
+            while _line := await reader.readline():
+                _command: str = loads(_line)["command"]
+
+                #  Choosing the threads may read and compile a script, so it is done off the event loop.
+
+                _executor: ThreadPoolExecutor = await get_running_loop().run_in_executor(
+                    None, self.executor_for, _command
+                )
+                _output: str = await get_running_loop().run_in_executor(_executor, self.execute, _command)
+
+                writer.write((dumps({"output": _output}) + "\n").encode())
+                await writer.drain()
+
+        except (ConnectionError, ValueError, KeyError):
+            pass
+        finally:
+            writer.close()
+
+    def executor_for(self, command: str) -> ThreadPoolExecutor:
+        """executor_for
+
+        Chooses the threads to run a command on. Only sql that reads, and scripts that only read,
+        can run on the readers. Scripts are compiled, and so classified, once by the script cache.
+
+        Args:
+            command (str): command string.
+
+        Returns:
+            ThreadPoolExecutor: reader or writer threads.
+        """
+        if command.startswith("."):
+            _command, _positional, _ = CommandParser().parse(command)
+            if _command == ".script" and len(_positional) > 0 and _positional[0] != "?":
+                _script: CompiledScript | None = SCRIPT_CACHE.load(str(_positional[0]))
+                if _script is not None and _script.read_only:
+                    return self._readers
+            return self._writer
+        if self._insert_batcher.is_read_only(self._insert_batcher.split_statements(command)):
+            return self._readers
+
+        return self._writer
+
+    def start_thread(self, mode: str) -> None:
+        """start_thread
+
+        Opens the connection of a reader or writer thread.
+
+        Args:
+            mode (str): mode to open database in.
+        """
+        _database: Database = Database()
+        _database.set_busy_handling(
+            int(self._config.get_config("busy_timeout")), int(self._config.get_config("busy_retries"))
+        )
+        _database.open(self._config.get_config("open"), mode)
+
+        self._local.shell = self._create_shell(_database)
+
+    def execute(self, command: str) -> str:
+        """execute
+
+        Runs a command on the current thread's shell, capturing what it prints.
+
+        Args:
+            command (str): command string.
+
+        Returns:
+            str: output of command.
+        """
+        _command, _, _named = CommandParser().parse(command) if command.startswith(".") else ("", [], [])
+        _rejected: list[str] = [
+            _key for _parameter in _named for _key in _parameter if _key.lower() in SERVER_REJECTED_PARAMETERS.get(_command, [])
+        ]
+
+        with self._output.capture() as _buffer:
+            if _command in SERVER_REJECTED_COMMANDS:
+                print(f"Error: '{_command}' is not available when connected to a server.")
+            elif len(_rejected) > 0:
+                print(f"Error: '{_command}' with '{_rejected[0]}' is not available when connected to a server.")
+            else:
+                self._local.shell.dispatch(command)
+
+        return _buffer.getvalue()
+
+
+class ShellClient:
+    """ShellClient
+
+    Sends commands, read as at the shell, to a server and prints the replies.
+    """
+
+    def __init__(self, address: str) -> None:
+        """__init__
+
+        Initialises the client class.
+
+        Args:
+            address (str): path of Unix socket, or 'host:port'.
+        """
+        self._address = address
+
+    def run(self, get_command_string: Callable[[str], str]) -> bool:
+        """run
+
+        Runs the client command loop until exited or the input ends.
+
+        Args:
+            get_command_string (Callable[[str], str]): reads a command string, given the prompt.
+
+        Returns:
+            bool: flag indicating success.
+        """
+        try:
+            if is_tcp_address(self._address):
+                _host, _port = self._address.rsplit(":", 1)
+                _socket: socket = create_connection((_host, int(_port)))
+            else:
+                _socket = socket(AF_UNIX, SOCK_STREAM)
+                _socket.connect(self._address)
+        except OSError as error:
+            print(f"Error: could not connect to '{self._address}' - {error}.")
+            return False
+
+        with _socket, _socket.makefile("rwb") as _stream:
+            while True:
+                try:
+                    _command: str = get_command_string("Command")
+                except EOFError:
+                    break
+
+                if _command.strip() == ".exit":
+                    break
+                if _command == "":
+                    continue
+
+                _stream.write((dumps({"command": _command}) + "\n").encode())
+                _stream.flush()
+
+                _reply: bytes = _stream.readline()
+                if _reply == b"":
+                    print("Error: server closed the connection.")
+                    return False
+
+                print(loads(_reply)["output"], end="")
+
+        return True
+
+
+def is_tcp_address(address: str) -> bool:
+    """is_tcp_address
+
+    Checks if an address is a TCP 'host:port' rather than the path of a Unix socket.
+
+    Args:
+        address (str): address.
+
+    Returns:
+        bool: flag indicating a TCP address.
+    """
+    return ":" in address and address.rsplit(":", 1)[1].isdigit()
@@ -1,12 +1,17 @@
-from os import chdir, getcwd
+from argparse import ArgumentParser
+from collections.abc import Sequence
+from os import chdir, getcwd, path
 from pprint import pprint
 from typing import Any
 
+from blobtransfer import summarise_blobs
 from commandparser import CommandParser
 from commandprocessor import CommandProcessor
 from config import Config
-from constants import INFO
+from constants import INFO, SERVER_READERS, SERVER_SOCKET
 from database import Database
+from profiler import Profiler
+from server import ShellClient, ShellServer
 
 
 class SQLiteShell:
@@ -15,27 +20,36 @@ class SQLiteShell:
     A simple SQLite shell.
     """
 
-    def __init__(self):
+    def __init__(self, config: Config | None = None, database: Database | None = None):
         """__init__
 
-        Initialises the SQLite shell class.
+        Initialises the SQLite shell class. A server creates a shell for each of its threads,
+        sharing its configuration and with the thread's own database.
+
+        Args:
+            config (Config | None): configuration to share, or None to load it.
+            database (Database | None): database to use, or None for a new one.
         """
 
-        #  Load configuration settings
+        if config is None:
+            #  Load configuration settings
+
+            config = Config(getcwd())
+            config.load_config()
 
-        self._config: Config = Config(getcwd())
-        self._config.load_config()
+            #  Restore saved working directory
 
-        #  Restore saved working directory
+            chdir(config.get_config("cwd"))
 
-        chdir(self._config.get_config("cwd"))
+        self._config: Config = config
 
         #  Set up shell
 
-        self._database: Database = Database()
+        self._database: Database = database if database is not None else Database()
+        self._profiler: Profiler = Profiler()
         self._command_parser: CommandParser = CommandParser()
         self._command_processor: CommandProcessor = CommandProcessor(
-            self._config, self._database
+            self._config, self._database, self._profiler
         )
 
     def run(self) -> None:
@@ -45,69 +59,132 @@ class SQLiteShell:
         """
         self.show_program_details()
 
-        #  Restore last opened database.
+        #  Apply busy handling settings and restore last opened database.
+
+        self._database.set_busy_handling(
+            int(self._config.get_config("busy_timeout")),
+            int(self._config.get_config("busy_retries")),
+        )
 
         _database_name: str = self._config.get_config("open")
         if _database_name != "None":
-            self._database.open(self._config.get_config("open"))
+            self._database.open(self._config.get_config("open"), self._config.get_config("open_mode"))
             print(f"Currently open in database '{_database_name}'.")
 
         #  Loop until the shell is exited.
 
         while True:
-            #  Initalise sql and results, and get the command string.
+            _command: str = self.get_command_string()
 
-            _sql: str = ""
-            _results: list[Any] = []
+            #  Dispatch the command, under the profiler if it is on.
 
-            _command: str = self.get_command_string()
+            if self._profiler.is_enabled():
+                _continue: bool = self._profiler.run(self.dispatch, _command)
+            else:
+                _continue = self.dispatch(_command)
+
+            if not _continue:
+                break
+
+        self.show_program_details()
 
-            #  If the command string is not empty process it.
+    def serve(self, address: str, readers: int) -> None:
+        """serve
 
-            if _command != "":
-                #  If the command string starts with a period then it is a built-in command
-                #  and should be prccessed accordingly.
+        Serves the last opened database to clients connecting to the address, until interrupted.
 
-                if _command[0] == ".":
-                    #  Parse the command string.
-                    (
-                        _command,
-                        _positional_parameters,
-                        _named_parameters,
-                    ) = self._command_parser.parse(_command)
+        Args:
+            address (str): path of Unix socket, or 'host:port', or empty string for the default socket.
+            readers (int): number of reader threads.
+        """
+        self.show_program_details()
 
-                    #  If the command is the exit command then break the loop and exit the shell.
+        ShellServer(
+            self._config,
+            address or path.join(self._config.config_file_directory, SERVER_SOCKET),
+            readers,
+            lambda database: SQLiteShell(self._config, database),
+        ).serve()
 
-                    if (
-                        _command == ".exit"
-                        and _positional_parameters == []
-                        and _named_parameters == []
-                    ):
-                        break
+    def connect(self, address: str) -> None:
+        """connect
 
-                    #  Process the command string. Built-in commands will be executed.
-                    #  Some built-in commands may result is sql being returned for execution.
+        Runs the command loop against a server rather than a database.
 
-                    _sql = self._command_processor.process(
-                        _command, _positional_parameters, _named_parameters
-                    )
+        Args:
+            address (str): path of Unix socket, or 'host:port', or empty string for the default socket.
+        """
+        ShellClient(address or path.join(self._config.config_file_directory, SERVER_SOCKET)).run(
+            read_command_string
+        )
 
-                else:
-                    #  If the command is not a built-in command then it is an sql string ending with a semi-colon.
-                    #  Store it for execution.
+    def dispatch(self, command: str) -> bool:
+        """dispatch
 
-                    _sql = _command
+        Parses and processes a command string, executes any resulting sql and displays the results.
 
-                #  Execute any pending sql string.
+        Args:
+            command (str): command string which is a built-in command or sql.
 
-                _results = self._database.execute_sql(
-                    _sql,
-                    self._config.get_config("echo"),
+        Returns:
+            bool: flag indicating if the shell should continue, False if the command was the exit command.
+        """
+        #  Initalise sql and results.
+
+        _sql: str = ""
+        _results: Sequence[Any] = []
+        _command: str = command
+
+        #  If the command string is not empty process it.
+
+        if _command != "":
+            #  If the command string starts with a period then it is a built-in command
+            #  and should be prccessed accordingly.
+
+            if _command[0] == ".":
+                #  Parse the command string.
+                (
+                    _command,
+                    _positional_parameters,
+                    _named_parameters,
+                ) = self._command_parser.parse(_command)
+
+                #  If the command is the exit command then stop the shell.
+
+                if (
+                    _command == ".exit"
+                    and _positional_parameters == []
+                    and _named_parameters == []
+                ):
+                    self._profiler.stop()
+                    self._database.commit_batch()
+                    self._database.stop_trace()
+                    return False
+
+                #  Process the command string. Built-in commands will be executed.
+                #  Some built-in commands may result is sql being returned for execution.
+
+                _sql = self._command_processor.process(
+                    _command, _positional_parameters, _named_parameters
                 )
 
-            self.display_results(_results)
+            else:
+                #  If the command is not a built-in command then it is an sql string ending with a semi-colon.
+                #  Store it for execution.
 
-        self.show_program_details()
+                _sql = _command
+
+            #  Execute any pending sql string.
+
+            _results = self._database.execute_sql(
+                _sql,
+                self._config.get_config("echo"),
+                self._config.get_config("columnar"),
+            )
+
+        self.display_results(_results)
+
+        return True
 
     def show_program_details(self) -> None:
         """show_program_details
@@ -119,43 +196,80 @@ class SQLiteShell:
     def get_command_string(self) -> str:
         """get_command_string
 
-        If a new string starts with a period it is a built-in command so return it immeiately.
-
-        Otherwise loops while gathering strings and adding them to the sql string to
-        be processed. The loop stops when a string is entered that ends with a semi-colon.
+        Prompts for and reads a command string, see 'read_command_string'.
 
         Returns:
             str: command string which is a built-in command or sql.
         """
-        _command_string: str = input("Command > ")
-        if _command_string != "":
-            if _command_string[0] == ".":
-                #  This is a built-in command.
+        #  In batch mode the prompt shows the number of statements waiting to be committed.
 
-                return _command_string
-            else:
-                #  Construct sql string.
+        _prompt: str = "Command"
+        _pending: int | None = self._database.pending_statements()
+        if _pending is not None:
+            _prompt += f" [batch:{_pending}]"
 
-                while not _command_string.endswith(";"):
-                    _command_string += " "
-                    _command_string += input("        > ")
-                return _command_string
+        return read_command_string(_prompt)
 
-        return ""
-
-    def display_results(self, results: list[Any]) -> None:
+    def display_results(self, results: Sequence[Any]) -> None:
         """display_results
 
-        Displays the contents of the results list.
-        Uses pretty print to format output.
+        Displays the contents of the results, a list of tuples or a ResultSet whose rows are
+        rebuilt one at a time as they are displayed. Uses pretty print to format output, with large
+        blobs shown as a summary of their size.
 
         Args:
-            results (list[Any]): results to display.
+            results (Sequence[Any]): results to display.
         """
         for _result in results:
-            pprint(_result, width=self._config.get_config("width"))
+            pprint(summarise_blobs(_result), width=self._config.get_config("width"))
+
+
+def read_command_string(prompt: str) -> str:
+    """read_command_string
+
+    Reads a built-in command, or sql over as many lines as it takes to reach a semi-colon.
+
+    Args:
+        prompt (str): prompt to show.
+
+    Returns:
+        str: command string which is a built-in command or sql.
+    """
+    _command_string: str = input(f"{prompt} > ")
+    if _command_string != "":
+        if _command_string[0] == ".":
+            #  This is a built-in command.
+
+            return _command_string
+        else:
+            #  Construct sql string.
+
+            while not _command_string.endswith(";"):
+                _command_string += " "
+                _command_string += input(f"{' ' * len(prompt)} > ")
+            return _command_string
+
+    return ""
 
 
 if __name__ == "__main__":
+    _argument_parser = ArgumentParser(description=INFO)
+    _mode = _argument_parser.add_mutually_exclusive_group()
+    _mode.add_argument(
+        "--serve", nargs="?", const="", metavar="ADDRESS", help="serve the last opened database on a Unix socket or host:port"
+    )
+    _mode.add_argument(
+        "--connect", nargs="?", const="", metavar="ADDRESS", help="run commands on a server at a Unix socket or host:port"
+    )
+    _argument_parser.add_argument(
+        "--readers", type=int, default=SERVER_READERS, help=f"number of reader threads when serving, default {SERVER_READERS}"
+    )
+    _arguments = _argument_parser.parse_args()
+
     _shell = SQLiteShell()
-    _shell.run()
+    if _arguments.serve is not None:
+        _shell.serve(_arguments.serve, max(_arguments.readers, 1))
+    elif _arguments.connect is not None:
+        _shell.connect(_arguments.connect)
+    else:
+        _shell.run()
@@ -0,0 +1,210 @@
+from os import path
+from sqlite3 import Error
+from threading import Thread
+from time import perf_counter
+from typing import Any
+
+from constants import STRESS_PAYLOAD_BYTES, STRESS_READ_ROWS, STRESS_TABLE
+from database import Database
+
+
+class StressTest:
+    """StressTest
+
+    Simulates concurrent load on a database file. Reader and writer threads each open their own
+    connection, with the shell's busy handling, and run short transactions against a scratch table
+    for a fixed time. Throughput, latency and lock contention are then reported.
+    """
+
+    def __init__(self, filename: str, busy_timeout: int, busy_retries: int) -> None:
+        """__init__
+
+        Initialises the stress test class.
+
+        Args:
+            filename (str): database to load.
+            busy_timeout (int): busy timeout in milliseconds for each connection.
+            busy_retries (int): number of times each connection retries a locked statement.
+        """
+        self._filename = filename
+        self._busy_timeout = busy_timeout
+        self._busy_retries = busy_retries
+
+        self._deadline: float = 0.0
+        self._results: list[dict[str, Any]] = []
+
+    def run(self, readers: int, writers: int, seconds: int) -> bool:
+        """run
+
+        Runs the stress test and reports the results.
+
+        Args:
+            readers (int): number of reader threads.
+            writers (int): number of writer threads.
+            seconds (int): duration of the test in seconds.
+
+        Returns:
+            bool: flag indicating success.
+        """
+        _database: Database = self.connect()
+        if not _database.open(self._filename):
+            return False
+
+        #  The scratch table is dropped afterwards, so a table of the same name must not already exist.
+
+        try:
+            if len(_database.execute_with_retry("SELECT 1 FROM sqlite_schema WHERE name = ?;", (STRESS_TABLE,))) > 0:
+                print(f"Error: a table named '{STRESS_TABLE}' already exists, and would be dropped by the test.")
+                _database.close()
+                return False
+
+            _database.execute_with_retry(
+                f"CREATE TABLE {STRESS_TABLE} (id INTEGER PRIMARY KEY, writer INTEGER, payload BLOB);"
+            )
+        except Error as error:
+            print("Error: %s." % (" ".join(error.args)))
+            _database.close()
+            return False
+
+        #  Start the threads, each with a slot for its results, and wait for them to finish.
+
+        print(f"Running {readers} reader(s) and {writers} writer(s) for {seconds} second(s)...")
+
+        self._deadline = perf_counter() + seconds
+        self._results = [{} for _ in range(readers + writers)]
+
+        _threads: list[Thread] = []
+        for _index in range(readers + writers):
+            _role: str = "reader" if _index < readers else "writer"
+            _threads.append(Thread(target=self.worker, args=(_index, _role)))
+
+        for _thread in _threads:
+            _thread.start()
+        for _thread in _threads:
+            _thread.join()
+
+        #  Checkpoint what the writers left in the write-ahead log, then remove the scratch table.
+
+        try:
+            _journal_mode: str = _database.execute_with_retry("PRAGMA journal_mode;")[0][0]
+            _checkpoint: list[Any] = []
+            if _journal_mode == "wal":
+                _checkpoint = _database.execute_with_retry("PRAGMA wal_checkpoint(PASSIVE);")[0]
+            _wal_size: int = (
+                path.getsize(f"{self._filename}-wal") if path.exists(f"{self._filename}-wal") else 0
+            )
+
+            _database.execute_with_retry(f"DROP TABLE {STRESS_TABLE};")
+        except Error as error:
+            print("Error: %s." % (" ".join(error.args)))
+            _database.close()
+            return False
+
+        _database.close()
+
+        self.report(seconds)
+
+        print(f"Journal mode is {_journal_mode}, write-ahead log is {_wal_size} bytes")
+        if _journal_mode == "wal":
+            print(
+                f"Checkpoint: busy {_checkpoint[0]}, {_checkpoint[1]} frames in log, {_checkpoint[2]} checkpointed"
+            )
+
+        return True
+
+    def connect(self) -> Database:
+        """connect
+
+        Creates a database object with the shell's busy handling.
+
+        Returns:
+            Database: database object, not yet opened.
+        """
+        _database: Database = Database()
+        _database.set_busy_handling(self._busy_timeout, self._busy_retries)
+
+        return _database
+
+    def worker(self, index: int, role: str) -> None:
+        """worker
+
+        Repeatedly reads or writes until the deadline, timing each transaction.
+
+        Args:
+            index (int): index of the worker's results slot.
+            role (str): 'reader' or 'writer'.
+        """
+        _latencies: list[float] = []
+        _failures: int = 0
+
+        _database: Database = self.connect()
+        if not _database.open(self._filename):
+            self._results[index] = {"role": role, "latencies": [], "failures": 0, "retries": 0, "wait": 0.0}
+            return
+
+        while perf_counter() < self._deadline:
+            _started: float = perf_counter()
+
+            try:
+                if role == "reader":
+                    _database.execute_with_retry(
+                        f"SELECT * FROM {STRESS_TABLE} WHERE id > (SELECT max(id) FROM {STRESS_TABLE}) - ?;",
+                        (STRESS_READ_ROWS,),
+                    )
+                else:
+                    _database.execute_transaction(
+                        [
+                            (
+                                f"INSERT INTO {STRESS_TABLE} (writer, payload) VALUES (?, randomblob(?));",
+                                (index, STRESS_PAYLOAD_BYTES),
+                            )
+                        ]
+                    )
+
+                _latencies.append(perf_counter() - _started)
+
+            except Error:
+                _failures += 1
+
+        _retries, _wait = _database.lock_statistics()
+        _database.close()
+
+        self._results[index] = {
+            "role": role,
+            "latencies": _latencies,
+            "failures": _failures,
+            "retries": _retries,
+            "wait": _wait,
+        }
+
+    def report(self, seconds: int) -> None:
+        """report
+
+        Prints throughput, latency and lock contention for the readers and the writers.
+
+        Args:
+            seconds (int): duration of the test in seconds.
+        """
+        print(
+            f"{'role':<8}{'threads':>8}{'ops':>10}{'ops/sec':>10}{'mean ms':>10}{'p99 ms':>10}"
+            f"{'retries':>10}{'wait ms':>10}{'failed':>8}"
+        )
+
+        for _role in ["reader", "writer"]:
+            _results: list[dict[str, Any]] = [_result for _result in self._results if _result["role"] == _role]
+            if len(_results) == 0:
+                continue
+
+            _latencies: list[float] = sorted(
+                _latency for _result in _results for _latency in _result["latencies"]
+            )
+            _operations: int = len(_latencies)
+            _mean: float = sum(_latencies) / _operations * 1000 if _operations > 0 else 0.0
+            _p99: float = _latencies[int(_operations * 0.99)] * 1000 if _operations > 0 else 0.0
+
+            print(
+                f"{_role + 's':<8}{len(_results):>8}{_operations:>10}{_operations / seconds:>10.0f}"
+                f"{_mean:>10.2f}{_p99:>10.2f}{sum(_result['retries'] for _result in _results):>10}"
+                f"{sum(_result['wait'] for _result in _results) * 1000:>10.0f}"
+                f"{sum(_result['failures'] for _result in _results):>8}"
+            )
@@ -0,0 +1,316 @@
+from os import path
+from re import IGNORECASE, compile, escape
+from sqlite3 import Error
+from time import perf_counter
+from typing import Any
+
+from constants import COPY_CHUNK_ROWS, COPY_SCHEMA
+from database import Database
+from quoting import quote, quote_literal
+
+#  Patterns used to find the names in the sql that created a table or index, so they can be renamed.
+
+_NAME: str = r"(\"(?:[^\"]|\"\")*\"|`(?:[^`]|``)*`|\[[^\]]*\]|'(?:[^']|'')*'|[^\s(]+)"
+_CREATE_TABLE = compile(rf"^(CREATE\s+TABLE\s+(?:IF\s+NOT\s+EXISTS\s+)?){_NAME}", IGNORECASE)
+_CREATE_INDEX = compile(rf"^(CREATE\s+(?:UNIQUE\s+)?INDEX\s+(?:IF\s+NOT\s+EXISTS\s+)?){_NAME}(\s+ON\s+){_NAME}", IGNORECASE)
+
+
+class TableCopier:
+    """TableCopier
+
+    Copies a table from one database to another without the rows passing through Python. The copy
+    runs on its own connection to the target database, with the source attached, as a series of
+    INSERT ... SELECT statements over ranges of rowids, committed every so many rows. A new table is
+    created from the source's sql in the first transaction, and its indexes are built after the data,
+    so that they are built in one pass rather than row by row. A new table is dropped if the copy fails.
+    A table that already exists in the target has the rows appended, with new rowids, so its rowid alias
+    column, if it has one, is not copied. Other keys must not clash with those already in the table.
+    Triggers are not copied.
+    """
+
+    def __init__(self, source: str, table: str, target: str, target_table: str, where: str) -> None:
+        """__init__
+
+        Initialises the table copier class.
+
+        Args:
+            source (str): database to copy from.
+            table (str): name of table to copy.
+            target (str): database to copy to, created if it does not exist.
+            target_table (str): name of table to copy to.
+            where (str): condition on the rows to copy, or empty string for all.
+        """
+        self._source = source
+        self._table = table
+        self._target = target
+        self._target_table = target_table
+        self._where = where
+
+    def run(self) -> bool:
+        """run
+
+        Copies the table.
+
+        Returns:
+            bool: flag indicating success.
+        """
+        if not path.isfile(self._source):
+            print(f"Error: '{self._source}' does not exist or is not a database..")
+            return False
+
+        _database: Database = Database()
+        _exists: bool = path.exists(self._target)
+        if not (_database.open(self._target) if _exists else _database.create(self._target)):
+            return False
+
+        try:
+            #  Rows are copied without checking foreign keys, as their parent rows may not have been copied yet.
+
+            _database.execute_with_retry("PRAGMA foreign_keys = OFF;")
+
+            #  A table copied within one database is read from the main schema, rather than attaching the file twice.
+
+            _schema: str = "main" if _exists and path.samefile(self._source, self._target) else COPY_SCHEMA
+            if _schema == COPY_SCHEMA and not _database.attach(self._source, COPY_SCHEMA):
+                return False
+
+            return self.copy(_database, _schema)
+
+        except Error as error:
+            print("Error: %s." % (" ".join(error.args)))
+            return False
+        finally:
+            _database.close()
+
+    def copy(self, database: Database, schema: str) -> bool:
+        """copy
+
+        Copies the table from the given schema of a connection to the target.
+
+        Args:
+            database (Database): connection to the target database.
+            schema (str): schema holding the source table.
+
+        Returns:
+            bool: flag indicating success.
+        """
+        _started: float = perf_counter()
+
+        _, _rows = database.execute_query(
+            f"SELECT type, wr FROM pragma_table_list WHERE schema = {quote_literal(schema)} AND name = {quote_literal(self._table)};"
+        )
+        if len(_rows) == 0 or _rows[0][0] not in ["table", "virtual"]:
+            print(f"Error: no such table - {self._table}.")
+            return False
+        if _rows[0][0] == "virtual":
+            print(f"Error: '{self._table}' is a virtual table, which cannot be copied.")
+            return False
+        _without_rowid: bool = _rows[0][1] == 1
+
+        if schema == "main" and self._table == self._target_table:
+            print("Error: cannot copy a table onto itself.")
+            return False
+
+        _, _rows = database.execute_query(
+            f"SELECT 1 FROM main.sqlite_schema WHERE type = 'table' AND name = {quote_literal(self._target_table)};"
+        )
+        _create: bool = len(_rows) == 0
+
+        #  Generated columns are computed again in the target, so they are not copied. Nor is the rowid alias
+        #  of an existing table, so that appended rows are given new rowids.
+
+        _, _columns = database.execute_query(
+            f"SELECT name FROM pragma_table_xinfo({quote_literal(self._table)}, {quote_literal(schema)}) WHERE hidden NOT IN (2, 3);"
+        )
+        _alias: str | None = None if _create else self.rowid_alias(database)
+        _names: str = ", ".join(
+            quote(_column) for _column, in _columns if _alias is None or _column.lower() != _alias.lower()
+        )
+
+        #  A new table keeps the rowids of the source, while rows appended to an existing table are given new ones.
+
+        if _create and not _without_rowid:
+            _names = f"rowid, {_names}"
+
+        _table: list[str] = []
+        _indexes: list[str] = []
+        if _create:
+            _table, _indexes = self.table_sql(database, schema)
+
+        _source: str = f"{quote(schema)}.{quote(self._table)}"
+        _insert: str = f"INSERT INTO main.{quote(self._target_table)} ({_names}) SELECT {_names} FROM {_source}"
+        _where: str = f" AND ({self._where})" if self._where != "" else ""
+        _copied: int = 0
+        _pending: int = 0
+
+        try:
+            database.execute_with_retry("BEGIN IMMEDIATE;")
+            try:
+                for _sql in _table:
+                    database.execute_with_retry(_sql)
+
+                if _without_rowid:
+                    database.execute_with_retry(f"{_insert} WHERE true{_where};")
+                    _pending = database.changes()
+                else:
+                    #  Each statement copies a range of rowids. After each, a single seek finds the next rowid,
+                    #  skipping any gap, and the transaction is committed once enough rows have been copied.
+
+                    _, _first = database.execute_query(f"SELECT min(rowid) FROM {_source};")
+                    _low: Any = _first[0][0]
+
+                    while _low is not None:
+                        _high: int = _low + COPY_CHUNK_ROWS
+                        database.execute_with_retry(f"{_insert} WHERE rowid >= {_low} AND rowid < {_high}{_where};")
+                        _pending += database.changes()
+
+                        if _pending >= COPY_CHUNK_ROWS:
+                            database.execute_with_retry("COMMIT;")
+                            _copied += _pending
+                            _pending = 0
+                            database.execute_with_retry("BEGIN IMMEDIATE;")
+
+                            _elapsed: float = perf_counter() - _started
+                            print(
+                                f"\rCopying '{self._table}': {_copied:,} rows, {_copied / max(_elapsed, 1e-6):,.0f} rows/sec",
+                                end="",
+                                flush=True,
+                            )
+
+                        _, _next = database.execute_query(
+                            f"SELECT rowid FROM {_source} WHERE rowid >= {_high} ORDER BY rowid LIMIT 1;"
+                        )
+                        _low = _next[0][0] if len(_next) > 0 else None
+
+                database.execute_with_retry("COMMIT;")
+                _copied += _pending
+
+            except BaseException:
+                database.execute_with_retry("ROLLBACK;")
+                raise
+
+            if _copied >= COPY_CHUNK_ROWS:
+                print()
+
+            if len(_indexes) > 0:
+                print(f"Creating {len(_indexes)} index(es)")
+                self.write(database, _indexes)
+
+        except BaseException:
+            if _copied >= COPY_CHUNK_ROWS:
+                print()
+
+            #  Rows committed before the failure are removed with the table, if the copy created it.
+
+            if _create:
+                database.execute_with_retry(f"DROP TABLE IF EXISTS main.{quote(self._target_table)};")
+            raise
+
+        _elapsed = perf_counter() - _started
+        print(
+            f"Copied {_copied:,} rows from '{self._source}:{self._table}' to '{self._target}:{self._target_table}'"
+            f" in {_elapsed:.2f} seconds, {_copied / max(_elapsed, 1e-6):,.0f} rows/sec"
+        )
+        return True
+
+    def table_sql(self, database: Database, schema: str) -> tuple[list[str], list[str]]:
+        """table_sql
+
+        Gets the sql to create the target table and its indexes from the sql of the source's, renamed
+        if need be. Indexes created by constraints in the table's sql are created with the table.
+
+        Args:
+            database (Database): connection to the target database.
+            schema (str): schema holding the source table.
+
+        Returns:
+            tuple[list[str], list[str]]: sql of table, and of indexes.
+        """
+        _, _rows = database.execute_query(
+            f"SELECT type, name, sql FROM {quote(schema)}.sqlite_schema"
+            f" WHERE tbl_name = {quote_literal(self._table)} AND type IN ('table', 'index') AND sql IS NOT NULL"
+            " ORDER BY type = 'index', rowid;"
+        )
+
+        _table: list[str] = []
+        _indexes: list[str] = []
+
+        for _type, _name, _sql in _rows:
+            if _type == "table":
+                _table.append(_CREATE_TABLE.sub(lambda _match: _match[1] + quote(self._target_table), _sql, 1) + ";")
+            else:
+                #  Indexes of a renamed table are renamed after it, so that they do not clash with the source's.
+
+                if self._target_table != self._table:
+                    _name = self.index_name(_name)
+                _indexes.append(
+                    _CREATE_INDEX.sub(
+                        lambda _match: _match[1] + quote(_name) + _match[3] + quote(self._target_table), _sql, 1
+                    )
+                    + ";"
+                )
+
+        return _table, _indexes
+
+    def rowid_alias(self, database: Database) -> str | None:
+        """rowid_alias
+
+        Gets the name of the column of the target table that is an alias for its rowid, being its only
+        primary key column and declared as an INTEGER.
+
+        Args:
+            database (Database): connection to the target database.
+
+        Returns:
+            str | None: name of column, or None if the table has no rowid alias.
+        """
+        _, _rows = database.execute_query(
+            f"SELECT wr FROM pragma_table_list WHERE schema = 'main' AND name = {quote_literal(self._target_table)};"
+        )
+        if len(_rows) == 0 or _rows[0][0] == 1:
+            return None
+
+        _, _rows = database.execute_query(
+            f"SELECT name, upper(type) FROM pragma_table_info({quote_literal(self._target_table)}, 'main') WHERE pk > 0;"
+        )
+        if len(_rows) != 1 or _rows[0][1] != "INTEGER":
+            return None
+
+        return _rows[0][0]
+
+    def index_name(self, name: str) -> str:
+        """index_name
+
+        Renames an index of the source table after the target table. The table's name is replaced where it
+        appears as a word of the index's name, delimited by anything but a letter or digit, otherwise the
+        target table's name is added as a prefix.
+
+        Args:
+            name (str): name of index.
+
+        Returns:
+            str: new name of index.
+        """
+        _renamed, _count = compile(rf"(?<![^\W_]){escape(self._table)}(?![^\W_])").subn(
+            lambda _match: self._target_table, name, 1
+        )
+
+        return _renamed if _count > 0 else f"{self._target_table}_{name}"
+
+    def write(self, database: Database, statements: list[str]) -> None:
+        """write
+
+        Runs statements in a single transaction, rolling it back if any fails.
+
+        Args:
+            database (Database): connection to the target database.
+            statements (list[str]): statements to run.
+        """
+        database.execute_with_retry("BEGIN IMMEDIATE;")
+        try:
+            for _statement in statements:
+                database.execute_with_retry(_statement)
+            database.execute_with_retry("COMMIT;")
+        except Error:
+            database.execute_with_retry("ROLLBACK;")
+            raise
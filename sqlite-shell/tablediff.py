@@ -0,0 +1,475 @@
+from sqlite3 import Error
+from typing import Any, TextIO
+
+from constants import DIFF_FANOUT, DIFF_LEAF_ROWS, DIFF_SCHEMA
+from database import Database
+from quoting import quote, quote_literal
+
+#  Name of the sql function used to hash rows and keys while comparing.
+
+_HASH_FUNCTION = "shell_diff_hash"
+
+#  Name given to the hash of each row's key while summarising hash buckets.
+
+_KEY_HASH = "shell_diff_key_hash"
+
+
+def row_hash(*values: Any) -> int:
+    """row_hash
+
+    Hashes the values of a row. The text of the values is hashed, rather than the values, so that
+    values Python treats as equal, such as 1 and 1.0, hash differently. The hash is 32 bits, so that
+    the hashes of a whole table can be summed without overflowing. Python's string hash is seeded
+    per process, which suits comparing two copies of a table within one run.
+
+    >>> row_hash(-1) != row_hash(-2)
+    True
+    >>> row_hash(1) != row_hash(1.0)
+    True
+    >>> row_hash("1") != row_hash(1) and row_hash(b"1") != row_hash("1")
+    True
+    >>> row_hash(None, 1) != row_hash(1, None)
+    True
+
+    Args:
+        values (Any): values of row.
+
+    Returns:
+        int: hash of row.
+    """
+    return hash(repr(values)) & 0xFFFFFFFF
+
+
+class TableDiff:
+    """TableDiff
+
+    Compares tables in the open database with those in another database, attached to the same
+    connection. Rows are never transferred to be compared one by one unless they differ. Instead
+    both copies of a table are split into chunks, and each chunk is summarised by its row count
+    and the sum of a hash of each row's values, in a single aggregate query per copy. Only chunks
+    whose summaries differ are split again, until they are small enough to compare row by row. The
+    table is compared a level of chunks at a time.
+
+    Tables with a single integer primary key, or keyed by rowid, are split into ranges of the key,
+    so that narrowing a range only reads that range through the index. Tables with any other key
+    are split into buckets by a hash of the key. As no index can find the rows of a bucket, all the
+    buckets of a level are summarised in one scan of each copy.
+    """
+
+    def __init__(self, database: Database, patch: TextIO | None) -> None:
+        """__init__
+
+        Initialises the table diff class.
+
+        Args:
+            database (Database): open database, with the other database attached.
+            patch (TextIO | None): file to write a patch to, or None to print the differing rows.
+        """
+        self._database = database
+        self._patch = patch
+
+        #  Details of the table being compared.
+
+        self._table: str = ""
+        self._key: list[str] = []
+        self._columns: list[str] = []
+        self._ranged: bool = False
+
+        self._queries: int = 0
+
+    def run(self, tables: list[str]) -> bool:
+        """run
+
+        Compares the tables, or all the tables in either database if none are given.
+
+        Args:
+            tables (list[str]): names of tables to compare.
+
+        Returns:
+            bool: flag indicating success.
+        """
+        try:
+            self._database.create_function(_HASH_FUNCTION, -1, row_hash)
+
+            _main: list[str] = self.table_names("main")
+            _other: list[str] = self.table_names(DIFF_SCHEMA)
+
+            for _table in tables or sorted(set(_main) | set(_other)):
+                if _table not in _main and _table not in _other:
+                    print(f"{_table}: not found")
+                    continue
+                if _table not in _main or _table not in _other:
+                    print(f"{_table}: only in {'this' if _table in _main else 'the other'} database")
+                    continue
+
+                self.compare_table(_table)
+
+        except Error as error:
+            print("Error: %s." % (" ".join(error.args)))
+            return False
+
+        return True
+
+    def table_names(self, schema: str) -> list[str]:
+        """table_names
+
+        Gets the names of the tables in a database.
+
+        Args:
+            schema (str): 'main' or the name of the attached database.
+
+        Returns:
+            list[str]: names of tables.
+        """
+        _, _rows = self._database.execute_query(
+            f"SELECT name FROM {schema}.sqlite_schema WHERE type = 'table' AND name NOT LIKE 'sqlite_%';"
+        )
+
+        return [_name for _name, in _rows]
+
+    def compare_table(self, table: str) -> None:
+        """compare_table
+
+        Compares the two copies of a table and reports or patches the differences.
+
+        Args:
+            table (str): name of table.
+        """
+        _columns: list[str] = self.column_names("main", table)
+        if _columns != self.column_names(DIFF_SCHEMA, table):
+            print(f"{table}: columns differ, not compared")
+            return
+
+        #  Rows are matched by primary key, or by rowid if there is none. A single integer key is split into ranges.
+
+        self._table = table
+        self._key = self._database.primary_key(table)
+        self._columns = _columns if len(self._key) > 0 else ["rowid"] + _columns
+        self._key = self._key or ["rowid"]
+        self._ranged = len(self._key) == 1 and self.is_integer_key(table)
+        self._queries = 0
+
+        _differences: list[tuple[str, tuple[str, ...] | None, tuple[str, ...] | None]] = []
+
+        if self._ranged:
+            _, _bounds = self._database.execute_query(
+                f"SELECT min(lo), max(hi) FROM (SELECT min({self.key_sql()}) AS lo, max({self.key_sql()}) AS hi FROM main.{quote(table)}"
+                f" UNION ALL SELECT min({self.key_sql()}), max({self.key_sql()}) FROM {DIFF_SCHEMA}.{quote(table)});"
+            )
+            if _bounds[0][0] is not None:
+                self.compare_chunks([_bounds[0]], _differences)
+        else:
+            self.compare_chunks([(0, 0)], _differences)
+
+        self.report(_differences)
+
+    def column_names(self, schema: str, table: str) -> list[str]:
+        """column_names
+
+        Gets the names of the columns of a table.
+
+        Args:
+            schema (str): 'main' or the name of the attached database.
+            table (str): name of table.
+
+        Returns:
+            list[str]: names of columns.
+        """
+        _, _rows = self._database.execute_query(
+            f"SELECT name FROM pragma_table_info({quote_literal(table)}, {quote_literal(schema)});"
+        )
+
+        return [_name for _name, in _rows]
+
+    def is_integer_key(self, table: str) -> bool:
+        """is_integer_key
+
+        Checks if a table is keyed by rowid or by a single column declared as an integer.
+
+        Args:
+            table (str): name of table.
+
+        Returns:
+            bool: flag indicating if the key can be split into ranges.
+        """
+        if self._key == ["rowid"]:
+            return True
+
+        _, _rows = self._database.execute_query(
+            f"SELECT upper(type) FROM pragma_table_info({quote_literal(table)}) WHERE pk = 1;"
+        )
+
+        return _rows[0][0] == "INTEGER"
+
+    def compare_chunks(
+        self,
+        chunks: list[tuple[int, int]],
+        differences: list[tuple[str, tuple[str, ...] | None, tuple[str, ...] | None]],
+    ) -> None:
+        """compare_chunks
+
+        Compares the table a level at a time. The parts of all the chunks at a level are summarised in
+        each copy of the table, and the parts whose summaries differ become the chunks of the next level,
+        or, once they are small enough, have their rows compared.
+
+        Args:
+            chunks (list[tuple[int, int]]): chunks at the first level.
+            differences (list[tuple[str, tuple[str, ...] | None, tuple[str, ...] | None]]): differences found.
+        """
+        _chunks: list[tuple[int, int]] = chunks
+
+        while len(_chunks) > 0:
+            _main: dict[tuple[int, int], tuple[int, int]] = self.summarise("main", _chunks)
+            _other: dict[tuple[int, int], tuple[int, int]] = self.summarise(DIFF_SCHEMA, _chunks)
+
+            _chunks = []
+            _leaves: list[tuple[int, int]] = []
+
+            for _child in sorted(set(_main) | set(_other)):
+                _main_summary: tuple[int, int] = _main.get(_child, (0, 0))
+                _other_summary: tuple[int, int] = _other.get(_child, (0, 0))
+                if _main_summary == _other_summary:
+                    continue
+
+                if max(_main_summary[0], _other_summary[0]) <= DIFF_LEAF_ROWS or self.is_smallest(_child):
+                    _leaves.append(_child)
+                else:
+                    _chunks.append(_child)
+
+            if len(_leaves) > 0:
+                self.compare_rows(_leaves, differences)
+
+    def summarise(self, schema: str, chunks: list[tuple[int, int]]) -> dict[tuple[int, int], tuple[int, int]]:
+        """summarise
+
+        Splits chunks of one copy of the table into parts, and gets the number of rows and the sum of
+        the row hashes of each part. Each range is summarised by its own query, which reads only that
+        range through the index. All the hash buckets of a level are summarised by a single query, as
+        each query over buckets reads the whole table.
+
+        Args:
+            schema (str): 'main' or the name of the attached database.
+            chunks (list[tuple[int, int]]): lowest and highest key of ranges, or number of hash bits and buckets.
+
+        Returns:
+            dict[tuple[int, int], tuple[int, int]]: row count and hash sum of each part that has rows, by the chunk it covers.
+        """
+        _summaries: dict[tuple[int, int], tuple[int, int]] = {}
+
+        for _group in [[_chunk] for _chunk in chunks] if self._ranged else [chunks]:
+            _summary_sql: str = f"count(*), sum({_HASH_FUNCTION}({self.row_sql()}))"
+
+            if self._ranged:
+                _sql: str = (
+                    f"SELECT {self.part_sql(_group[0])} AS part, {_summary_sql}"
+                    f" FROM {schema}.{quote(self._table)} WHERE {self.where_sql(_group)} GROUP BY part;"
+                )
+            else:
+                #  The hash of each row's key is found once, in a subquery, and used both to select and to group the row.
+
+                _mask: int = (1 << (_group[0][0] + DIFF_FANOUT.bit_length() - 1)) - 1
+                _sql = (
+                    f"SELECT {_KEY_HASH} & {_mask} AS part, {_summary_sql}"
+                    f" FROM (SELECT *, {self.key_hash_sql()} AS {_KEY_HASH} FROM {schema}.{quote(self._table)})"
+                    f" WHERE {self.where_sql(_group, _KEY_HASH)} GROUP BY part;"
+                )
+
+            _, _rows = self._database.execute_query(_sql)
+            self._queries += 1
+
+            _summaries.update({self.child(_group[0], _part): (_count, _sum) for _part, _count, _sum in _rows})
+
+        return _summaries
+
+    def compare_rows(
+        self,
+        chunks: list[tuple[int, int]],
+        differences: list[tuple[str, tuple[str, ...] | None, tuple[str, ...] | None]],
+    ) -> None:
+        """compare_rows
+
+        Compares the rows of chunks in each copy of the table by key. Values are fetched as sql literals,
+        ready to be printed or written to a patch. As in 'summarise', ranges are read one at a time and
+        hash buckets all together.
+
+        Args:
+            chunks (list[tuple[int, int]]): lowest and highest key of ranges, or number of hash bits and buckets.
+            differences (list[tuple[str, tuple[str, ...] | None, tuple[str, ...] | None]]): differences found.
+        """
+        _positions: list[int] = [self._columns.index(_column) for _column in self._key]
+
+        for _group in [[_chunk] for _chunk in chunks] if self._ranged else [chunks]:
+            _rows: list[dict[tuple[str, ...], tuple[str, ...]]] = []
+
+            for _schema in ["main", DIFF_SCHEMA]:
+                _, _result = self._database.execute_query(
+                    f"SELECT {', '.join(f'quote({quote(_column)})' for _column in self._columns)}"
+                    f" FROM {_schema}.{quote(self._table)} WHERE {self.where_sql(_group)};"
+                )
+                _rows.append({tuple(_row[_index] for _index in _positions): _row for _row in _result})
+
+            _main, _other = _rows
+
+            for _key in sorted(set(_main) | set(_other)):
+                if _main.get(_key) != _other.get(_key):
+                    differences.append((self._table, _main.get(_key), _other.get(_key)))
+
+    def report(self, differences: list[tuple[str, tuple[str, ...] | None, tuple[str, ...] | None]]) -> None:
+        """report
+
+        Prints the differences, rows only in this database prefixed with '-' and rows only in the other
+        prefixed with '+', or writes a patch that makes this database match the other.
+
+        Args:
+            differences (list[tuple[str, tuple[str, ...] | None, tuple[str, ...] | None]]): differences found.
+        """
+        print(f"{self._table}: {len(differences)} row(s) differ, {self._queries} chunk queries")
+
+        for _, _main, _other in differences:
+            if self._patch is not None:
+                self._patch.write(self.patch_statement(_main, _other) + "\n")
+                continue
+
+            if _main is not None:
+                print(f"- ({', '.join(_main)})")
+            if _other is not None:
+                print(f"+ ({', '.join(_other)})")
+
+    def patch_statement(self, main: tuple[str, ...] | None, other: tuple[str, ...] | None) -> str:
+        """patch_statement
+
+        Creates the statement that changes a row of this database to match the other.
+
+        Args:
+            main (tuple[str, ...] | None): row in this database, or None.
+            other (tuple[str, ...] | None): row in the other database, or None.
+
+        Returns:
+            str: sql statement.
+        """
+        _table: str = quote(self._table)
+        _row: tuple[str, ...] = other if other is not None else main  # type: ignore[assignment]
+        _where: str = " AND ".join(f"{quote(_column)} = {_row[self._columns.index(_column)]}" for _column in self._key)
+
+        if other is None:
+            return f"DELETE FROM {_table} WHERE {_where};"
+        if main is None:
+            return f"INSERT INTO {_table} ({', '.join(map(quote, self._columns))}) VALUES ({', '.join(other)});"
+
+        _set: str = ", ".join(
+            f"{quote(_column)} = {_value}"
+            for _column, _value in zip(self._columns, other)
+            if _column not in self._key
+        )
+        return f"UPDATE {_table} SET {_set} WHERE {_where};"
+
+    def child(self, chunk: tuple[int, int], part: int) -> tuple[int, int]:
+        """child
+
+        Gets the chunk covered by a part of a chunk.
+
+        Args:
+            chunk (tuple[int, int]): lowest and highest key of a range, or number of hash bits and bucket.
+            part (int): part of chunk.
+
+        Returns:
+            tuple[int, int]: chunk.
+        """
+        if self._ranged:
+            _width: int = self.width(chunk)
+            return chunk[0] + part * _width, min(chunk[0] + (part + 1) * _width - 1, chunk[1])
+
+        return chunk[0] + DIFF_FANOUT.bit_length() - 1, part
+
+    def is_smallest(self, chunk: tuple[int, int]) -> bool:
+        """is_smallest
+
+        Checks if a chunk cannot usefully be split again.
+
+        Args:
+            chunk (tuple[int, int]): lowest and highest key of a range, or number of hash bits and bucket.
+
+        Returns:
+            bool: flag indicating if the chunk is as small as it can be.
+        """
+        return chunk[0] == chunk[1] if self._ranged else chunk[0] >= 32
+
+    def width(self, chunk: tuple[int, int]) -> int:
+        """width
+
+        Gets the width of each part of a range.
+
+        Args:
+            chunk (tuple[int, int]): lowest and highest key of range.
+
+        Returns:
+            int: width of part.
+        """
+        return -(-(chunk[1] - chunk[0] + 1) // DIFF_FANOUT)
+
+    def part_sql(self, chunk: tuple[int, int]) -> str:
+        """part_sql
+
+        Creates the expression that gives the part of a range a key falls in, by counting the boundaries
+        between parts at or below the key. Unlike dividing the key's offset from the start of the range,
+        this cannot overflow when the keys span the whole range of 64 bit integers.
+
+        Args:
+            chunk (tuple[int, int]): lowest and highest key of range.
+
+        Returns:
+            str: sql expression.
+        """
+        _width: int = self.width(chunk)
+        _boundaries: list[str] = [
+            f"({self.key_sql()} >= {chunk[0] + _part * _width})"
+            for _part in range(1, DIFF_FANOUT)
+            if chunk[0] + _part * _width <= chunk[1]
+        ]
+
+        return " + ".join(_boundaries) or "0"
+
+    def where_sql(self, chunks: list[tuple[int, int]], key_hash: str = "") -> str:
+        """where_sql
+
+        Creates the condition that selects the rows of chunks. Hash buckets must all have the same number of bits.
+
+        Args:
+            chunks (list[tuple[int, int]]): lowest and highest key of ranges, or number of hash bits and buckets.
+            key_hash (str): name of a column holding the hash of the key, or empty string to compute it.
+
+        Returns:
+            str: sql condition.
+        """
+        if self._ranged:
+            return " OR ".join(f"{self.key_sql()} BETWEEN {_chunk[0]} AND {_chunk[1]}" for _chunk in chunks)
+
+        return (
+            f"{key_hash or self.key_hash_sql()} & {(1 << chunks[0][0]) - 1}"
+            f" IN ({', '.join(str(_chunk[1]) for _chunk in chunks)})"
+        )
+
+    def key_sql(self) -> str:
+        """key_sql
+
+        Returns:
+            str: sql for the single key column.
+        """
+        return quote(self._key[0])
+
+    def key_hash_sql(self) -> str:
+        """key_hash_sql
+
+        Returns:
+            str: sql for the hash of the key.
+        """
+        return f"{_HASH_FUNCTION}({", ".join(map(quote, self._key))})"
+
+    def row_sql(self) -> str:
+        """row_sql
+
+        Returns:
+            str: sql for the columns of a row, to be hashed.
+        """
+        return ", ".join(map(quote, self._columns))
+
@@ -0,0 +1,190 @@
+from abc import ABC, abstractmethod
+from array import array
+from collections.abc import Callable
+from functools import partial
+from inspect import Parameter, getmembers, isabstract, signature
+from operator import is_not
+from types import ModuleType
+from typing import Any
+
+#  Attribute set by the decorators below on functions and classes to be registered with SQLite.
+
+SQLITE_FUNCTION = "sqlite_function"
+
+
+def scalar(name: str = "", deterministic: bool = False) -> Callable[[Any], Any]:
+    """scalar
+
+    Marks a function in a module loaded by '.function' to be registered as a scalar sql function.
+    Deterministic functions always return the same result for the same arguments, so SQLite can
+    use them in indexes and evaluate them once for constant arguments.
+
+    Args:
+        name (str): sql name of the function, defaults to the python name.
+        deterministic (bool): flag indicating if the function is deterministic.
+
+    Returns:
+        Callable[[Any], Any]: decorator.
+    """
+    return partial(mark, "scalar", name, deterministic)
+
+
+def aggregate(name: str = "") -> Callable[[Any], Any]:
+    """aggregate
+
+    Marks a class in a module loaded by '.function' to be registered as an aggregate sql function.
+    The class must provide 'step' and 'finalize' methods.
+
+    Args:
+        name (str): sql name of the function, defaults to the python name.
+
+    Returns:
+        Callable[[Any], Any]: decorator.
+    """
+    return partial(mark, "aggregate", name, False)
+
+
+def window(name: str = "") -> Callable[[Any], Any]:
+    """window
+
+    Marks a class in a module loaded by '.function' to be registered as a window sql function.
+    The class must provide 'step', 'inverse', 'value' and 'finalize' methods.
+
+    Args:
+        name (str): sql name of the function, defaults to the python name.
+
+    Returns:
+        Callable[[Any], Any]: decorator.
+    """
+    return partial(mark, "window", name, False)
+
+
+def mark(kind: str, name: str, deterministic: bool, function: Any) -> Any:
+    """mark
+
+    Records how a function or class is to be registered. A class that does not implement all its
+    abstract methods, such as a subclass of BatchedAggregate without 'reduce', is rejected here, when
+    it is defined, rather than when sql first calls it.
+
+    Args:
+        kind (str): 'scalar', 'aggregate' or 'window'.
+        name (str): sql name of the function, or empty string for the python name.
+        deterministic (bool): flag indicating if the function is deterministic.
+        function (Any): function or class to mark.
+
+    Returns:
+        Any: the function or class, marked.
+    """
+    if isabstract(function):
+        raise TypeError(
+            f"'{function.__name__}' does not implement {', '.join(sorted(function.__abstractmethods__))}"
+        )
+
+    setattr(function, SQLITE_FUNCTION, (kind, name or function.__name__, deterministic))
+    return function
+
+
+def find_functions(module: ModuleType) -> list[tuple[str, str, int, Any, bool]]:
+    """find_functions
+
+    Finds the marked functions and classes in a module.
+
+    Args:
+        module (ModuleType): module to search.
+
+    Returns:
+        list[tuple[str, str, int, Any, bool]]: kind, sql name, number of arguments, function or class,
+        and deterministic flag of each.
+    """
+    _functions: list[tuple[str, str, int, Any, bool]] = []
+
+    for _, _member in getmembers(module):
+        #  Only the function or class itself is marked, not subclasses that inherit the mark.
+
+        _mark: Any = getattr(_member, "__dict__", {}).get(SQLITE_FUNCTION)
+        if _mark is None:
+            continue
+
+        _kind, _name, _deterministic = _mark
+        _function: Any = _member if _kind == "scalar" else _member.step
+
+        #  The number of arguments comes from the signature, -1 if it takes any number.
+
+        _parameters = [
+            _parameter
+            for _parameter in signature(_function).parameters.values()
+            if _parameter.name != "self"
+        ]
+        _arguments: int = (
+            -1
+            if any(_parameter.kind == Parameter.VAR_POSITIONAL for _parameter in _parameters)
+            else len(_parameters)
+        )
+
+        _functions.append((_kind, _name, _arguments, _member, _deterministic))
+
+    return _functions
+
+
+class BatchedAggregate(ABC):
+    """BatchedAggregate
+
+    Base class for aggregates that buffer their argument and reduce all the values at once, rather
+    than running python code for each row. The 'step' method is the append method of a list, so each
+    row is buffered without a python call. On 'finalize' the values that are not NULL are packed into
+    an array of the given typecode and passed to 'reduce', which subclasses must implement.
+
+    Example:
+
+        @aggregate("median")
+        class Median(BatchedAggregate):
+            def reduce(self, values: array) -> Any:
+                return statistics.median(values) if len(values) > 0 else None
+    """
+
+    typecode: str = "d"
+
+    def __init__(self) -> None:
+        """__init__
+
+        Initialises the aggregate, binding 'step' to the buffer.
+        """
+        self._values: list[Any] = []
+        self.step = self._values.append  # type: ignore[method-assign]
+
+    def step(self, value: Any) -> None:
+        """step
+
+        Buffers a value. Replaced on each instance by the buffer's append method.
+
+        Args:
+            value (Any): value to buffer.
+        """
+        self._values.append(value)
+
+    def finalize(self) -> Any:
+        """finalize
+
+        Packs the buffered values into an array and reduces them.
+
+        Returns:
+            Any: result of aggregate.
+        """
+        _values: array[Any] = array(self.typecode, filter(partial(is_not, None), self._values))
+        self._values.clear()
+
+        return self.reduce(_values)
+
+    @abstractmethod
+    def reduce(self, values: array[Any]) -> Any:
+        """reduce
+
+        Reduces the values to the result of the aggregate.
+
+        Args:
+            values (array[Any]): values that are not NULL.
+
+        Returns:
+            Any: result of aggregate.
+        """
+        ...
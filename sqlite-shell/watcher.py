@@ -0,0 +1,188 @@
+from collections import Counter
+from datetime import datetime
+from re import IGNORECASE, compile
+from sqlite3 import Error
+from time import sleep
+from typing import Any
+
+from database import Database
+
+#  Pattern used to find the first table a query reads from, whose primary key identifies its rows.
+
+_FROM_TABLE = compile(r"\bFROM\s+([\"`\[]?)([\w.]+)[\"`\]]?", IGNORECASE)
+
+
+class Watcher:
+    """Watcher
+
+    Re-runs a query whenever the database changes and prints only the rows added, removed or
+    changed since the previous run. Changes are detected by polling 'PRAGMA data_version', which
+    costs nothing when the database is unchanged, so the query itself is only run after a commit.
+    Rows are matched by the primary key of the table queried when its columns are in the results,
+    and compared by a hash of the whole row; otherwise whole rows are compared.
+    """
+
+    def __init__(self, database: Database, query: str, interval: int) -> None:
+        """__init__
+
+        Initialises the watcher class.
+
+        Args:
+            database (Database): open database to watch.
+            query (str): query to run.
+            interval (int): polling interval in milliseconds.
+        """
+        self._database = database
+        self._query = query
+        self._interval = interval
+
+        #  Positions of the key columns in each row, or None if rows are compared whole.
+
+        self._key: list[int] | None = None
+
+        self._hashes: dict[Any, int] = {}
+        self._rows: Counter[Any] = Counter()
+
+    def run(self) -> bool:
+        """run
+
+        Runs the query, prints its results and then prints the differences each time the
+        database changes, until interrupted.
+
+        Returns:
+            bool: flag indicating success.
+        """
+        try:
+            _names, _rows = self._database.execute_query(self._query)
+            self._key = self.find_key(_names)
+            _changes: tuple[list[Any], list[Any], list[Any]] = self.compare(_rows)
+            _version: int = self._database.data_version()
+        except Error as error:
+            print("Error: %s." % (" ".join(error.args)))
+            return False
+
+        for _row in _changes[0]:
+            print(_row)
+        print(
+            f"-- {datetime.now():%H:%M:%S} {len(_rows)} row(s), keyed by {self.describe_key(_names)};"
+            f" checking every {self._interval} ms, ctrl-c to stop"
+        )
+
+        try:
+            while True:
+                sleep(self._interval / 1000)
+
+                #  Only run the query again if another connection has committed a change.
+
+                _new_version: int = self._database.data_version()
+                if _new_version == _version:
+                    continue
+                _version = _new_version
+
+                _, _rows = self._database.execute_query(self._query)
+                _added, _removed, _changed = self.compare(_rows)
+
+                if len(_added) + len(_removed) + len(_changed) == 0:
+                    continue
+
+                print(
+                    f"-- {datetime.now():%H:%M:%S} {len(_added)} added, {len(_removed)} removed, {len(_changed)} changed"
+                )
+                for _prefix, _diff in [("+", _added), ("-", _removed), ("~", _changed)]:
+                    for _row in _diff:
+                        print(f"{_prefix} {_row}")
+
+        except KeyboardInterrupt:
+            print("-- Watch stopped")
+        except Error as error:
+            print("Error: %s." % (" ".join(error.args)))
+            return False
+
+        return True
+
+    def find_key(self, names: list[str]) -> list[int] | None:
+        """find_key
+
+        Finds the positions in the results of the primary key columns of the table queried.
+
+        Args:
+            names (list[str]): names of the result columns.
+
+        Returns:
+            list[int] | None: positions of key columns, or None if they are not all present.
+        """
+        _match = _FROM_TABLE.search(self._query)
+        if _match is None:
+            return None
+
+        _primary_key: list[str] = self._database.primary_key(_match.group(2))
+        _names: list[str] = [_name.lower() for _name in names]
+
+        if len(_primary_key) == 0 or any(_column.lower() not in _names for _column in _primary_key):
+            return None
+
+        return [_names.index(_column.lower()) for _column in _primary_key]
+
+    def describe_key(self, names: list[str]) -> str:
+        """describe_key
+
+        Describes how rows are matched between runs.
+
+        Args:
+            names (list[str]): names of the result columns.
+
+        Returns:
+            str: description of key.
+        """
+        if self._key is None:
+            return "whole row"
+
+        return ", ".join(names[_index] for _index in self._key)
+
+    def compare(self, rows: list[Any]) -> tuple[list[Any], list[Any], list[Any]]:
+        """compare
+
+        Compares rows with those of the previous run, and keeps them for the next.
+
+        Args:
+            rows (list[Any]): rows returned by the query.
+
+        Returns:
+            tuple[list[Any], list[Any], list[Any]]: rows added, keys or rows removed, and rows changed.
+        """
+        if self._key is not None:
+            _hashes: dict[Any, int] = {
+                tuple(_row[_index] for _index in self._key): hash(repr(_row)) for _row in rows
+            }
+
+            #  If the key turns out not to be unique in the results, for example in a join, compare whole rows
+            #  from now on. The rows of the previous run are not known, so all rows are reported as added.
+
+            if len(_hashes) == len(rows):
+                _added: list[Any] = []
+                _changed: list[Any] = []
+                for _row, (_key, _hash) in zip(rows, _hashes.items()):
+                    _previous: int | None = self._hashes.get(_key)
+                    if _previous is None:
+                        _added.append(_row)
+                    elif _previous != _hash:
+                        _changed.append(_row)
+
+                _removed: list[Any] = [_key for _key in self._hashes.keys() if _key not in _hashes]
+
+                self._hashes = _hashes
+                return _added, _removed, _changed
+
+            self._key = None
+            self._rows = Counter()
+            self._hashes = {}
+
+        _rows: Counter[Any] = Counter(map(tuple, rows))
+        _result: tuple[list[Any], list[Any], list[Any]] = (
+            list((_rows - self._rows).elements()),
+            list((self._rows - _rows).elements()),
+            [],
+        )
+        self._rows = _rows
+
+        return _result